@@ -16,6 +16,8 @@ setup(
              'evolven3fit_new = n3fit.scripts.evolven3fit_new:main',
              'vp-setupfit = n3fit.scripts.vp_setupfit:main',
              'varflavors = n3fit.scripts.varflavors:main',
+             'n3fit-metrics = n3fit.scripts.n3fit_metrics:main',
+             'n3fit-farm = n3fit.scripts.n3fit_farm:main',
              ]
             },
 )
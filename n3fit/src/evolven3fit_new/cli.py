@@ -10,6 +10,7 @@ def cli_evolven3fit_new(
     dump,
     load,
     force,
+    jobs=1,
 ):
     """Evolves the fitted PDFs.
 
@@ -27,6 +28,12 @@ def cli_evolven3fit_new(
     path.
 
     The two options are mutually exclusive.
+
+    The replicas are read and distributed among ``jobs`` processes
+    which evolve and write them concurrently. The eko is decompressed
+    only once and, if ``jobs`` is greater than one, all its operators are
+    written to a temporary ``operators.npy`` file in the fit folder (which takes
+    several GB of disk) memory mapped by all the processes.
     """
     utils.check_is_a_fit(configuration_folder)
     return evolve.evolve_fit(
@@ -38,4 +45,5 @@ def cli_evolven3fit_new(
         force,
         load,
         dump,
+        jobs,
     )
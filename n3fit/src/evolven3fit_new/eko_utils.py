@@ -1,8 +1,15 @@
+import hashlib
+import json
 import logging
+import os
+import pathlib
+import shutil
+import tempfile
 from typing import Any, Dict, Optional
 
 import numpy as np
-from eko.io import runcards
+from eko.interpolation import XGrid
+from eko.io import EKO, manipulate, runcards
 from eko.matchings import Atlas, nf_default
 from eko.quantities.heavy_quarks import MatchingScales
 from ekobox.cards import _operator as default_op_card
@@ -31,6 +38,8 @@ EVOLVEN3FIT_CONFIGS_DEFAULTS_EXA = {
 NFREF_DEFAULT = 5
 NF0_DEFAULT = 4
 
+EKO_CACHE_FOLDER = "ekos"
+
 def construct_eko_cards(
     theoryID,
     q_fin,
@@ -100,3 +109,83 @@ def construct_eko_cards(
 
     op_card = runcards.OperatorCard.from_dict(op_card)
     return theory_card, op_card
+
+
+def _file_hash(path, chunk_size=2**20):
+    """Return the sha256 hash of the content of the file in path"""
+    sha = hashlib.sha256()
+    with open(path, "rb") as stream:
+        for chunk in iter(lambda: stream.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def reshaped_eko(theoryID, eko_path, x_grid, cache_path=None):
+    """
+    Return the path of an eko equivalent to the one in eko_path with both
+    input and target grids reshaped to x_grid.
+
+    The reshaped ekos are stored in the ``ekos`` folder of the validphys cache
+    (or in cache_path if given), keyed on the theory ID, the hash of the original eko,
+    the x grid and the q grid of the eko, so that the reshaping is done only once for all the fits
+    using the same theory and x grid.
+    The original eko is never modified and it is returned directly if it is already defined
+    on x_grid. The returned eko should only be opened for reading.
+
+    Parameters
+    ----------
+        theoryID: int
+            ID of the theory the eko belongs to
+        eko_path: str or pathlib.Path
+            path of the original eko
+        x_grid: list
+            x grid of the reshaped eko
+        cache_path: str or pathlib.Path
+            folder where the reshaped ekos are stored
+
+    Returns
+    -------
+        : pathlib.Path
+        path of the reshaped eko
+    """
+    eko_path = pathlib.Path(eko_path)
+    x_grid = np.asarray(x_grid, dtype=float)
+    with EKO.read(eko_path) as eko_op:
+        inputgrid = eko_op.bases.inputgrid.raw
+        targetgrid = eko_op.bases.targetgrid.raw
+        mu2grid = [float(mu2) for mu2 in eko_op.mu2grid]
+    same_grid = lambda grid: len(grid) == len(x_grid) and np.allclose(grid, x_grid)
+    if same_grid(inputgrid) and same_grid(targetgrid):
+        return eko_path
+
+    if cache_path is None:
+        cache_path = Loader()._vp_cache() / EKO_CACHE_FOLDER
+    cache_path = pathlib.Path(cache_path)
+    cache_path.mkdir(parents=True, exist_ok=True)
+    key = json.dumps(
+        {
+            "theoryID": int(theoryID),
+            "eko": _file_hash(eko_path),
+            "xgrid": x_grid.tolist(),
+            "mu2grid": mu2grid,
+        }
+    )
+    cached_eko = cache_path / f"eko_{theoryID}_{hashlib.sha256(key.encode()).hexdigest()}.tar"
+    if cached_eko.exists():
+        _logger.info(f"Using reshaped eko from cache: {cached_eko}")
+        return cached_eko
+
+    _logger.info(f"Reshaping eko, it will be stored in: {cached_eko}")
+    # work on a temporary copy so that concurrent runs never see a half-written eko
+    fd, tmp_path = tempfile.mkstemp(suffix=".tar", dir=cache_path)
+    os.close(fd)
+    try:
+        shutil.copyfile(eko_path, tmp_path)
+        with EKO.edit(tmp_path) as eko_op:
+            x_grid_obj = XGrid(x_grid)
+            manipulate.xgrid_reshape(eko_op, targetgrid=x_grid_obj, inputgrid=x_grid_obj)
+        os.replace(tmp_path, cached_eko)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return cached_eko
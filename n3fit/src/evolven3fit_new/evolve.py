@@ -1,14 +1,22 @@
+from concurrent.futures import ProcessPoolExecutor
+import dataclasses
+import json
 import logging
+import os
 import pathlib
 import sys
+import tempfile
 
 import numpy as np
+from scipy.interpolate import interp1d
 import eko
 from eko import basis_rotation
 from eko import runner
 from ekobox import genpdf, info_file, apply
+from n3fit.io.writer import EXPORTGRID_VERSION
 from reportengine.compat import yaml
 from validphys.loader import Loader
+from validphys.pdfbases import PIDS_DICT
 
 from . import eko_utils, utils
 
@@ -31,6 +39,7 @@ def evolve_fit(
     force,
     eko_path=None,
     dump_eko=None,
+    jobs=1,
 ):
     """
     Evolves all the fitted replica in fit_folder/nnfit
@@ -55,6 +64,12 @@ def evolve_fit(
             recomputed)
         dump_eko: str or pathlib.Path
             path where the eko is dumped (necessary only if the eko is computed)
+        jobs: int
+            number of processes used to read the replicas and among which the replicas
+            are distributed to be evolved and written. The eko is only read once,
+            if ``jobs`` is greater than one all its operators are written to a temporary
+            file in ``fit_folder`` (which can take several GB) shared by the processes
+            through memory mapping
     """
     log_file = pathlib.Path(fit_folder) / LOG_FILE
     if log_file.exists():
@@ -76,7 +91,7 @@ def evolve_fit(
         logger.addHandler(stdout_log)
 
     usr_path = pathlib.Path(fit_folder)
-    initial_PDFs_dict = load_fit(usr_path)
+    initial_PDFs_dict = load_fit(usr_path, max_workers=jobs)
     x_grid = np.array(
         initial_PDFs_dict[list(initial_PDFs_dict.keys())[0]]["xgrid"]
     ).astype(float)
@@ -84,7 +99,6 @@ def evolve_fit(
     theory, op = eko_utils.construct_eko_cards(
         theoryID, q_fin, q_points, x_grid, op_card_dict, theory_card_dict
     )
-    qed = theory.order[1] > 0
     if eko_path is not None:
         eko_path = pathlib.Path(eko_path)
         _logger.info(f"Loading eko from : {eko_path}")
@@ -96,36 +110,60 @@ def evolve_fit(
             _logger.info(f"eko not found in theory {theoryID}, we will construct it")
             runner.solve(theory, op, dump_eko)
             eko_path = dump_eko
-    with eko.EKO.edit(eko_path) as eko_op:
-        x_grid_obj = eko.interpolation.XGrid(x_grid)
-        eko.io.manipulate.xgrid_reshape(eko_op, targetgrid=x_grid_obj, inputgrid=x_grid_obj)
+    eko_path = eko_utils.reshaped_eko(theoryID, eko_path, x_grid)
     info = info_file.build(theory, op, 1, info_update={})
     info["NumMembers"] = "REPLACE_NREP"
     info["ErrorType"] = "replicas"
     info["XMin"] = float(x_grid[0])
     info["XMax"] = float(x_grid[-1])
-    with eko.EKO.read(eko_path) as eko_op:
-        dump_info_file(usr_path, info)
-        for replica in initial_PDFs_dict.keys():
-            evolved_block = evolve_exportgrid(initial_PDFs_dict[replica], eko_op, x_grid, qed)
-            dump_evolved_replica(
-                evolved_block, usr_path, int(replica.removeprefix("replica_"))
-            )
+    dump_info_file(usr_path, info)
+    replicas = list(initial_PDFs_dict.keys())
+    jobs = min(jobs, len(replicas))
+    if jobs <= 1:
+        # The operators are loaded one at a time
+        with eko.EKO.read(eko_path) as eko_op:
+            evolve_and_dump_replicas(eko_op, initial_PDFs_dict, x_grid, usr_path)
+    else:
+        _logger.info(f"Evolving {len(replicas)} replicas with {jobs} processes")
+        with tempfile.TemporaryDirectory(dir=usr_path) as operators_path:
+            # Decompress the eko only once, the workers memory map the saved operators
+            # (note that all of them are written to disk, which can take several GB)
+            with eko.EKO.read(eko_path) as eko_op:
+                EvolutionOperators.from_eko(eko_op, operators_path)
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                futures = [
+                    executor.submit(
+                        evolve_and_dump_replicas,
+                        operators_path,
+                        {replica: initial_PDFs_dict[replica] for replica in replicas[i::jobs]},
+                        x_grid,
+                        usr_path,
+                    )
+                    for i in range(jobs)
+                ]
+                for future in futures:
+                    future.result()
     # remove folder:
     # The function dump_evolved_replica dumps the replica files in a temporary folder
     # We need then to remove it after fixing the position of those replica files
     (usr_path / "nnfit" / usr_path.stem).rmdir()
 
 
-def load_fit(usr_path):
+def load_fit(usr_path, max_workers=1):
     """
-    Loads all the replica pdfs at fitting scale in usr_path and return the exportgrids
+    Loads all the replica pdfs at fitting scale in usr_path and return the exportgrids.
+    Both the yaml ``.exportgrid`` and the binary ``.exportgrid.npz`` formats are accepted
+    (if both are present for a replica the binary one is used).
+    If ``max_workers`` is greater than one the replicas are read in parallel.
 
     Parameters
     ----------
 
         usr_path: pathlib.Path
             path to the folder containing the fit
+        max_workers: int
+            maximum number of processes used to read the replicas,
+            by default they are read in the current process
 
     Returns
     -------
@@ -134,13 +172,51 @@ def load_fit(usr_path):
             exportgrids info
     """
     nnfitpath = usr_path / "nnfit"
-    pdf_dict = {}
-    for yaml_file in nnfitpath.glob("replica_*/*.exportgrid"):
-        data = yaml.safe_load(yaml_file.read_text(encoding="UTF-8"))
-        pdf_dict[yaml_file.parent.stem] = data
+    exportgrid_files = {}
+    for pattern in ["replica_*/*.exportgrid", "replica_*/*.exportgrid.npz"]:
+        for exportgrid_file in nnfitpath.glob(pattern):
+            exportgrid_files[exportgrid_file.parent.stem] = exportgrid_file
+    max_workers = min(max_workers, len(exportgrid_files))
+    if max_workers <= 1:
+        return {replica: read_exportgrid(path) for replica, path in exportgrid_files.items()}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        all_data = executor.map(read_exportgrid, exportgrid_files.values(), chunksize=8)
+        pdf_dict = dict(zip(exportgrid_files.keys(), all_data))
     return pdf_dict
 
 
+def read_exportgrid(exportgrid_file):
+    """
+    Reads an exportgrid file, either in the yaml or in the binary (npz) format
+
+    Parameters
+    ----------
+        exportgrid_file: pathlib.Path
+            path to the exportgrid file
+
+    Returns
+    -------
+        : dict
+        exportgrid info, with the keys ``replica``, ``q20``, ``xgrid``, ``labels`` and ``pdfgrid``
+    """
+    if exportgrid_file.suffix != ".npz":
+        return yaml.safe_load(exportgrid_file.read_text(encoding="UTF-8"))
+    with np.load(exportgrid_file) as data:
+        version = int(data["version"])
+        if version > EXPORTGRID_VERSION:
+            raise ValueError(
+                f"{exportgrid_file} has exportgrid version {version}, "
+                f"only versions up to {EXPORTGRID_VERSION} are supported"
+            )
+        return {
+            "replica": int(data["replica"]),
+            "q20": float(data["q20"]),
+            "xgrid": data["xgrid"],
+            "labels": data["labels"].tolist(),
+            "pdfgrid": data["pdfgrid"],
+        }
+
+
 def evolve_exportgrid(exportgrid, eko, x_grid, qed):
     """
     Evolves the provided exportgrid for the desired replica with the eko and returns the evolved block
@@ -180,6 +256,189 @@ def evolve_exportgrid(exportgrid, eko, x_grid, qed):
     return block
 
 
+def _eko_grids(eko_op):
+    """Grids and pids of ``eko_op`` needed to apply its operators,
+    see :py:class:`EvolutionOperators`"""
+    return {
+        "inputgrid": np.array(eko_op.bases.inputgrid.raw),
+        "inputpids": [int(pid) for pid in eko_op.bases.inputpids],
+        "targetgrid": np.array(eko_op.bases.targetgrid.raw),
+        "targetpids": [int(pid) for pid in eko_op.bases.targetpids],
+        "mu2grid": sorted(float(mu2) for mu2, _ in eko_op.evolgrid),
+    }
+
+
+@dataclasses.dataclass
+class EvolutionOperators:
+    """
+    Operators of an eko, one for each scale of the evolution grid,
+    together with the grids and pids needed to apply them.
+
+    Unlike the eko itself, which is decompressed every time it is opened,
+    the operators can be saved once with :py:meth:`from_eko` and then
+    memory mapped by several processes with :py:meth:`load`.
+    Note that all the operators are saved, which for a typical eko takes several GB.
+
+    Parameters
+    ----------
+        inputgrid: np.ndarray
+            x grid of the pdfs the operators are applied to
+        inputpids: list(int)
+            pids of the pdfs the operators are applied to
+        targetgrid: np.ndarray
+            x grid of the evolved pdfs
+        targetpids: list(int)
+            pids of the evolved pdfs
+        mu2grid: list(float)
+            sorted scales of the evolution grid of the eko (which may be repeated)
+        operators: np.ndarray
+            operators of shape ``(scales, targetpids, targetgrid, inputpids, inputgrid)``,
+            one for each of the distinct scales of ``mu2grid`` in increasing order
+    """
+
+    inputgrid: np.ndarray
+    inputpids: list
+    targetgrid: np.ndarray
+    targetpids: list
+    mu2grid: list
+    operators: np.ndarray
+
+    OPERATORS_FILE = "operators.npy"
+    GRIDS_FILE = "grids.json"
+
+    @classmethod
+    def from_eko(cls, eko_op, path):
+        """Write the operators of ``eko_op`` to the folder ``path``, one at a time,
+        so that they can be loaded with :py:meth:`load`, and return them memory mapped.
+        As in ``apply.apply_pdf``, if the eko contains several operators
+        for the same scale the last one is used."""
+        grids = _eko_grids(eko_op)
+        scales = sorted(set(grids["mu2grid"]))
+        operators = None
+        for (mu2, _), elem in eko_op.items():
+            if operators is None:
+                operators = np.lib.format.open_memmap(
+                    pathlib.Path(path) / cls.OPERATORS_FILE,
+                    mode="w+",
+                    shape=(len(scales), *elem.operator.shape),
+                )
+            operators[scales.index(float(mu2))] = elem.operator
+        operators.flush()
+        (pathlib.Path(path) / cls.GRIDS_FILE).write_text(
+            json.dumps({k: np.asarray(v).tolist() for k, v in grids.items()})
+        )
+        return cls(**grids, operators=operators)
+
+    @classmethod
+    def load(cls, path):
+        """Load the operators saved by :py:meth:`from_eko` in ``path``,
+        the operators are memory mapped read only"""
+        path = pathlib.Path(path)
+        grids = json.loads((path / cls.GRIDS_FILE).read_text())
+        operators = np.load(path / cls.OPERATORS_FILE, mmap_mode="r")
+        return cls(
+            inputgrid=np.array(grids["inputgrid"]),
+            inputpids=grids["inputpids"],
+            targetgrid=np.array(grids["targetgrid"]),
+            targetpids=grids["targetpids"],
+            mu2grid=grids["mu2grid"],
+            operators=operators,
+        )
+
+
+def evolve_exportgrids(exportgrids, operators, x_grid):
+    """
+    Evolves all the provided exportgrids at once with the eko and returns the evolved blocks.
+    It is equivalent to calling :py:func:`evolve_exportgrid` for each of the exportgrids
+    but all replicas are stacked in a single (replicas, flavours, x) array so that
+    each operator of the eko is applied only once.
+
+    Parameters
+    ----------
+        exportgrids: list(dict)
+            exportgrids of the pdfs at fitting scale
+        operators: EvolutionOperators or eko object
+            operators of the eko used for the evolution. If an eko is given its
+            operators are loaded (and applied) one at a time
+        x_grid: list
+            xgrid on which the exportgrids are given
+
+    Returns
+    -------
+        : list(dict)
+        evolved block for each of the exportgrids
+    """
+    if isinstance(operators, EvolutionOperators):
+        # not ``dataclasses.asdict``, which would copy the (memory mapped) operators
+        grids = {
+            field.name: getattr(operators, field.name)
+            for field in dataclasses.fields(operators)
+            if field.name != "operators"
+        }
+        items = zip(sorted(set(operators.mu2grid)), operators.operators)
+    else:
+        grids = _eko_grids(operators)
+        items = ((float(mu2), elem.operator) for (mu2, _), elem in operators.items())
+
+    # (replicas, flavours, x) at the fitting scale, interpolated as done by ``LhapdfLike``
+    pdf_grids = np.array([np.array(exportgrid["pdfgrid"]).T for exportgrid in exportgrids])
+    inputgrid = grids["inputgrid"]
+    xfx = interp1d(x_grid, pdf_grids, kind="cubic", axis=-1)(inputgrid)
+    pids_index = list(PIDS_DICT.keys())
+    pdfs = np.zeros((len(exportgrids), len(grids["inputpids"]), len(inputgrid)))
+    for j, pid in enumerate(grids["inputpids"]):
+        if pid in PIDS_DICT:
+            pdfs[:, j] = xfx[:, pids_index.index(pid)] / inputgrid
+
+    # apply each operator once to all replicas
+    # as in ``apply.apply_pdf``, the last operator computed for a given scale is the one used
+    evolved = {}
+    for mu2, operator in items:
+        evolved[mu2] = np.einsum("ajbk,rbk->raj", operator, pdfs, optimize="optimal")
+
+    # build the blocks as ``genpdf.generate_block``: one row per (x, mu2) with x the outer index
+    targetgrid = grids["targetgrid"]
+    mu2grid = grids["mu2grid"]
+    pids = basis_rotation.flavor_basis_pids
+    pids_order = [grids["targetpids"].index(pid) for pid in pids]
+    # (mu2, replicas, pids, x) -> (replicas, x, mu2, pids)
+    data = np.array([evolved[mu2] for mu2 in mu2grid])[:, :, pids_order, :]
+    data = np.transpose(data, (1, 3, 0, 2)) * targetgrid[np.newaxis, :, np.newaxis, np.newaxis]
+    data = data.reshape(len(exportgrids), len(targetgrid) * len(mu2grid), len(pids))
+    return [
+        {"mu2grid": mu2grid, "pids": pids, "xgrid": targetgrid.tolist(), "data": replica_data}
+        for replica_data in data
+    ]
+
+
+def evolve_and_dump_replicas(operators, exportgrids, x_grid, usr_path):
+    """
+    Evolves the given exportgrids with the operators of the eko and dumps
+    the evolved replicas in their final location.
+
+    Parameters
+    ----------
+        operators: eko object, EvolutionOperators or pathlib.Path
+            the eko, its operators, or the folder where they were saved
+            by :py:meth:`EvolutionOperators.from_eko`, in which case they are memory mapped
+            so that several processes can evolve different replicas at the same time
+        exportgrids: dict
+            exportgrids of the pdfs at fitting scale, keyed by the name of the replica folder
+        x_grid: list
+            xgrid on which the exportgrids are given
+        usr_path: pathlib.Path
+            path of the fit folder
+    """
+    if isinstance(operators, (str, os.PathLike)):
+        operators = EvolutionOperators.load(operators)
+    replicas = list(exportgrids.keys())
+    evolved_blocks = evolve_exportgrids(
+        [exportgrids[replica] for replica in replicas], operators, x_grid
+    )
+    for replica, evolved_block in zip(replicas, evolved_blocks):
+        dump_evolved_replica(evolved_block, usr_path, int(replica.removeprefix("replica_")))
+
+
 def dump_evolved_replica(evolved_block, usr_path, replica_num):
     """
     Dump the evolved replica given by evolved_block as the replica num "replica_num" in
@@ -1,20 +1,43 @@
-from n3fit.backends.keras_backend.internal_state import (
-    set_initial_state,
-    clear_backend_state,
-    set_eager
-)
-from n3fit.backends.keras_backend.MetaLayer import MetaLayer
-from n3fit.backends.keras_backend.MetaModel import MetaModel
-from n3fit.backends.keras_backend.base_layers import (
-    Input,
-    concatenate,
-    Lambda,
-    base_layer_selector,
-    regularizer_selector,
-    Concatenate,
-)
-from n3fit.backends.keras_backend import operations
-from n3fit.backends.keras_backend import constraints
-from n3fit.backends.keras_backend import callbacks
+"""
+    The backend (and thus tensorflow) is only imported when one of its objects is first requested
+    so that importing n3fit modules (e.g., to run the checks or parse the runcard) is fast.
+"""
+import importlib
 
-print("Using Keras backend")
+_KERAS_BACKEND = "n3fit.backends.keras_backend"
+
+# Name of the object exposed by the backend: module of the backend in which it is defined
+_BACKEND_OBJECTS = {
+    "set_initial_state": "internal_state",
+    "clear_backend_state": "internal_state",
+    "get_device_memory_info": "internal_state",
+    "set_eager": "internal_state",
+    "MetaLayer": "MetaLayer",
+    "MetaModel": "MetaModel",
+    "Input": "base_layers",
+    "concatenate": "base_layers",
+    "Lambda": "base_layers",
+    "base_layer_selector": "base_layers",
+    "regularizer_selector": "base_layers",
+    "Concatenate": "base_layers",
+}
+_BACKEND_MODULES = ("operations", "constraints", "callbacks")
+
+__all__ = list(_BACKEND_OBJECTS) + list(_BACKEND_MODULES)
+
+
+def __getattr__(name):
+    if name in _BACKEND_OBJECTS:
+        module = importlib.import_module(f"{_KERAS_BACKEND}.{_BACKEND_OBJECTS[name]}")
+        value = getattr(module, name)
+    elif name in _BACKEND_MODULES:
+        value = importlib.import_module(f"{_KERAS_BACKEND}.{name}")
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Save it so that __getattr__ is not called again for this name
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return __all__
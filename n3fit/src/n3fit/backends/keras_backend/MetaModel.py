@@ -177,6 +177,44 @@ class MetaModel(Model):
         result = super().predict(x=x, **kwargs)
         return result
 
+    @staticmethod
+    def batched_predictor(models):
+        """
+        Returns a function which evaluates all ``models`` for the same input in one single
+        graph call and concatenates the results along the first axis.
+        This is equivalent to concatenating the result of ``predict`` for every model
+        but it skips the per-call overhead of ``predict``, which dominates when
+        many (small) models are evaluated in a small grid.
+
+        The returned function takes the same ``x`` argument as ``predict``.
+        Note that the graph is traced the first time it is called for a given input shape,
+        any python-side state of the models (such as the photon) is frozen at that point.
+
+        Parameters
+        ----------
+            models: list(MetaModel)
+                models to be evaluated together, they must accept the same inputs
+
+        Returns
+        -------
+            predictor: callable
+                function x -> numpy.ndarray
+        """
+
+        @tf.function
+        def predict_all(all_inputs):
+            return tf.concat([m(i) for m, i in zip(models, all_inputs)], axis=0)
+
+        def predictor(x=None):
+            # The parsing of the input (which might include the scaler) is done outside the graph
+            all_inputs = []
+            for model in models:
+                parsed = model._parse_input(x)
+                all_inputs.append({k: op.numpy_to_tensor(i) for k, i in parsed.items()})
+            return predict_all(all_inputs).numpy()
+
+        return predictor
+
     def compute_losses(self):
         """
         This function is equivalent to the model ``evaluate(x,y)`` method of most TensorFlow models
@@ -329,6 +367,32 @@ class MetaModel(Model):
         all_input = {**self.tensors_in, **x}
         return all_input, super().__call__(all_input)
 
+    def save_checkpoint(self, path):
+        """Save the weights of the model together with the state of the optimizer
+        (if the model has been compiled) to the given path prefix.
+        The model can then be restored with ``load_checkpoint``.
+
+        Parameters
+        ----------
+            path: str
+                path prefix of the checkpoint files
+        """
+        tf.train.Checkpoint(model=self, optimizer=self.optimizer).write(str(path))
+
+    def load_checkpoint(self, path):
+        """Restore the weights and optimizer state saved with ``save_checkpoint``.
+        The model must have been compiled with the same optimizer.
+        Note that the optimizer slots are only restored once they are created
+        (i.e., at the first training step)
+
+        Parameters
+        ----------
+            path: str
+                path prefix of the checkpoint files
+        """
+        status = tf.train.Checkpoint(model=self, optimizer=self.optimizer).read(str(path))
+        status.assert_existing_objects_matched()
+
     def get_layer_re(self, regex):
         """ Get all layers matching the given regular expression """
         check = lambda x: re.match(regex, x.name)
@@ -0,0 +1 @@
+print("Using Keras backend")
@@ -32,8 +32,9 @@ class TimerCallback(Callback):
     def on_epoch_end(self, epoch, logs=None):
         """ At the end of every epoch it checks the time """
         new_time = time()
-        if epoch == 0:
+        if self.starting_time is None:
             # The first epoch is only useful for starting
+            # (note that it might not be epoch 0 if the fit has been resumed)
             self.starting_time = new_time
         else:
             cur_dif = new_time - self.last_time
@@ -69,20 +70,25 @@ class StoppingCallback(Callback):
         log_freq: int
             each how many epochs the ``print_stats`` argument of ``stopping_object``
             will be set to true
+
+    The (wall) time spent monitoring the validation chi2 is accumulated in ``monitoring_time``
     """
 
     def __init__(self, stopping_object, log_freq=100):
         super().__init__()
         self.log_freq = log_freq
         self.stopping_object = stopping_object
+        self.monitoring_time = 0.0
 
     def on_epoch_end(self, epoch, logs=None):
         """ Function to be called at the end of every epoch """
+        start_time = time()
         print_stats = ((epoch + 1) % self.log_freq) == 0
         # Note that the input logs correspond to the fit before the weights are updated
         self.stopping_object.monitor_chi2(logs, epoch, print_stats=print_stats)
         if self.stopping_object.stop_here():
             self.model.stop_training = True
+        self.monitoring_time += time() - start_time
 
     def on_train_end(self, logs=None):
         """The training can be finished by the stopping or by
@@ -138,6 +144,59 @@ class LagrangeCallback(Callback):
             self._update_weights()
 
 
+class CheckpointCallback(Callback):
+    """
+    Calls the given ``checkpoint_function`` each ``frequency`` epochs.
+    It should be the last callback in the list so that the state of the fit
+    is saved after all other callbacks have been applied for the epoch.
+
+    Parameters
+    ----------
+        checkpoint_function: callable
+            function that receives the current epoch and saves the state of the fit
+        frequency: int
+            each how many epochs the checkpoint is saved
+    """
+
+    def __init__(self, checkpoint_function, frequency=1000):
+        super().__init__()
+        self.checkpoint_function = checkpoint_function
+        self.frequency = frequency
+
+    def on_epoch_end(self, epoch, logs=None):
+        """ Function to be called at the end of every epoch """
+        # If the fit is going to stop there's no need to checkpoint it
+        if (epoch + 1) % self.frequency == 0 and not self.model.stop_training:
+            self.checkpoint_function(epoch)
+
+
+class PruningCallback(Callback):
+    """
+    Calls the given ``pruning_function`` each ``frequency`` epochs and stops the training
+    if it returns ``True``.
+    It must be placed after the ``StoppingCallback`` so that the history of the fit
+    has already been updated for the epoch.
+
+    Parameters
+    ----------
+        pruning_function: callable
+            function that receives the current epoch and decides whether to stop the training
+        frequency: int
+            each how many epochs the pruning function is called
+    """
+
+    def __init__(self, pruning_function, frequency=100):
+        super().__init__()
+        self.pruning_function = pruning_function
+        self.frequency = frequency
+
+    def on_epoch_end(self, epoch, logs=None):
+        """ Function to be called at the end of every epoch """
+        if (epoch + 1) % self.frequency == 0 and not self.model.stop_training:
+            if self.pruning_function(epoch):
+                self.model.stop_training = True
+
+
 def gen_tensorboard_callback(log_dir, profiling=False, histogram_freq=0):
     """
     Generate tensorboard logging details at ``log_dir``.
@@ -60,6 +60,22 @@ def set_number_of_cores(max_cores=None):
     tf.config.threading.set_intra_op_parallelism_threads(cores)
 
 
+def get_device_memory_info():
+    """
+    Returns the current and peak memory (in MB) allocated by tensorflow
+    in each of the GPU devices as a dictionary ``{device: {"current_mb": x, "peak_mb": y}}``.
+    Memory information is not available for CPU devices, which are skipped.
+    """
+    memory_info = {}
+    for device in tf.config.list_logical_devices("GPU"):
+        info = tf.config.experimental.get_memory_info(device.name)
+        memory_info[device.name] = {
+            "current_mb": info["current"] / 1024**2,
+            "peak_mb": info["peak"] / 1024**2,
+        }
+    return memory_info
+
+
 def clear_backend_state():
     """
     Clears the state of the backend.
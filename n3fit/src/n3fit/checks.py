@@ -7,8 +7,7 @@ import os
 
 import numpy as np
 
-from n3fit.hyper_optimization import penalties as penalties_module
-from n3fit.hyper_optimization import rewards as rewards_module
+from n3fit.hyper_optimization.pruning import PRUNING_POLICIES
 from reportengine.checks import CheckError, make_argcheck
 from validphys.core import PDF
 from validphys.pdfbases import check_basis
@@ -16,6 +15,7 @@ from validphys.pdfbases import check_basis
 log = logging.getLogger(__name__)
 
 NN_PARAMETERS = ["nodes_per_layer", "optimizer", "activation_per_layer"]
+EXPORTGRID_FORMATS = ("yaml", "npz")
 
 
 def _is_floatable(num):
@@ -125,6 +125,19 @@ def check_tensorboard(tensorboard):
             )
 
 
+def check_checkpoint(checkpoint, resume):
+    """Check that the checkpoint settings are correct and that they are enabled
+    if the fit is to be resumed"""
+    if checkpoint is not None:
+        frequency = checkpoint.get("frequency", 1000)
+        if not isinstance(frequency, int) or frequency <= 0:
+            raise CheckError(
+                f"The checkpoint frequency must be a positive integer, received {frequency}"
+            )
+    elif resume:
+        raise CheckError("The fit cannot be resumed if the `checkpoint` key is not in the runcard")
+
+
 def check_lagrange_multipliers(parameters, key):
     """Checks the parameters in a lagrange multiplier dictionary
     are correct, e.g. for positivity and integrability"""
@@ -160,9 +173,19 @@ def check_model_file(save, load):
 
 
 @make_argcheck
-def wrapper_check_NN(basis, tensorboard, save, load, parameters):
+def check_exportgrid_format(exportgrid_format):
+    """Check that the format selected for the exportgrid files is known"""
+    if exportgrid_format not in EXPORTGRID_FORMATS:
+        raise CheckError(
+            f"Unknown exportgrid_format '{exportgrid_format}', options are: {EXPORTGRID_FORMATS}"
+        )
+
+
+@make_argcheck
+def wrapper_check_NN(basis, tensorboard, checkpoint, resume, save, load, parameters):
     """Wrapper function for all NN-related checks"""
     check_tensorboard(tensorboard)
+    check_checkpoint(checkpoint, resume)
     check_model_file(save, load)
     check_existing_parameters(parameters)
     check_consistent_layers(parameters)
@@ -226,8 +249,38 @@ def check_hyperopt_positivity(positivity_dict):
             raise CheckError("The minimum initial value cannot be greater than the maximum")
 
 
+def check_kfold_pruning(pruning):
+    """Checks that the options selected for the pruning of hyperopt trials are consistent"""
+    if pruning is None:
+        return
+    allowed_keys = {"policy", "factor", "min_trials", "epoch_frequency"}
+    if unknown := pruning.keys() - allowed_keys:
+        raise CheckError(f"Unknown pruning options: {unknown}, allowed options: {allowed_keys}")
+    policy = pruning.get("policy", "median")
+    if policy not in PRUNING_POLICIES:
+        raise CheckError(
+            f"The pruning policy '{policy}' is not recognized, options are: {list(PRUNING_POLICIES)}"
+        )
+    factor = pruning.get("factor")
+    if factor is not None and (not _is_floatable(factor) or factor <= 0.0):
+        raise CheckError(f"The pruning factor must be a positive number, received {factor}")
+    min_trials = pruning.get("min_trials")
+    if min_trials is not None and (not isinstance(min_trials, int) or min_trials < 1):
+        raise CheckError(f"min_trials must be a positive integer, received {min_trials}")
+    epoch_frequency = pruning.get("epoch_frequency")
+    if epoch_frequency is not None and (not isinstance(epoch_frequency, int) or epoch_frequency <= 0):
+        raise CheckError(
+            f"The pruning epoch_frequency must be a positive integer, received {epoch_frequency}"
+        )
+
+
 def check_kfold_options(kfold):
     """Warns the user about potential bugs on the kfold setup"""
+    # The penalties and rewards depend on the plotting and integration modules of validphys
+    # import them only when needed so that the checks can be imported quickly
+    from n3fit.hyper_optimization import penalties as penalties_module
+    from n3fit.hyper_optimization import rewards as rewards_module
+
     threshold = kfold.get("threshold")
     if threshold is not None and threshold < 2.0:
         log.warning("The kfolding loss threshold might be too low: %f", threshold)
@@ -244,6 +297,7 @@ def check_kfold_options(kfold):
                 f"The hyperoptimization target '{loss_target}' loss is not recognized, "
                 "ensure it is implemented in hyper_optimization/rewards.py"
             )
+    check_kfold_pruning(kfold.get("pruning"))
     partitions = kfold["partitions"]
     # Check specific errors for specific targets
     if loss_target == "fit_future_tests":
@@ -322,6 +376,26 @@ def check_sumrules(sum_rules):
     raise CheckError(f"The only accepted options for the sum rules are: {accepted_options}")
 
 
+@make_argcheck
+def check_sum_rules_integration(sum_rules_integration):
+    """Checks the integration method and number of points used to compute the sum rules"""
+    if sum_rules_integration is None:
+        return
+    # n3fit.msr imports the backend
+    from n3fit.msr import INTEGRATION_METHODS
+
+    method = sum_rules_integration.get("method", "trapezoid")
+    if method not in INTEGRATION_METHODS:
+        raise CheckError(
+            f"Unknown sum rules integration method '{method}', options are: {INTEGRATION_METHODS}"
+        )
+    points = sum_rules_integration.get("points")
+    if points is not None and (not isinstance(points, int) or points < 1):
+        raise CheckError(
+            "The number of points for the sum rules integration must be a positive integer"
+        )
+
+
 # Checks on the physics
 @make_argcheck
 def check_consistent_basis(sum_rules, fitbasis, basis, theoryid):
@@ -1,11 +1,26 @@
 """
     Custom hyperopt trial object for persistent file storage
     in the form of a json file within the nnfit folder
+
+    It also contains a version of the trials object which is shared among several
+    n3fit processes by means of a file-locked store in a (possibly network) filesystem
 """
+from contextlib import contextmanager
+import fcntl
 import json
 import logging
-from validphys.hyperoptplot import HyperoptTrial
-from hyperopt import Trials, space_eval
+import pathlib
+
+from hyperopt import (
+    JOB_STATE_DONE,
+    JOB_STATE_ERROR,
+    JOB_STATE_NEW,
+    JOB_STATE_RUNNING,
+    Trials,
+    space_eval,
+)
+
+from validphys.hyperoptplot import TRIES_JSON, TRIES_LOG, HyperoptTrial, read_tries
 
 log = logging.getLogger(__name__)
 
@@ -50,6 +65,11 @@ class FileTrials(Trials):
     """
     Stores trial results on the fly inside the nnfit replica folder
 
+    Every completed trial is appended as one line to a ``tries.jsonl`` log so
+    that the cost of storing a trial does not grow with the number of trials.
+    At the end of the scan the log can be compacted into the usual ``tries.json`` file
+    with ``compact``, both formats can be read with :py:func:`validphys.hyperoptplot.read_tries`.
+
     Parameters
     ----------
         replica_path: path
@@ -60,31 +80,62 @@ class FileTrials(Trials):
 
     def __init__(self, replica_path, parameters=None, **kwargs):
         self._store_trial = False
-        self._json_file = "{0}/tries.json".format(replica_path)
+        self._json_file = pathlib.Path(replica_path) / TRIES_JSON
+        self._log_file = pathlib.Path(replica_path) / TRIES_LOG
+        self._logged_tids = set()
         self._parameters = parameters
+        # The trials of a previous scan in the same folder would be overwritten
+        # so remove them now so that they cannot be mixed with the new ones
+        for old_file in (self._json_file, self._log_file):
+            if old_file.exists():
+                log.warning("Removing trials from a previous scan: %s", old_file)
+                old_file.unlink()
         super().__init__(**kwargs)
 
     def refresh(self):
         """
         This is the "flushing" method which is called at the end of every trial to
-        save things in the database. We are are overloading it in order to also write
-        to a json file with every single trial.
+        save things in the database. We are are overloading it in order to also append
+        to the log every trial which has been completed since the last call.
         """
         super().refresh()
 
-        # write json to disk
+        # write the new trials to disk
         if self._store_trial:
-            log.info("Storing scan in %s", self._json_file)
-            local_trials = []
-            for idx, t in enumerate(self._dynamic_trials):
-                local_trials.append(t)
-                local_trials[idx]["misc"]["space_vals"] = space_eval_trial(
-                    self._parameters, t
-                )
-
-            all_to_str = json.dumps(local_trials, default=str)
-            with open(self._json_file, "w") as f:
-                f.write(all_to_str)
+            new_trials = [
+                t
+                for t in self._trials_to_file(self._dynamic_trials)
+                if t["state"] in (JOB_STATE_DONE, JOB_STATE_ERROR)
+                and t["tid"] not in self._logged_tids
+            ]
+            if not new_trials:
+                return
+            log.info("Storing scan in %s", self._log_file)
+            new_lines = []
+            for t in new_trials:
+                t["misc"]["space_vals"] = space_eval_trial(self._parameters, t)
+                new_lines.append(json.dumps(t, default=str) + "\n")
+            with open(self._log_file, "a") as f:
+                f.write("".join(new_lines))
+            self._logged_tids.update(t["tid"] for t in new_trials)
+
+    def compact(self):
+        """Compact the log of trials into the ``tries.json`` file
+        The json file is written first and then substitutes the previous one, so that
+        in case of failure no trial is lost (as the log is only removed at the very end)
+        """
+        if not self._log_file.exists():
+            return
+        all_trials = read_tries(self._json_file.parent)
+        tmp_file = self._json_file.with_suffix(".json.tmp")
+        tmp_file.write_text(json.dumps(all_trials, default=str))
+        tmp_file.replace(self._json_file)
+        self._log_file.unlink()
+        log.info("Trials compacted into %s", self._json_file)
+
+    def _trials_to_file(self, trials):
+        """Select the trials to be written down to the json file"""
+        return trials
 
     # The two methods below are just a stupid overloading to avoid writing to the
     # database twice
@@ -95,3 +146,172 @@ class FileTrials(Trials):
     def new_trial_docs(self, tids, specs, results, miscs):
         self._store_trial = True
         return super().new_trial_docs(tids, specs, results, miscs)
+
+
+def _to_json_default(obj):
+    """Default for ``json.dumps`` which converts numpy objects to python types
+    and anything else to its string representation"""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    return str(obj)
+
+
+class SharedTrialsStore:
+    """
+    File-locked store of hyperopt trials which can be shared by several processes.
+
+    The store is an append-only file in which each line is a json record, either
+    the reservation of a number of trial ids (``{"reserve": n}``)
+    or the last version of a trial document (``{"trial": doc}``).
+    All accesses to the file are done while holding an exclusive lock on a separate lock file.
+    Each instance of the store remembers the position up to which the file has been read
+    so that, on every synchronization, only the records written by other processes are parsed.
+
+    Parameters
+    ----------
+        store_path: path
+            Folder in which the store is created (or found if it already exists)
+    """
+
+    def __init__(self, store_path):
+        store_path = pathlib.Path(store_path)
+        store_path.mkdir(parents=True, exist_ok=True)
+        self._store_file = store_path / "trials.jsonl"
+        self._lock_file = store_path / "trials.lock"
+        self._offset = 0
+        self._n_reserved = 0
+        self._docs = {}
+
+    @contextmanager
+    def _locked(self):
+        """Holds an exclusive lock on the store while inside the context.
+        ``lockf`` is used instead of ``flock`` since it also works on NFS"""
+        with open(self._lock_file, "a") as lock:
+            fcntl.lockf(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(lock, fcntl.LOCK_UN)
+
+    def _read_new_records(self):
+        """Read all records written to the store since the last read, must be called with the lock"""
+        if not self._store_file.exists():
+            return
+        with open(self._store_file, "rb") as fs:
+            fs.seek(self._offset)
+            new_data = fs.read()
+        self._offset += len(new_data)
+        for line in new_data.decode().splitlines():
+            record = json.loads(line)
+            if "reserve" in record:
+                self._n_reserved += record["reserve"]
+            else:
+                doc = record["trial"]
+                self._docs[doc["tid"]] = doc
+
+    def _write_records(self, records):
+        """Append the records to the store, must be called with the lock"""
+        if not records:
+            return
+        lines = "".join(json.dumps(i, default=_to_json_default) + "\n" for i in records)
+        with open(self._store_file, "a") as fs:
+            fs.write(lines)
+            fs.flush()
+
+    def reserve_ids(self, n, max_total=None):
+        """Reserve ``n`` trial ids which will not be given to any other process.
+        If ``max_total`` is given, the total number of reserved ids will never go above it
+        and so less than ``n`` ids (maybe none) can be returned
+
+        Returns
+        -------
+            list(int)
+                list of reserved trial ids
+        """
+        with self._locked():
+            self._read_new_records()
+            if max_total is not None:
+                n = max(0, min(n, max_total - self._n_reserved))
+            start = self._n_reserved
+            if n > 0:
+                self._write_records([{"reserve": n}])
+                self._read_new_records()
+        return list(range(start, start + n))
+
+    def sync(self, docs):
+        """Push the given trial documents to the store and
+        read all the documents that other processes have pushed
+
+        Returns
+        -------
+            dict
+                dictionary of all trial documents in the store indexed by trial id
+        """
+        with self._locked():
+            self._read_new_records()
+            self._write_records([{"trial": i} for i in docs])
+            # Read back so that the documents are json-compatible (as seen by other processes)
+            self._read_new_records()
+        return dict(self._docs)
+
+
+class SharedTrials(FileTrials):
+    """
+    Trials which are shared among all the processes that use the same store
+    (see :py:class:`SharedTrialsStore`), so that hyperopt can take into account
+    the trials computed by every process when suggesting a new point.
+
+    Each process evaluates only the trials it has suggested, the trials from other processes
+    are seen in the state they were last pushed to the store (those not finished yet are
+    always seen as running).
+    The ``tries.json`` file of each replica folder only contains the trials
+    evaluated by that process.
+
+    Parameters
+    ----------
+        replica_path: path
+            Replica folder as generated by n3fit
+        store_path: path
+            Folder containing the shared store
+        max_evals: int
+            Maximum number of trials to be run among all processes
+        parameters: dict
+            Dictionary of parameters on which we are doing hyperoptimization
+    """
+
+    def __init__(self, replica_path, store_path, max_evals=None, parameters=None, **kwargs):
+        self._store = SharedTrialsStore(store_path)
+        self._max_evals = max_evals
+        self._own_tids = set()
+        self._pushed_states = {}
+        super().__init__(replica_path, parameters=parameters, **kwargs)
+
+    def refresh(self):
+        """Push the trials of this process which have changed and
+        read the trials of all other processes from the store"""
+        own_trials = [i for i in self._dynamic_trials if i["tid"] in self._own_tids]
+        changed = [i for i in own_trials if self._pushed_states.get(i["tid"]) != i["state"]]
+        shared_docs = self._store.sync(changed)
+        for trial in changed:
+            self._pushed_states[trial["tid"]] = trial["state"]
+
+        # Own trials must be kept as they are since hyperopt modifies them in place
+        for tid, doc in shared_docs.items():
+            if tid in self._own_tids:
+                continue
+            # Make sure trials from other processes are never evaluated by this one
+            if doc["state"] == JOB_STATE_NEW:
+                doc["state"] = JOB_STATE_RUNNING
+            own_trials.append(doc)
+        self._dynamic_trials = sorted(own_trials, key=lambda i: i["tid"])
+        super().refresh()
+
+    def _trials_to_file(self, trials):
+        return [i for i in trials if i["tid"] in self._own_tids]
+
+    def new_trial_ids(self, n):
+        self._store_trial = False
+        tids = self._store.reserve_ids(n, max_total=self._max_evals)
+        self._own_tids.update(tids)
+        self._ids.update(tids)
+        return tids
@@ -80,15 +80,31 @@ def optimizer_arg_wrapper(hp_key, option_dict):
     return choice
 
 
+def _tpe_suggest(new_ids, domain, trials, seed):
+    """Wrapper around hyperopt's TPE algorithm which returns no new trials
+    when no new trial ids are available (i.e., the shared budget of trials has been exhausted)"""
+    if not new_ids:
+        return []
+    return hyperopt.tpe.suggest(new_ids, domain, trials, seed)
+
+
 # Wrapper for the hyperscanning
-def hyper_scan_wrapper(replica_path_set, model_trainer, hyperscanner, max_evals=1):
+def hyper_scan_wrapper(
+    replica_path_set, model_trainer, hyperscanner, max_evals=1, shared_trials_path=None
+):
     """
     This function receives a ``ModelTrainer`` object as well as the definition of the
     hyperparameter scan (``hyperscanner``)
     and performs ``max_evals`` evaluations of the hyperparametrizable function of ``model_trainer``.
 
     A ``tries.json`` file will be saved in the ``replica_path_set`` folder with the information
-    of all trials.
+    of all trials. While the scan is running the trials are appended to a ``tries.jsonl`` log
+    which is compacted into ``tries.json`` at the end.
+
+    If a ``shared_trials_path`` is given, the trials are shared with all other processes
+    using the same path and ``max_evals`` is the total number of trials to be run
+    among all of them. In this case the ``tries.json`` file only contains the trials run
+    by this process.
 
     Parameters
     -----------
@@ -100,6 +116,8 @@ def hyper_scan_wrapper(replica_path_set, model_trainer, hyperscanner, max_evals=
             a ``HyperScanner`` object defining the scan
         max_evals: int
             Number of trials to run
+        shared_trials_path: path
+            folder of the store shared with other processes
 
     Returns
     -------
@@ -109,17 +127,30 @@ def hyper_scan_wrapper(replica_path_set, model_trainer, hyperscanner, max_evals=
     # Tell the trainer we are doing hpyeropt
     model_trainer.set_hyperopt(True, keys=hyperscanner.hyper_keys, status_ok=hyperopt.STATUS_OK)
     # Generate the trials object
-    trials = filetrials.FileTrials(replica_path_set, parameters=hyperscanner.as_dict())
+    if shared_trials_path is None:
+        trials = filetrials.FileTrials(replica_path_set, parameters=hyperscanner.as_dict())
+    else:
+        log.info("Sharing the hyperopt trials through %s", shared_trials_path)
+        trials = filetrials.SharedTrials(
+            replica_path_set,
+            shared_trials_path,
+            max_evals=max_evals,
+            parameters=hyperscanner.as_dict(),
+        )
 
     # Perform the scan
-    best = hyperopt.fmin(
-        fn=model_trainer.hyperparametrizable,
-        space=hyperscanner.as_dict(),
-        algo=hyperopt.tpe.suggest,
-        max_evals=max_evals,
-        show_progressbar=False,
-        trials=trials,
-    )
+    try:
+        best = hyperopt.fmin(
+            fn=model_trainer.hyperparametrizable,
+            space=hyperscanner.as_dict(),
+            algo=_tpe_suggest,
+            max_evals=max_evals,
+            show_progressbar=False,
+            trials=trials,
+        )
+    finally:
+        # Compact the log of trials into the tries.json file
+        trials.compact()
     return hyperscanner.space_eval(best)
 
 
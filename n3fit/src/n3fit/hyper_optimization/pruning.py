@@ -0,0 +1,171 @@
+"""
+Pruning of hyperoptimization trials
+
+During a hyperparameter scan most trials are clearly worse than the best ones found so far
+well before all k-fold partitions have been fitted.
+The :py:class:`TrialPruner` keeps track of the losses of the previous trials
+and decides whether the trial being run should be abandoned:
+
+    - after each fold, comparing the hyper loss of the fold with the same fold of previous trials
+    - optionally, every ``epoch_frequency`` epochs within a fold, comparing the validation chi2
+      with the validation chi2 of previous trials at the same epoch and fold
+
+Two policies are implemented:
+
+    median:
+        a trial is pruned if its loss is greater than ``factor`` times the median
+        of the losses of previous trials (``factor`` defaults to 1.0)
+    threshold:
+        a trial is pruned if its loss is greater than ``factor`` times the best
+        loss of previous trials (``factor`` defaults to 2.0)
+
+The previous trials are those which have been completed and those which have been pruned.
+The latter enter the history with the losses of the folds (and epochs) they finished
+before being pruned, so that the median at each fold is taken over all the trials
+which reached that fold and not only over the best ones.
+Trials which were stopped for any other reason (e.g., a failed fit) do not enter the history.
+No trial is pruned until at least ``min_trials`` previous trials have reached the same
+fold (or epoch of the fold).
+
+Note that the history is kept by the process running the trials,
+when several processes share the trials each of them will only take into account
+the trials they ran.
+"""
+import logging
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+PRUNING_POLICIES = {"median": 1.0, "threshold": 2.0}
+MIN_TRIALS = 5
+
+
+class TrialPruner:
+    """
+    Decides whether a hyperoptimization trial should be abandoned
+    based on the trials that have been run before
+
+    Parameters
+    ----------
+        policy: str
+            pruning policy, one of ``median`` or ``threshold``
+        factor: float
+            multiplicative factor applied to the reference loss of the policy
+        min_trials: int
+            number of previous trials reaching a fold (or epoch) before pruning is activated
+        epoch_frequency: int
+            each how many epochs the validation chi2 is checked within a fold,
+            if ``None`` only whole folds are checked
+    """
+
+    def __init__(self, policy="median", factor=None, min_trials=MIN_TRIALS, epoch_frequency=None):
+        if policy not in PRUNING_POLICIES:
+            raise ValueError(f"Pruning policy '{policy}' not recognized")
+        if factor is None:
+            factor = PRUNING_POLICIES[policy]
+        self.policy = policy
+        self.factor = factor
+        self.min_trials = min_trials
+        self.epoch_frequency = epoch_frequency
+
+        # Losses of previous trials, per fold and per (fold, epoch)
+        self._fold_history = []
+        self._epoch_history = []
+        # Losses of the trial being run
+        self._fold_losses = None
+        self._epoch_losses = None
+        self._pruned = False
+
+    @property
+    def pruned(self):
+        """Whether the trial being run has been pruned"""
+        return self._pruned
+
+    def _reference(self, values):
+        """Return the reference loss of the policy for the given list of losses
+        or ``None`` if there are not enough previous trials"""
+        if len(values) < self.min_trials:
+            return None
+        if self.policy == "median":
+            return self.factor * np.median(values)
+        return self.factor * np.min(values)
+
+    def start_trial(self):
+        """Reset the information of the trial being run"""
+        self._fold_losses = []
+        self._epoch_losses = {}
+        self._pruned = False
+
+    def finish_trial(self, completed=True):
+        """Save the information of the trial being run in the history
+        if the trial has been either completed or pruned.
+        Pruned trials are saved with the losses registered before they were pruned."""
+        if completed or self._pruned:
+            self._fold_history.append(self._fold_losses)
+            self._epoch_history.append(self._epoch_losses)
+        self._fold_losses = None
+        self._epoch_losses = None
+
+    def prune_fold(self, fold, loss):
+        """Register the hyper loss for the given fold and return whether the trial should be pruned
+
+        Parameters
+        ----------
+            fold: int
+                index of the fold
+            loss: float
+                hyper loss of the fold
+
+        Returns
+        -------
+            bool
+                whether the remaining folds of the trial should be skipped
+        """
+        self._fold_losses.append(loss)
+        previous = [i[fold] for i in self._fold_history if len(i) > fold]
+        reference = self._reference(previous)
+        if reference is not None and loss > reference:
+            log.info(
+                "Pruning trial at fold %d, loss above %s reference (%.1f > %.1f)",
+                fold + 1,
+                self.policy,
+                loss,
+                reference,
+            )
+            self._pruned = True
+        return self._pruned
+
+    def prune_epoch(self, fold, epoch, vl_chi2):
+        """Register the validation chi2 for the given fold and epoch
+        and return whether the training of the fold should be stopped
+
+        Parameters
+        ----------
+            fold: int
+                index of the fold
+            epoch: int
+                epoch of the fold being trained
+            vl_chi2: float
+                validation chi2 at the given epoch
+
+        Returns
+        -------
+            bool
+                whether the trial should be pruned
+        """
+        key = (fold, epoch)
+        self._epoch_losses[key] = vl_chi2
+        previous = [i[key] for i in self._epoch_history if key in i]
+        reference = self._reference(previous)
+        if reference is not None and vl_chi2 > reference:
+            log.info(
+                "Pruning trial at epoch %d of fold %d, validation chi2 above %s reference (%.2f > %.2f)",
+                epoch + 1,
+                fold + 1,
+                self.policy,
+                vl_chi2,
+                reference,
+            )
+            self._pruned = True
+        return self._pruned
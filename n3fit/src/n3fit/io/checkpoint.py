@@ -0,0 +1,110 @@
+"""
+    Module containing the functions to save and restore mid-training checkpoints
+
+    A checkpoint is a folder containing:
+        - the weights of the training model (NN weights, preprocessing and Lagrange multipliers)
+          together with the state of the optimizer, saved by the backend
+        - a pickle file with the state of the stopping object (history, counters
+          and best weights per replica), the state of the random number generators
+          and the last epoch that was completed
+
+    The checkpoint is first written to a temporary folder which then substitutes the previous one
+    so that a job killed while writing a checkpoint can still be resumed from the previous one.
+"""
+import logging
+import pickle
+import random
+import shutil
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+CHECKPOINT_FOLDER = "checkpoint"
+MODEL_PREFIX = "training_model"
+STATE_FILE = "state.pkl"
+
+
+def _checkpoint_folders(checkpoint_path):
+    """Return the folder holding the checkpoint as well as the temporary folder
+    used for writing it and the folder holding the previous one while it is being substituted"""
+    folder = checkpoint_path / CHECKPOINT_FOLDER
+    tmp_folder = checkpoint_path / f"{CHECKPOINT_FOLDER}.tmp"
+    old_folder = checkpoint_path / f"{CHECKPOINT_FOLDER}.old"
+    return folder, tmp_folder, old_folder
+
+
+def save_checkpoint(checkpoint_path, epoch, training_model, stopping_object):
+    """Save the state of the fit at the end of the given epoch
+
+    Parameters
+    ----------
+        checkpoint_path: pathlib.Path
+            folder in which the checkpoint will be written
+        epoch: int
+            last epoch which has been completed
+        training_model: n3fit.backends.MetaModel
+            the model being trained
+        stopping_object: n3fit.stopping.Stopping
+            the stopping object monitoring the fit
+    """
+    folder, tmp_folder, old_folder = _checkpoint_folders(checkpoint_path)
+    shutil.rmtree(tmp_folder, ignore_errors=True)
+    tmp_folder.mkdir(parents=True)
+
+    training_model.save_checkpoint(tmp_folder / MODEL_PREFIX)
+    state = {
+        "epoch": epoch,
+        "stopping": stopping_object.checkpoint_state(),
+        "numpy_rng": np.random.get_state(),
+        "python_rng": random.getstate(),
+    }
+    with (tmp_folder / STATE_FILE).open("wb") as fs:
+        pickle.dump(state, fs)
+
+    # Substitute the previous checkpoint (if any) with the new one
+    if folder.exists():
+        shutil.rmtree(old_folder, ignore_errors=True)
+        folder.rename(old_folder)
+    tmp_folder.rename(folder)
+    shutil.rmtree(old_folder, ignore_errors=True)
+    log.info("Checkpoint for epoch %d saved to %s", epoch + 1, folder)
+
+
+def load_checkpoint(checkpoint_path, training_model, stopping_object):
+    """Restore the state of the fit from the last checkpoint found in ``checkpoint_path``
+    The training model must have already been compiled.
+
+    Parameters
+    ----------
+        checkpoint_path: pathlib.Path
+            folder in which the checkpoint was written
+        training_model: n3fit.backends.MetaModel
+            the model being trained
+        stopping_object: n3fit.stopping.Stopping
+            the stopping object monitoring the fit
+
+    Returns
+    -------
+        initial_epoch: int
+            the epoch from which the training should continue,
+            0 if no checkpoint was found
+    """
+    folder, _, old_folder = _checkpoint_folders(checkpoint_path)
+    if not folder.exists():
+        # The job might have been killed while substituting the checkpoint
+        folder = old_folder
+    if not (folder / STATE_FILE).exists():
+        log.warning("No checkpoint found in %s, starting the fit from scratch", checkpoint_path)
+        return 0
+
+    with (folder / STATE_FILE).open("rb") as fs:
+        state = pickle.load(fs)
+    training_model.load_checkpoint(folder / MODEL_PREFIX)
+    stopping_object.restore_state(state["stopping"])
+    np.random.set_state(state["numpy_rng"])
+    random.setstate(state["python_rng"])
+
+    initial_epoch = state["epoch"] + 1
+    log.info("Resuming the fit from epoch %d using the checkpoint at %s", initial_epoch, folder)
+    return initial_epoch
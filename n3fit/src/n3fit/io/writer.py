@@ -12,6 +12,10 @@ import validphys
 import n3fit
 from n3fit import vpinterface
 
+# Version of the binary (npz) exportgrid format, to be increased if the fields change
+EXPORTGRID_VERSION = 1
+EXPORTGRID_LABELS = ["TBAR", "BBAR", "CBAR", "SBAR", "UBAR", "DBAR", "GLUON", "D", "U", "S", "C", "B", "T", "PHT"]
+
 XGRID = np.array(
     [
         1.00000000000000e-09,
@@ -214,7 +218,16 @@ XGRID = np.array(
 )
 
 class WriterWrapper:
-    def __init__(self, replica_number, pdf_object, stopping_object, q2, timings):
+    def __init__(
+        self,
+        replica_number,
+        pdf_object,
+        stopping_object,
+        q2,
+        timings,
+        lha_grid=None,
+        exportgrid_format="yaml",
+    ):
         """
         Initializes the writer for one given replica. This is decoupled from the writing
         of the fit in order to fix some of the variables which would be, in principle,
@@ -232,12 +245,19 @@ class WriterWrapper:
                 q^2 of the fit
             `timings`
                 dictionary of the timing of the different events that happened
+            `lha_grid`
+                values of the pdf in the export grid, as given by ``exportgrid_values``,
+                if not given they will be computed from ``pdf_object``
+            `exportgrid_format`
+                format of the exportgrid file, ``yaml`` or ``npz``
         """
         self.replica_number = replica_number
         self.pdf_object = pdf_object
         self.stopping_object = stopping_object
         self.q2 = q2
         self.timings = timings
+        self.lha_grid = lha_grid
+        self.exportgrid_format = exportgrid_format
 
     def write_data(self, replica_path_set, fitname, tr_chi2, vl_chi2, true_chi2):
         """
@@ -271,6 +291,8 @@ class WriterWrapper:
             replica_path_set,
             fitname,
             self.q2,
+            lha_grid=self.lha_grid,
+            exportgrid_format=self.exportgrid_format,
         )
 
         # write the log file for the chi2
@@ -423,12 +445,36 @@ def evln2lha(evln):
     return lha
 
 
+def exportgrid_values(pdf_object):
+    """
+    Evaluates all replicas of ``pdf_object`` in the export grid at once
+    and rotates the result to the LHA basis.
+    For a fit with many replicas in parallel this is much faster than computing
+    the grid of each replica separately.
+
+    Parameters
+    ----------
+        `pdf_object`
+            N3PDF object constructed from the pdf_model(s)
+
+    Returns
+    -------
+        lha_grid: np.ndarray
+            array of shape (replicas, xgrid, flavours) with the values of the pdf
+    """
+    result = pdf_object(XGRID.reshape(-1, 1), flavours="n3fit")
+    # evln2lha acts on the first axis
+    return evln2lha(result.T).T
+
+
 def storefit(
     pdf_object,
     replica,
     replica_path,
     fitname,
     q20,
+    lha_grid=None,
+    exportgrid_format="yaml",
 ):
     """
     One-trick function which generates all output in the NNPDF format
@@ -447,19 +493,38 @@ def storefit(
             name of the fit
         `q20`
             q_0^2
+        `lha_grid`
+            values of the pdf in the export grid for this replica, shape (xgrid, flavours),
+            if not given it is computed from ``pdf_object``
+        `exportgrid_format`
+            ``yaml`` (default) for the usual ``.exportgrid`` file or ``npz`` for a binary
+            ``.exportgrid.npz`` file with the same fields (and a ``version`` tag)
+            which is much faster to read and write
     """
     # build exportgrid
     xgrid = XGRID.reshape(-1, 1)
-        
-    result = pdf_object(xgrid, flavours="n3fit").squeeze()
-    lha = evln2lha(result.T).T
+
+    if lha_grid is None:
+        lha_grid = exportgrid_values(pdf_object)[0]
+
+    if exportgrid_format == "npz":
+        np.savez(
+            f"{replica_path}/{fitname}.exportgrid.npz",
+            version=EXPORTGRID_VERSION,
+            replica=replica,
+            q20=q20,
+            xgrid=XGRID,
+            labels=np.array(EXPORTGRID_LABELS),
+            pdfgrid=lha_grid,
+        )
+        return
 
     data = {
         "replica": replica,
         "q20": q20,
         "xgrid": xgrid.T.tolist()[0],
-        "labels": ["TBAR", "BBAR", "CBAR", "SBAR", "UBAR", "DBAR", "GLUON", "D", "U", "S", "C", "B", "T", "PHT"],
-        "pdfgrid": lha.tolist(),
+        "labels": EXPORTGRID_LABELS,
+        "pdfgrid": lha_grid.tolist(),
     }
 
     with open(f"{replica_path}/{fitname}.exportgrid", "w") as fs:
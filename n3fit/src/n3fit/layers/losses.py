@@ -74,6 +74,10 @@ class LossInvcovmat(MetaLayer):
         new_covmat = np.linalg.inv(self._covmat + covmat)
         self.kernel.assign(new_covmat)
 
+    def reset_covmat(self):
+        """Remove from the inverse covmat weights any piece added with ``add_covmat``"""
+        self.kernel.assign(self._invcovmat)
+
     def update_mask(self, new_mask):
         """Update the mask"""
         self.mask.assign(new_mask)
@@ -114,6 +118,11 @@ class LossLagrange(MetaLayer):
         self.kernel = self.builder_helper("lagMult", (1,), multiplier, trainable=False)
         super().build(input_shape)
 
+    def update_multiplier(self, c):
+        """Set the value of the multiplier to ``c``"""
+        self._initial_multiplier = c
+        self.kernel.assign([c])
+
     def apply_multiplier(self, y):
         return self.kernel * y
 
@@ -9,7 +9,7 @@
 
 
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import numpy as np
 
@@ -35,6 +35,15 @@ class ObservableWrapper:
     """Wraps many observables into an experimental layer once the PDF model is prepared
     It can take normal datasets or Lagrange-multiplier-like datasets
     (such as positivity or integrability)
+
+    The loss layers are generated the first time the wrapper is called with a given mask
+    and reused afterwards (resetting their covmat and multiplier to the initial values)
+    so that the same wrapper can be used to generate the models of all hyperopt trials
+    without recreating the layers. Different masks (i.e., different k-folds) get
+    their own loss layer.
+    Note that, as a consequence, models generated by the wrapper with the same mask share
+    the loss layer: use a copy of the wrapper (e.g. ``dataclasses.replace(wrapper)``)
+    for models which must have independent layers.
     """
 
     # IDEALLY:
@@ -53,10 +62,21 @@ class ObservableWrapper:
     positivity: bool = False
     data: np.array = None
     rotation: ObsRotation = None  # only used for diagonal covmat
+    _losses: dict = field(default_factory=dict, init=False, repr=False, compare=False)
 
     def _generate_loss(self, mask=None):
         """Generates the corresponding loss function depending on the values the wrapper
-        was initialized with"""
+        was initialized with.
+        If a loss has already been generated for this mask, reset and reuse it"""
+        mask_key = None if mask is None else np.asarray(mask, dtype=bool).tobytes()
+        loss = self._losses.get(mask_key)
+        if loss is not None:
+            if self.invcovmat is not None:
+                loss.reset_covmat()
+            else:
+                loss.update_multiplier(self.multiplier)
+            return loss
+
         if self.invcovmat is not None:
             loss = losses.LossInvcovmat(
                 self.invcovmat, self.data, mask, covmat=self.covmat, name=self.name
@@ -65,6 +85,7 @@ class ObservableWrapper:
             loss = losses.LossPositivity(name=self.name, c=self.multiplier)
         elif self.integrability:
             loss = losses.LossIntegrability(name=self.name, c=self.multiplier)
+        self._losses[mask_key] = loss
         return loss
 
     def _generate_experimental_layer(self, pdf):
@@ -412,6 +433,7 @@ def pdfNN_layer_generator(
     scaler=None,
     parallel_models=1,
     photons=None,
+    sumrule_integration=None,
 ):  # pylint: disable=too-many-locals
     """
     Generates the PDF model which takes as input a point in x (from 0 to 1)
@@ -508,6 +530,9 @@ def pdfNN_layer_generator(
             If given, gives the AddPhoton layer a function to compute a photon which will be added at the
             index 0 of the 14-size FK basis
             This same function will also be used to compute the MSR component for the photon
+        sumrule_integration: dict
+            integration ``method`` and number of ``points`` used to compute the sum rules,
+            see :py:func:`n3fit.msr.msr_impose` (by default trapezoid in 2000 points)
 
     Returns
     -------
@@ -581,8 +606,14 @@ def pdfNN_layer_generator(
 
     # Normalization and sum rules
     if impose_sumrule:
+        if sumrule_integration is None:
+            sumrule_integration = {}
         sumrule_layer, integrator_input = msr_impose(
-            mode=impose_sumrule, scaler=scaler, photons=photons
+            nx=sumrule_integration.get("points"),
+            mode=impose_sumrule,
+            scaler=scaler,
+            photons=photons,
+            method=sumrule_integration.get("method", "trapezoid"),
         )
         model_input["integrator_input"] = integrator_input
     else:
@@ -9,6 +9,7 @@
     between iterations while at the same time keeping the amount of redundant calls to a minimum
 """
 from collections import namedtuple
+import dataclasses
 from itertools import zip_longest
 import logging
 
@@ -19,8 +20,11 @@ from n3fit import model_gen
 from n3fit.backends import MetaModel, callbacks, clear_backend_state
 from n3fit.backends import operations as op
 import n3fit.hyper_optimization.penalties
+from n3fit.hyper_optimization.pruning import TrialPruner
 import n3fit.hyper_optimization.rewards
+from n3fit.io.checkpoint import load_checkpoint, save_checkpoint
 from n3fit.stopping import Stopping
+from n3fit.stopwatch import StopWatch
 from n3fit.vpinterface import N3PDF
 from validphys.photon.compute import Photon
 
@@ -102,10 +106,12 @@ class ModelTrainer:
         max_cores=None,
         model_file=None,
         sum_rules=None,
+        sum_rules_integration=None,
         parallel_models=1,
         theoryid=None,
         lux_params=None,
         replicas=None,
+        stopwatch=None,
     ):
         """
         Parameters
@@ -136,6 +142,8 @@ class ModelTrainer:
                 whether to save the models
             sum_rules: str
                         whether sum rules should be enabled (All, MSR, VSR, False)
+            sum_rules_integration: dict
+                integration ``method`` and number of ``points`` used to compute the sum rules
             parallel_models: int
                 number of models to fit in parallel
             theoryid: validphys.core.TheoryIDSpec
@@ -144,6 +152,8 @@ class ModelTrainer:
                 dictionary containing the params needed from LuxQED
             replicas_id: list
                 list with the replicas ids to be fitted
+            stopwatch: :py:class:`n3fit.stopwatch.StopWatch`
+                stopwatch in which the time spent in the different phases of the fit is registered
         """
         # Save all input information
         self.exp_info = exp_info
@@ -167,6 +177,9 @@ class ModelTrainer:
         self.theoryid = theoryid
         self.lux_params = lux_params
         self.replicas = replicas
+        if stopwatch is None:
+            stopwatch = StopWatch()
+        self.stopwatch = stopwatch
 
         # Initialise internal variables which define behaviour
         if debug:
@@ -177,7 +190,9 @@ class ModelTrainer:
         self.print_summary = True
         self.mode_hyperopt = False
         self.impose_sumrule = sum_rules
+        self.sum_rules_integration = sum_rules_integration
         self._hyperkeys = None
+        self._pruner = None
         if kfold_parameters is None:
             self.kpartitions = [None]
             self.hyper_threshold = None
@@ -198,6 +213,11 @@ class ModelTrainer:
                 log.warning("No minimization target selected, defaulting to '%s'", hyper_loss)
             log.info("Using '%s' as the target for hyperoptimization", hyper_loss)
             self._hyper_loss = getattr(n3fit.hyper_optimization.rewards, hyper_loss)
+            # Check whether trials can be abandoned before all folds have been fitted
+            pruning = kfold_parameters.get("pruning")
+            if pruning is not None:
+                self._pruner = TrialPruner(**pruning)
+                log.info("Using '%s' pruning of the hyperopt trials", self._pruner.policy)
 
         # Initialize the dictionaries which contain all fitting information
         self.input_list = []
@@ -244,6 +264,14 @@ class ModelTrainer:
         if debug:
             self.callbacks.append(callbacks.TimerCallback())
 
+        # Observable layers, generated once and reused by all trials and folds
+        self._observables = {}
+
+        # Checkpointing options, see ``enable_checkpoint``
+        self._checkpoint_path = None
+        self._checkpoint_freq = None
+        self._resume = False
+
     def set_hyperopt(self, hyperopt_on, keys=None, status_ok="ok"):
         """Set hyperopt options on and off (mostly suppresses some printing)"""
         self.pass_status = status_ok
@@ -481,6 +509,17 @@ class ModelTrainer:
 
         return models
 
+    def _observable_generator(self, spec_dict, **kwargs):
+        """Wrapper around ``model_gen.observable_generator`` which generates the observable
+        only the first time it is requested.
+        The observable layers (which hold the FK tables) and the loss layers are then shared
+        by all hyperopt trials and k-folds, only the PDF model needs to be regenerated.
+        """
+        name = spec_dict["name"]
+        if name not in self._observables:
+            self._observables[name] = model_gen.observable_generator(spec_dict, **kwargs)
+        return self._observables[name]
+
     def _reset_observables(self):
         """
         Resets the 'output' and 'losses' entries of all 3 dictionaries:
@@ -541,7 +580,7 @@ class ModelTrainer:
             if not self.mode_hyperopt:
                 log.info("Generating layers for experiment %s", exp_dict["name"])
 
-            exp_layer = model_gen.observable_generator(exp_dict)
+            exp_layer = self._observable_generator(exp_dict)
 
             # Save the input(s) corresponding to this experiment
             self.input_list.append(exp_layer["inputs"])
@@ -563,13 +602,19 @@ class ModelTrainer:
                 all_pos_initial, all_pos_multiplier, max_lambda, positivity_steps
             )
 
-            pos_layer = model_gen.observable_generator(pos_dict, positivity_initial=pos_initial)
+            pos_layer = self._observable_generator(pos_dict, positivity_initial=pos_initial)
+            pos_layer["output_tr"].multiplier = pos_initial
+            # The validation model needs its own loss layer since the multiplier
+            # is only updated for the training model
+            if "output_vl" not in pos_layer:
+                pos_layer["output_vl"] = dataclasses.replace(pos_layer["output_tr"])
+            pos_layer["output_vl"].multiplier = pos_initial
             # The input list is still common
             self.input_list.append(pos_layer["inputs"])
 
             # The positivity should be on both training and validation models
             self.training["output"].append(pos_layer["output_tr"])
-            self.validation["output"].append(pos_layer["output_tr"])
+            self.validation["output"].append(pos_layer["output_vl"])
 
             self.training["posmultipliers"].append(pos_multiplier)
             self.training["posinitials"].append(pos_initial)
@@ -587,9 +632,10 @@ class ModelTrainer:
                     all_integ_initial, all_integ_multiplier, max_lambda, integrability_steps
                 )
 
-                integ_layer = model_gen.observable_generator(
+                integ_layer = self._observable_generator(
                     integ_dict, positivity_initial=integ_initial, integrability=True
                 )
+                integ_layer["output_tr"].multiplier = integ_initial
                 # The input list is still common
                 self.input_list.append(integ_layer["inputs"])
 
@@ -713,6 +759,7 @@ class ModelTrainer:
             scaler=self._scaler,
             parallel_models=self._parallel_models,
             photons=photons,
+            sumrule_integration=self.sum_rules_integration,
         )
         return pdf_models
 
@@ -737,7 +784,9 @@ class ModelTrainer:
             reporting_list.append(reporting_dict)
         return reporting_list
 
-    def _train_and_fit(self, training_model, stopping_object, epochs=100):
+    def _train_and_fit(
+        self, training_model, stopping_object, epochs=100, initial_epoch=0, pruning_function=None
+    ):
         """
         Trains the NN for the number of epochs given using
         stopping_object as the stopping criteria
@@ -746,6 +795,12 @@ class ModelTrainer:
         respective positivity multipliers.
         In the same way, every ``PUSH_INTEGRABILITY_EACH`` epochs the integrability
         will be multiplied by their respective integrability multipliers
+
+        If checkpointing is enabled, the state of the fit is saved every ``checkpoint_freq`` epochs.
+        The training starts at ``initial_epoch`` (non-zero only when resuming from a checkpoint)
+
+        If a ``pruning_function`` is given, it is called every ``epoch_frequency`` epochs of the
+        pruner and the training is stopped if it returns ``True``
         """
         callback_st = callbacks.StoppingCallback(stopping_object)
         callback_pos = callbacks.LagrangeCallback(
@@ -759,11 +814,32 @@ class ModelTrainer:
             update_freq=PUSH_INTEGRABILITY_EACH,
         )
 
-        training_model.perform_fit(
-            epochs=epochs,
-            verbose=False,
-            callbacks=self.callbacks + [callback_st, callback_pos, callback_integ],
-        )
+        all_callbacks = self.callbacks + [callback_st, callback_pos, callback_integ]
+        if pruning_function is not None:
+            all_callbacks.append(
+                callbacks.PruningCallback(pruning_function, frequency=self._pruner.epoch_frequency)
+            )
+        if self._checkpoint_path is not None and not self.mode_hyperopt:
+            # The checkpoint needs to be the last callback in order to save the
+            # positivity and integrability multipliers after they have been updated
+            checkpoint_function = lambda epoch: save_checkpoint(
+                self._checkpoint_path, epoch, training_model, stopping_object
+            )
+            all_callbacks.append(
+                callbacks.CheckpointCallback(checkpoint_function, frequency=self._checkpoint_freq)
+            )
+
+        with self.stopwatch.span("training", initial_epoch=initial_epoch) as span:
+            training_model.perform_fit(
+                epochs=epochs,
+                initial_epoch=initial_epoch,
+                verbose=False,
+                callbacks=all_callbacks,
+            )
+            span["epochs"] = stopping_object.stop_epoch - initial_epoch
+            span["validation_walltime"] = callback_st.monitoring_time
+        if span["walltime"] > 0:
+            self.stopwatch.record("epochs_per_second", span["epochs"] / span["walltime"])
 
         # TODO: in order to use multireplica in hyperopt is is necessary to define what "passing" means
         # for now consider the run as good if any replica passed
@@ -801,6 +877,23 @@ class ModelTrainer:
         )
         self.callbacks.append(callback_tb)
 
+    def enable_checkpoint(self, checkpoint_path, frequency, resume=False):
+        """Enables the periodic checkpointing of the fit for further runs of the fitting procedure
+        Checkpoints are never saved nor loaded in hyperopt mode.
+
+        Parameters
+        ----------
+            checkpoint_path: Path
+                folder where the checkpoint is saved
+            frequency: int
+                frequency (in epochs) at which the checkpoint is saved
+            resume: bool
+                whether to continue the fit from the checkpoint found in ``checkpoint_path``
+        """
+        self._checkpoint_path = checkpoint_path
+        self._checkpoint_freq = frequency
+        self._resume = resume
+
     def evaluate(self, stopping_object):
         """Returns the training, validation and experimental chi2
 
@@ -862,14 +955,15 @@ class ModelTrainer:
         # when k-folding, these are the same for all folds
         positivity_dict = params.get("positivity", {})
         integrability_dict = params.get("integrability", {})
-        self._generate_observables(
-            positivity_dict.get("multiplier"),
-            positivity_dict.get("initial"),
-            integrability_dict.get("multiplier"),
-            integrability_dict.get("initial"),
-            epochs,
-            params.get("interpolation_points"),
-        )
+        with self.stopwatch.span("observables"):
+            self._generate_observables(
+                positivity_dict.get("multiplier"),
+                positivity_dict.get("initial"),
+                integrability_dict.get("multiplier"),
+                integrability_dict.get("initial"),
+                epochs,
+                params.get("interpolation_points"),
+            )
         threshold_pos = positivity_dict.get("threshold", 1e-6)
         threshold_chi2 = params.get("threshold_chi2", CHI2_THRESHOLD)
 
@@ -885,13 +979,18 @@ class ModelTrainer:
         xinput = self._xgrid_generation()
         # Initialize all photon classes for the different replicas:
         if self.lux_params:
-            photons = Photon(
-                theoryid=self.theoryid,
-                lux_params=self.lux_params,
-                replicas=self.replicas,
-            )
+            with self.stopwatch.span("photon"):
+                photons = Photon(
+                    theoryid=self.theoryid,
+                    lux_params=self.lux_params,
+                    replicas=self.replicas,
+                    max_workers=self.max_cores,
+                )
         else:
             photons = None
+        pruner = self._pruner if self.mode_hyperopt else None
+        if pruner is not None:
+            pruner.start_trial()
         ### Training loop
         for k, partition in enumerate(self.kpartitions):
             # Each partition of the kfolding needs to have its own separate model
@@ -900,27 +999,28 @@ class ModelTrainer:
             if k > 0:
                 seeds = [np.random.randint(0, pow(2, 31)) for _ in seeds]
 
-            # Generate the pdf model
-            pdf_models = self._generate_pdf(
-                params["nodes_per_layer"],
-                params["activation_per_layer"],
-                params["initializer"],
-                params["layer_type"],
-                params["dropout"],
-                params.get("regularizer", None),  # regularizer optional
-                params.get("regularizer_args", None),
-                seeds,
-                photons,
-            )
+            with self.stopwatch.span("model_build", fold=k):
+                # Generate the pdf model
+                pdf_models = self._generate_pdf(
+                    params["nodes_per_layer"],
+                    params["activation_per_layer"],
+                    params["initializer"],
+                    params["layer_type"],
+                    params["dropout"],
+                    params.get("regularizer", None),  # regularizer optional
+                    params.get("regularizer_args", None),
+                    seeds,
+                    photons,
+                )
 
-            if photons:
-                for m in pdf_models:
-                    pl = m.get_layer("add_photon")
-                    pl.register_photon(xinput.input.tensor_content)
+                if photons:
+                    for m in pdf_models:
+                        pl = m.get_layer("add_photon")
+                        pl.register_photon(xinput.input.tensor_content)
 
-            # Model generation joins all the different observable layers
-            # together with pdf model generated above
-            models = self._model_generation(xinput, pdf_models, partition, k)
+                # Model generation joins all the different observable layers
+                # together with pdf model generated above
+                models = self._model_generation(xinput, pdf_models, partition, k)
 
             # Only after model generation, apply possible weight file
             if self.model_file:
@@ -957,13 +1057,29 @@ class ModelTrainer:
             )
 
             # Compile each of the models with the right parameters
-            for model in models.values():
-                model.compile(**params["optimizer"])
+            with self.stopwatch.span("compile", fold=k):
+                for model in models.values():
+                    model.compile(**params["optimizer"])
+
+            # If requested, restore the state of the fit from the last checkpoint
+            initial_epoch = 0
+            if self._resume and not self.mode_hyperopt:
+                initial_epoch = load_checkpoint(
+                    self._checkpoint_path, models["training"], stopping_object
+                )
+
+            pruning_function = None
+            if pruner is not None and pruner.epoch_frequency is not None:
+                # Compare the validation chi2 (averaged over replicas) with previous trials
+                def pruning_function(epoch, fold=k, stopping=stopping_object):
+                    return pruner.prune_epoch(fold, epoch, np.mean(stopping.last_vl_chi2))
 
             passed = self._train_and_fit(
                 models["training"],
                 stopping_object,
                 epochs=epochs,
+                initial_epoch=initial_epoch,
+                pruning_function=pruning_function,
             )
 
             if self.mode_hyperopt:
@@ -997,12 +1113,19 @@ class ModelTrainer:
                 n3pdfs.append(N3PDF(pdf_models, name=f"fold_{k}"))
                 exp_models.append(models["experimental"])
 
+                skip_folds = False
                 if hyper_loss > self.hyper_threshold:
                     log.info(
                         "Loss above threshold (%.1f > %.1f), breaking",
                         hyper_loss,
                         self.hyper_threshold,
                     )
+                    skip_folds = True
+                elif pruner is not None:
+                    # The trial might have been pruned already during the training of the fold
+                    skip_folds = pruner.pruned or pruner.prune_fold(k, hyper_loss)
+
+                if skip_folds:
                     # Apply a penalty proportional to the number of folds not computed
                     pen_mul = len(self.kpartitions) - k
                     l_hyper = [i * pen_mul for i in l_hyper]
@@ -1011,6 +1134,10 @@ class ModelTrainer:
             # endfor
 
         if self.mode_hyperopt:
+            pruned = False
+            if pruner is not None:
+                pruned = pruner.pruned
+                pruner.finish_trial(completed=len(l_hyper) == len(self.kpartitions))
             # Hyperopt needs a dictionary with information about the losses
             # it is possible to store arbitrary information in the trial file
             # by adding it to this dictionary
@@ -1025,6 +1152,7 @@ class ModelTrainer:
                     "validation_losses": l_valid,
                     "experimental_losses": l_exper,
                     "hyper_losses": l_hyper,
+                    "pruned": pruned,
                 },
             }
             return dict_out
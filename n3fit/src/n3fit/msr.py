@@ -1,9 +1,11 @@
 """
     The constraint module include functions to impose the momentum sum rules on the PDFs
 """
+from functools import lru_cache
 import logging
 
 import numpy as np
+from scipy import special
 
 from n3fit.backends import operations as op
 from n3fit.layers import MSR_Normalization, xDivide, xIntegrator
@@ -11,6 +13,17 @@ from n3fit.layers import MSR_Normalization, xDivide, xIntegrator
 log = logging.getLogger(__name__)
 
 
+INTEGRATION_METHODS = ("trapezoid", "gauss-legendre")
+DEFAULT_POINTS = {"trapezoid": int(2e3), "gauss-legendre": 88}
+# Boundaries of the segments of the integration grid, logarithmic below XLIN and linear above
+XMIN = 1e-9
+XLIN = 0.1
+LOG_SEGMENTS = 8
+LIN_SEGMENTS = 3
+# Exponents (a, b) of the functions x^a (1-x)^b used to check the accuracy of the integration
+ACCURACY_TEST_EXPONENTS = ((-0.9, 2.0), (-0.5, 3.0), (-0.2, 5.0), (0.5, 3.0), (1.0, 10.0))
+
+
 def gen_integration_input(nx):
     """
     Generates a np.array (shaped (nx,1)) of nx elements where the
@@ -19,24 +32,111 @@ def gen_integration_input(nx):
     """
     lognx = int(nx / 2)
     linnx = int(nx - lognx)
-    xgrid_log = np.logspace(-9, -1, lognx + 1)
-    xgrid_lin = np.linspace(0.1, 1, linnx)
+    xgrid_log = np.logspace(np.log10(XMIN), np.log10(XLIN), lognx + 1)
+    xgrid_lin = np.linspace(XLIN, 1, linnx)
     xgrid = np.concatenate([xgrid_log[:-1], xgrid_lin]).reshape(nx, 1)
 
-    spacing = [0.0]
-    for i in range(1, nx):
-        spacing.append(np.abs(xgrid[i - 1] - xgrid[i]))
-    spacing.append(0.0)
-
-    weights = []
-    for i in range(nx):
-        weights.append((spacing[i] + spacing[i + 1]) / 2.0)
-    weights_array = np.array(weights).reshape(nx, 1)
+    # trapezoidal weights: half the distance between the neighbours of each point
+    spacing = np.concatenate([[0.0], np.abs(np.diff(xgrid[:, 0])), [0.0]])
+    weights_array = ((spacing[:-1] + spacing[1:]) / 2.0).reshape(nx, 1)
 
     return xgrid, weights_array
 
 
-def msr_impose(nx=int(2e3), mode='All', scaler=None, photons=None):
+def gen_gauss_legendre_input(nx):
+    """
+    Generates a np.array (shaped (n,1)) with the nodes of a Gauss-Legendre quadrature
+    in each of the LOG_SEGMENTS segments equally spaced in log(x) between XMIN and XLIN
+    and each of the LIN_SEGMENTS segments equally spaced in x between XLIN and 1,
+    together with the corresponding weights.
+    The same number of nodes is used in all segments,
+    so that the total number of points n is the multiple of the number of segments closest
+    to nx from below (with at least one node per segment)
+    """
+    nodes, gl_weights = np.polynomial.legendre.leggauss(max(1, nx // (LOG_SEGMENTS + LIN_SEGMENTS)))
+
+    def segment_points(boundaries):
+        # map the nodes in [-1, 1] to each of the segments defined by the boundaries
+        half_width = np.diff(boundaries)[:, np.newaxis] / 2.0
+        center = (boundaries[1:] + boundaries[:-1])[:, np.newaxis] / 2.0
+        return (half_width * nodes + center).ravel(), (half_width * gl_weights).ravel()
+
+    # in the logarithmic segments the integration variable is log(x), so dx = x dlog(x)
+    logx, log_weights = segment_points(np.linspace(np.log(XMIN), np.log(XLIN), LOG_SEGMENTS + 1))
+    xlin, lin_weights = segment_points(np.linspace(XLIN, 1.0, LIN_SEGMENTS + 1))
+    xgrid = np.concatenate([np.exp(logx), xlin])
+    weights = np.concatenate([np.exp(logx) * log_weights, lin_weights])
+    return xgrid.reshape(-1, 1), weights.reshape(-1, 1)
+
+
+@lru_cache
+def _integration_input(method, nx):
+    """Cached version of the generation of the integration grid and weights"""
+    if method == "gauss-legendre":
+        return gen_gauss_legendre_input(nx)
+    return gen_integration_input(nx)
+
+
+def integration_input(method="trapezoid", nx=None):
+    """
+    Returns the integration grid (shaped (n,1)) and its weights (shaped (n,1))
+    for the given integration method, see ``INTEGRATION_METHODS``.
+    If the number of points nx is not given, the default for the method is used.
+    The grids are computed only once per process.
+    """
+    if method not in INTEGRATION_METHODS:
+        raise ValueError(f"Unknown integration method {method}, options are {INTEGRATION_METHODS}")
+    if nx is None:
+        nx = DEFAULT_POINTS[method]
+    xgrid, weights = _integration_input(method, nx)
+    return xgrid.copy(), weights.copy()
+
+
+def integration_accuracy(method="trapezoid", nx=None):
+    """
+    Integrates the functions x^a (1-x)^b for the exponents in ``ACCURACY_TEST_EXPONENTS``
+    with the given integration method and with the default trapezoidal grid
+    and returns the relative errors with respect to the exact result
+    in the range of the grid (XMIN, 1)
+
+    Returns
+    -------
+        report: dict
+            {(a, b): (relative error of the method, relative error of the default grid)}
+    """
+    xgrid, weights = integration_input(method, nx)
+    xgrid_ref, weights_ref = integration_input()
+    report = {}
+    for a, b in ACCURACY_TEST_EXPONENTS:
+        exact = special.beta(a + 1, b + 1) * (1.0 - special.betainc(a + 1, b + 1, XMIN))
+        errors = []
+        for x, w in [(xgrid, weights), (xgrid_ref, weights_ref)]:
+            errors.append(abs(np.sum(w * x**a * (1 - x) ** b) / exact - 1.0))
+        report[(a, b)] = tuple(errors)
+    return report
+
+
+@lru_cache
+def _log_integration_accuracy(method, nx):
+    """Log the accuracy report of the integration method, only once per process"""
+    npoints = len(integration_input(method, nx)[0])
+    log.info(
+        "Sum rules integrated with %s quadrature in %d points, relative errors for x^a (1-x)^b:",
+        method,
+        npoints,
+    )
+    for (a, b), (error, error_ref) in integration_accuracy(method, nx).items():
+        log.info(
+            " > a=%.1f, b=%.1f: %.1e (%.1e with the default %d-point grid)",
+            a,
+            b,
+            error,
+            error_ref,
+            DEFAULT_POINTS["trapezoid"],
+        )
+
+
+def msr_impose(nx=None, mode='All', scaler=None, photons=None, method="trapezoid"):
     """
     This function receives:
     Generates a function that applies a normalization layer to the fit.
@@ -50,7 +150,8 @@ def msr_impose(nx=int(2e3), mode='All', scaler=None, photons=None):
     Parameters
     ----------
         nx: int
-            number of points for the integration grid, default: 2000
+            number of points for the integration grid,
+            default: 2000 for trapezoid and 88 for gauss-legendre
         mode: str
             what sum rules to compute (MSR, VSR or All), default: All
         scaler: scaler
@@ -58,10 +159,14 @@ def msr_impose(nx=int(2e3), mode='All', scaler=None, photons=None):
             will be a (1, None, 2) tensor where dim [:,:,0] is scaled
         photon: :py:class:`validphys.photon.compute.Photon`
             If given, gives the AddPhoton layer a function to compute the MSR component for the photon
+        method: str
+            integration method, see ``INTEGRATION_METHODS``, default: trapezoid
     """
 
     # 1. Generate the fake input which will be used to integrate
-    xgrid, weights_array = gen_integration_input(nx)
+    xgrid, weights_array = integration_input(method, nx)
+    if method != "trapezoid":
+        _log_integration_accuracy(method, nx)
     # 1b If a scaler is provided, scale the input xgrid
     if scaler:
         xgrid = scaler(xgrid)
@@ -70,7 +175,7 @@ def msr_impose(nx=int(2e3), mode='All', scaler=None, photons=None):
     #    for that we need to multiply several flavours with 1/x
     division_by_x = xDivide()
     # 3. Now create the integration layer (the layer that will simply integrate, given some weight
-    integrator = xIntegrator(weights_array, input_shape=(nx,))
+    integrator = xIntegrator(weights_array, input_shape=(len(weights_array),))
 
     # 3.1 If a photon is given, compute the photon component of the MSR
     photons_c = None
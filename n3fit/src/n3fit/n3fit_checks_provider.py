@@ -11,6 +11,8 @@ import n3fit.checks
 @n3fit.checks.wrapper_hyperopt
 @n3fit.checks.check_deprecated_options
 @n3fit.checks.check_consistent_parallel
+@n3fit.checks.check_exportgrid_format
+@n3fit.checks.check_sum_rules_integration
 def n3fit_checks_action(
     *,
     genrep,
@@ -19,6 +21,7 @@ def n3fit_checks_action(
     basis,
     fitbasis,
     sum_rules=True,
+    sum_rules_integration=None,
     parameters,
     save=None,
     load=None,
@@ -26,6 +29,9 @@ def n3fit_checks_action(
     hyperopt=None,
     kfold=None,
     tensorboard=None,
+    checkpoint=None,
+    resume=False,
+    exportgrid_format="yaml",
     parallel_models=False,
     same_trvl_per_replica=False
 ):
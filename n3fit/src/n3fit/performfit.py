@@ -7,9 +7,9 @@ import copy
 import logging
 
 import numpy as np
+import psutil
 
 import n3fit.checks
-from n3fit.vpinterface import N3PDF
 
 log = logging.getLogger(__name__)
 
@@ -30,6 +30,7 @@ def performfit(
     basis,
     fitbasis,
     sum_rules=True,
+    sum_rules_integration=None,
     parameters,
     replica_path,
     output_path,
@@ -37,8 +38,12 @@ def performfit(
     load=None,
     hyperscanner=None,
     hyperopt=None,
+    shared_trials=False,
     kfold_parameters,
     tensorboard=None,
+    checkpoint=None,
+    resume=False,
+    exportgrid_format="yaml",
     debug=False,
     maxcores=None,
     parallel_models=False,
@@ -97,6 +102,9 @@ def performfit(
             be found in :py:mod:`validphys.pdfbases`.
         sum_rules: bool
             Whether to impose sum rules in fit. By default set to True
+        sum_rules_integration: None, dict
+            integration ``method`` (``trapezoid`` or ``gauss-legendre``) and number of ``points``
+            used to compute the sum rules. By default trapezoid in 2000 points.
         parameters: dict
             Mapping containing parameters which define the network
             architecture/fitting methodology.
@@ -113,11 +121,21 @@ def performfit(
             dictionary containing the details of the hyperscanner
         hyperopt: int
             if given, number of hyperopt iterations to run
+        shared_trials: bool
+            whether to share the hyperopt trials with other n3fit processes
+            running the same runcard (in which case ``hyperopt`` is the total number of trials)
         kfold_parameters: None, dict
             dictionary with kfold settings used in hyperopt.
         tensorboard: None, dict
             mapping containing tensorboard settings if it is to be used. By
             default it is None and tensorboard is not enabled.
+        checkpoint: None, dict
+            mapping containing the checkpoint settings (``frequency``) if the state of the
+            fit is to be saved periodically. By default it is None and no checkpoint is saved.
+        resume: bool
+            whether to continue the fit from the last checkpoint saved in the replica folder
+        exportgrid_format: str
+            format of the exportgrid files, ``yaml`` (default) or the binary ``npz``
         debug: bool
             activate some debug options
         maxcores: int
@@ -130,14 +148,18 @@ def performfit(
     # If debug is active, the initial state will be fixed so that the run is reproducible
     set_initial_state(debug=debug, max_cores=maxcores)
 
-    from n3fit.stopwatch import StopWatch
+    from n3fit.stopwatch import StopWatch, write_metrics
 
     stopwatch = StopWatch()
+    # Time spent since the start of the process, which includes the loading of the data
+    setup_walltime = stopwatch.get_times()[1] - psutil.Process().create_time()
 
     # All potentially backend dependent imports should come inside the fit function
     # so they can eventually be set from the runcard
-    from n3fit.io.writer import WriterWrapper
+    from n3fit.backends import get_device_memory_info
+    from n3fit.io.writer import WriterWrapper, exportgrid_values
     from n3fit.model_trainer import ModelTrainer
+    from n3fit.vpinterface import N3PDF
 
     # Note: there are three possible scenarios for the loop of replicas:
     #   1.- Only one replica is being run, in this case the loop is only evaluated once
@@ -185,6 +207,11 @@ def performfit(
             nnseeds = [nnseeds]
             log.info("Starting replica fit %d", replica_idxs[0])
 
+        # The phases of the fit of this (set of) replica(s) are registered in its own watch
+        replica_watch = StopWatch()
+        replica_watch.record("setup_walltime", setup_walltime)
+        replica_watch.record("parallel_models", len(replica_idxs))
+
         # Generate a ModelTrainer object
         # this object holds all necessary information to train a PDF (up to the NN definition)
         the_model_trainer = ModelTrainer(
@@ -199,10 +226,12 @@ def performfit(
             max_cores=maxcores,
             model_file=load,
             sum_rules=sum_rules,
+            sum_rules_integration=sum_rules_integration,
             parallel_models=n_models,
             theoryid=theoryid,
             lux_params=fiatlux,
             replicas=replica_idxs,
+            stopwatch=replica_watch,
         )
 
         # This is just to give a descriptive name to the fit function
@@ -223,8 +252,13 @@ def performfit(
 
             # Note that hyperopt will not run in parallel or with more than one model _for now_
             replica_path_set = replica_path / f"replica_{replica_idxs[0]}"
+            shared_trials_path = replica_path / "shared_trials" if shared_trials else None
             true_best = hyper_scan_wrapper(
-                replica_path_set, the_model_trainer, hyperscanner, max_evals=hyperopt
+                replica_path_set,
+                the_model_trainer,
+                hyperscanner,
+                max_evals=hyperopt,
+                shared_trials_path=shared_trials_path,
             )
             print("##################")
             print("Best model found: ")
@@ -252,6 +286,17 @@ def performfit(
             log_path = replica_path_set / "tboard"
             the_model_trainer.enable_tensorboard(log_path, weight_freq, profiling)
 
+        # Enable the periodic checkpointing of the fit
+        if checkpoint is not None:
+            if parallel_models and n_models != 1:
+                # As for tensorboard, a single checkpoint is saved for all replicas
+                checkpoint_path = replica_path
+            else:
+                checkpoint_path = replica_path / f"replica_{replica_idxs[0]}"
+            the_model_trainer.enable_checkpoint(
+                checkpoint_path, checkpoint.get("frequency", 1000), resume=resume
+            )
+
         #############################################################################
         # ### Fit                                                                   #
         # This function performs the actual fit, it reads all the parameters in the #
@@ -264,49 +309,63 @@ def performfit(
         log.info("Stopped at epoch=%d", stopping_object.stop_epoch)
 
         final_time = stopwatch.stop()
-        all_training_chi2, all_val_chi2, all_exp_chi2 = the_model_trainer.evaluate(stopping_object)
-
-        pdf_models = result["pdf_models"]
-        for i, (replica_number, pdf_model) in enumerate(zip(replica_idxs, pdf_models)):
-            # Each model goes into its own replica folder
-            replica_path_set = replica_path / f"replica_{replica_number}"
-
-            # Create a pdf instance
-            q0 = theoryid.get_description().get("Q0")
-            pdf_instance = N3PDF(pdf_model, fit_basis=basis, Q=q0)
-
-            # Generate the writer wrapper
-            writer_wrapper = WriterWrapper(
-                replica_number,
-                pdf_instance,
-                stopping_object,
-                q0**2,
-                final_time,
-            )
-
-            # Get the right chi2s
-            training_chi2 = np.take(all_training_chi2, i)
-            val_chi2 = np.take(all_val_chi2, i)
-            exp_chi2 = np.take(all_exp_chi2, i)
-
-            # And write the data down
-            writer_wrapper.write_data(
-                replica_path_set, output_path.name, training_chi2, val_chi2, exp_chi2
-            )
-            log.info(
-                "Best fit for replica #%d, chi2=%.3f (tr=%.3f, vl=%.3f)",
-                replica_number,
-                exp_chi2,
-                training_chi2,
-                val_chi2,
+        with replica_watch.span("evaluate"):
+            all_training_chi2, all_val_chi2, all_exp_chi2 = the_model_trainer.evaluate(
+                stopping_object
             )
 
-            # Save the weights to some file for the given replica
-            if save:
-                model_file_path = replica_path_set / save
-                log.info(" > Saving the weights for future in %s", model_file_path)
-                # Need to use "str" here because TF 2.2 has a bug for paths objects (fixed in 2.3)
-                pdf_model.save_weights(str(model_file_path), save_format="h5")
+        pdf_models = result["pdf_models"]
+        q0 = theoryid.get_description().get("Q0")
+        with replica_watch.span("export"):
+            # Evaluate the export grid of all replicas at once
+            all_lha_grids = exportgrid_values(N3PDF(pdf_models, fit_basis=basis, Q=q0))
+            for i, (replica_number, pdf_model) in enumerate(zip(replica_idxs, pdf_models)):
+                # Each model goes into its own replica folder
+                replica_path_set = replica_path / f"replica_{replica_number}"
+
+                # Create a pdf instance
+                pdf_instance = N3PDF(pdf_model, fit_basis=basis, Q=q0)
+
+                # Generate the writer wrapper
+                writer_wrapper = WriterWrapper(
+                    replica_number,
+                    pdf_instance,
+                    stopping_object,
+                    q0**2,
+                    final_time,
+                    lha_grid=all_lha_grids[i],
+                    exportgrid_format=exportgrid_format,
+                )
+
+                # Get the right chi2s
+                training_chi2 = np.take(all_training_chi2, i)
+                val_chi2 = np.take(all_val_chi2, i)
+                exp_chi2 = np.take(all_exp_chi2, i)
+
+                # And write the data down
+                writer_wrapper.write_data(
+                    replica_path_set, output_path.name, training_chi2, val_chi2, exp_chi2
+                )
+                log.info(
+                    "Best fit for replica #%d, chi2=%.3f (tr=%.3f, vl=%.3f)",
+                    replica_number,
+                    exp_chi2,
+                    training_chi2,
+                    val_chi2,
+                )
+
+                # Save the weights to some file for the given replica
+                if save:
+                    model_file_path = replica_path_set / save
+                    log.info(" > Saving the weights for future in %s", model_file_path)
+                    # Need to use "str" here because TF 2.2 has a bug for paths (fixed in 2.3)
+                    pdf_model.save_weights(str(model_file_path), save_format="h5")
+
+        # Write down the time and memory spent in the different phases of the fit
+        replica_watch.record("device_memory", get_device_memory_info())
+        metrics = replica_watch.metrics()
+        for replica_number in replica_idxs:
+            write_metrics(replica_path / f"replica_{replica_number}", metrics)
 
         if tensorboard is not None:
             log.info("Tensorboard logging information is stored at %s", log_path)
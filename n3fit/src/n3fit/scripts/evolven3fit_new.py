@@ -79,6 +79,15 @@ def construct_evolven3fit_parser(subparsers):
         action="store_true",
         help="Force the evolution to be done even if it has already been done",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes used to read, evolve and write the replicas. "
+        "With more than one process all the operators of the eko are written to a temporary "
+        "operators.npy file inside the fit folder, which needs several GB of free disk there",
+    )
     return parser
 
 
@@ -129,6 +138,7 @@ def main():
             args.dump,
             args.load,
             args.force,
+            args.jobs,
         )
     elif args.actions == "produce_eko":
         stdout_log = logging.StreamHandler(sys.stdout)
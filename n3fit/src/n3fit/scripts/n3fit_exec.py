@@ -98,6 +98,8 @@ class N3FitEnvironment(Environment):
             "replica_path": "The replica output path",
             "output_path": "The runcard name",
             "hyperopt": "The hyperopt flag",
+            "resume": "Whether to resume the fit from the last checkpoint",
+            "shared_trials": "Whether to share the hyperopt trials with other processes",
             **super().ns_dump_description(),
         }
 
@@ -149,6 +151,7 @@ class N3FitConfig(Config):
             N3FIT_FIXED_CONFIG['fiatlux'] = thconfig
         else:
             N3FIT_FIXED_CONFIG['fiatlux'] = None
+        N3FIT_FIXED_CONFIG['use_training_bundle'] = file_content.get('training_bundle', False)
         # Theorycovmat flags and defaults
         N3FIT_FIXED_CONFIG['theory_covmat_flag'] = False
         N3FIT_FIXED_CONFIG['use_thcovmat_in_fitting'] = False
@@ -258,6 +261,16 @@ class N3FitApp(App):
             return ivalue
 
         parser.add_argument("--hyperopt", help="Enable hyperopt scan", default=None, type=int)
+        parser.add_argument(
+            "--shared-trials",
+            help="Share the hyperopt trials with all n3fit processes running the same runcard",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--resume",
+            help="Resume the fit from the last checkpoint found in the replica folder",
+            action="store_true",
+        )
         parser.add_argument("replica", help="MC replica number", type=check_positive)
         parser.add_argument(
             "-r",
@@ -283,6 +296,8 @@ class N3FitApp(App):
                 replicas = [replica]
             self.environment.replicas = NSList(replicas, nskey="replica")
             self.environment.hyperopt = self.args["hyperopt"]
+            self.environment.resume = self.args["resume"]
+            self.environment.shared_trials = self.args["shared_trials"]
             super().run()
         except N3FitError as e:
             log.error(f"Error in n3fit:\n{e}")
@@ -0,0 +1,204 @@
+"""
+n3fit_farm.py
+
+Runs a range of replicas of a fit in a single node.
+
+The replicas are put in a work queue which is consumed by ``--jobs`` workers.
+Each worker owns a disjoint set of cpus: the ``n3fit`` processes it runs are pinned to them
+and the number of threads of the backend is limited accordingly,
+so that the replicas do not compete for the cores of the node.
+The output is the usual ``nnfit/replica_N`` folders of the fit
+while the output of each ``n3fit`` process is saved to ``farm_logs/replica_N.log``.
+
+In order for the data to be loaded only once, ``vp-setupfit`` should be run with
+``training_bundle: true`` in the runcard (optionally from this script with ``--setupfit``),
+so that every replica reads the memory-mapped training bundle.
+If ``training_bundle_store`` is also set, the bundle is published to that node-local folder
+before the replicas start and removed once all of them have finished.
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import pathlib
+import queue
+import shutil
+import subprocess
+import sys
+
+from reportengine.compat import yaml
+
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s]: %(message)s")
+log = logging.getLogger(__name__)
+
+FARM_LOG_FOLDER = "farm_logs"
+TRAINING_BUNDLE = "filter/training_bundle"
+
+
+def available_cpus():
+    """Returns the list of cpus this process is allowed to run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count()))
+
+
+def split_cpus(cpus, jobs, threads=None):
+    """Split the list of ``cpus`` in ``jobs`` disjoint sets of ``threads`` cpus each.
+    If ``threads`` is not given, all cpus are distributed among the jobs.
+
+    Example
+    -------
+    >>> split_cpus(list(range(8)), 3)
+    [[0, 1], [2, 3], [4, 5]]
+    """
+    if threads is None:
+        threads = len(cpus) // jobs
+    if threads < 1 or jobs * threads > len(cpus):
+        raise ValueError(f"Cannot run {jobs} jobs with {threads} threads each in {len(cpus)} cpus")
+    return [cpus[i * threads : (i + 1) * threads] for i in range(jobs)]
+
+
+def n3fit_command(runcard, replica, output=None):
+    """Returns the command which runs ``n3fit`` for the given ``replica``"""
+    command = [sys.executable, "-m", "n3fit.scripts.n3fit_exec", str(runcard), str(replica)]
+    if output is not None:
+        command += ["-o", str(output)]
+    return command
+
+
+def run_pinned(command, cpus, log_file):
+    """Run ``command`` restricted to the given ``cpus``, with the number of threads
+    of OpenMP/TensorFlow limited to the number of cpus and the output saved to ``log_file``.
+    Returns the exit code of the command"""
+    env = dict(os.environ, OMP_NUM_THREADS=str(len(cpus)))
+    if hasattr(os, "sched_setaffinity"):
+        pin = lambda: os.sched_setaffinity(0, cpus)
+    else:
+        pin = None
+    with open(log_file, "w") as f:
+        process = subprocess.run(
+            command, stdout=f, stderr=subprocess.STDOUT, env=env, preexec_fn=pin
+        )
+    return process.returncode
+
+
+def farm(replicas, cpu_sets, make_command, log_folder):
+    """Run the command returned by ``make_command(replica)`` for every replica,
+    with as many workers as ``cpu_sets``, each of them pinned to its own set of cpus.
+
+    Returns
+    -------
+        dict
+            exit code of every replica
+    """
+    log_folder = pathlib.Path(log_folder)
+    log_folder.mkdir(parents=True, exist_ok=True)
+    work_queue = queue.SimpleQueue()
+    for replica in replicas:
+        work_queue.put(replica)
+    results = {}
+
+    def worker(cpus):
+        while True:
+            try:
+                replica = work_queue.get_nowait()
+            except queue.Empty:
+                return
+            log.info("Starting replica %d in cpus %s", replica, cpus)
+            log_file = log_folder / f"replica_{replica}.log"
+            results[replica] = run_pinned(make_command(replica), cpus, log_file)
+            if results[replica] == 0:
+                log.info("Replica %d finished", replica)
+            else:
+                log.error("Replica %d failed, see %s", replica, log_file)
+
+    with ThreadPoolExecutor(len(cpu_sets)) as executor:
+        # Consume the iterator so that exceptions are raised
+        list(executor.map(worker, cpu_sets))
+    return results
+
+
+def main():
+    parser = ArgumentParser(
+        description="n3fit-farm - run the replicas of a fit in parallel in a single node"
+    )
+    parser.add_argument("runcard", type=pathlib.Path, help="Runcard of the fit")
+    parser.add_argument("replica", type=int, help="First replica to fit")
+    parser.add_argument("-r", "--replica_range", type=int, default=None, help="Last replica to fit")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of replicas to fit simultaneously (defaults to the number of cpus / threads)",
+    )
+    parser.add_argument(
+        "-t", "--threads", type=int, default=1, help="Number of cpus given to each replica"
+    )
+    parser.add_argument(
+        "-o", "--output", type=pathlib.Path, default=None, help="Output folder of the fit"
+    )
+    parser.add_argument(
+        "--setupfit", action="store_true", help="Run vp-setupfit before fitting the replicas"
+    )
+    args = parser.parse_args()
+
+    runcard = args.runcard.absolute()
+    output = args.output if args.output is not None else pathlib.Path(runcard.stem)
+    output = output.absolute()
+    last_replica = args.replica if args.replica_range is None else args.replica_range
+    replicas = list(range(args.replica, last_replica + 1))
+
+    cpus = available_cpus()
+    jobs = args.jobs if args.jobs is not None else max(len(cpus) // args.threads, 1)
+    jobs = min(jobs, len(replicas))
+    try:
+        cpu_sets = split_cpus(cpus, jobs, args.threads)
+    except ValueError as e:
+        log.error(e)
+        sys.exit(1)
+
+    if args.setupfit:
+        log.info("Running vp-setupfit")
+        setupfit = [sys.executable, "-m", "n3fit.scripts.vp_setupfit", str(runcard)]
+        if subprocess.run(setupfit + ["-o", str(output)]).returncode != 0:
+            log.error("vp-setupfit failed")
+            sys.exit(1)
+
+    with open(runcard) as f:
+        runcard_content = yaml.safe_load(f, version="1.1")
+    published = None
+    if not runcard_content.get("training_bundle", False):
+        log.warning(
+            "`training_bundle` is not set in the runcard, every replica will load the data itself"
+        )
+    elif not (output / TRAINING_BUNDLE).is_dir():
+        log.error("No training bundle found in %s, run vp-setupfit first", output)
+        sys.exit(1)
+    elif (store := runcard_content.get("training_bundle_store")) is not None:
+        from validphys.n3fit_data_utils import TrainingBundleError, publish_training_bundle
+
+        try:
+            published = publish_training_bundle(output / TRAINING_BUNDLE, store)
+        except TrainingBundleError as e:
+            log.error(e)
+            sys.exit(1)
+        log.info("Training bundle published at %s", published)
+
+    log.info("Fitting %d replicas with %d workers of %d cpus", len(replicas), jobs, args.threads)
+    make_command = lambda replica: n3fit_command(runcard, replica, output)
+    try:
+        results = farm(replicas, cpu_sets, make_command, output / FARM_LOG_FOLDER)
+    finally:
+        if published is not None:
+            shutil.rmtree(published, ignore_errors=True)
+
+    failed = sorted(replica for replica, code in results.items() if code != 0)
+    if failed:
+        log.error("The following replicas failed: %s", failed)
+        sys.exit(1)
+    log.info("All replicas finished successfully")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+n3fit_metrics.py
+
+Collects the time and memory metrics written by ``n3fit`` in every replica folder of a fit
+(see :py:mod:`n3fit.stopwatch`) and prints a summary per phase of the fit.
+"""
+from argparse import ArgumentParser
+import logging
+import pathlib
+import sys
+
+from n3fit.stopwatch import aggregate_metrics
+
+logging.basicConfig(level=logging.INFO)
+log = logging.getLogger(__name__)
+
+
+def summarize_spans(spans):
+    """Return the statistics of the walltime and cputime spent in each phase of the fit,
+    the phases which happen more than once per replica (e.g., ``training`` in a k-folding)
+    are summed up per replica first"""
+    per_replica = spans.groupby(["name", "replica"], sort=False)[["walltime", "cputime"]].sum()
+    return per_replica.groupby(level="name", sort=False).agg(["mean", "std", "min", "max"])
+
+
+def main():
+    parser = ArgumentParser(
+        description="n3fit-metrics - summary of the time and memory spent by the replicas of a fit"
+    )
+    parser.add_argument("fit_folder", type=pathlib.Path, help="Path to the folder of the fit")
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=pathlib.Path,
+        default=None,
+        help="Folder where to save the spans and metrics of all replicas as csv files",
+    )
+    args = parser.parse_args()
+
+    try:
+        spans, metrics = aggregate_metrics(args.fit_folder)
+    except FileNotFoundError as e:
+        log.error(e)
+        sys.exit(1)
+
+    print(f"Phases of the fit ({spans['replica'].nunique()} replicas):")
+    print(summarize_spans(spans).to_string(float_format="{:.2f}".format))
+    print("\nMetrics:")
+    print(metrics.describe().T.to_string(float_format="{:.2f}".format))
+
+    if args.output is not None:
+        args.output.mkdir(parents=True, exist_ok=True)
+        spans.to_csv(args.output / "spans.csv", index=False)
+        metrics.to_csv(args.output / "metrics.csv")
+        log.info("Metrics of all replicas saved to %s", args.output)
+
+
+if __name__ == "__main__":
+    main()
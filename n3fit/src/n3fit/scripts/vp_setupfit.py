@@ -50,6 +50,7 @@ SETUPFIT_PROVIDERS = [
     'validphys.theorycovariance.construction',
     'validphys.results',
     'validphys.covmats',
+    'validphys.n3fit_data',
     'n3fit.n3fit_checks_provider',
 ]
 
@@ -163,6 +164,12 @@ class SetupFitConfig(Config):
             SETUPFIT_FIXED_CONFIG['actions_'].append('fiatlux check_luxset')
             if file_content.get('fiatlux')["additional_errors"]:
                 SETUPFIT_FIXED_CONFIG['actions_'].append('fiatlux check_additional_errors')
+        if file_content.get('training_bundle', False):
+            if file_content.get('closuretest') is not None:
+                raise ConfigError("`training_bundle` is not supported for closure tests")
+            # the fit always uses the t0 covmat
+            SETUPFIT_FIXED_CONFIG['use_t0'] = True
+            SETUPFIT_FIXED_CONFIG['actions_'].append('datacuts::theory::fitting training_bundle')
         for k, v in SETUPFIT_DEFAULTS.items():
             file_content.setdefault(k, v)
         file_content.update(SETUPFIT_FIXED_CONFIG)
@@ -214,3 +221,7 @@ class SetupFitApp(App):
 def main():
     a = SetupFitApp()
     a.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -296,6 +296,23 @@ class ReplicaState:
             self._pdf_model.trainable = False
             self._stop_epoch = epoch
 
+    def checkpoint_state(self):
+        """ Return a picklable dictionary with the internal state of this replica """
+        return {
+            "weights": self._weights,
+            "best_epoch": self._best_epoch,
+            "stop_epoch": self._stop_epoch,
+            "best_vl_chi2": self._best_vl_chi2,
+        }
+
+    def restore_state(self, state):
+        """ Restore the internal state of this replica from the output of ``checkpoint_state`` """
+        self._weights = state["weights"]
+        self._best_epoch = state["best_epoch"]
+        self._best_vl_chi2 = state["best_vl_chi2"]
+        if state["stop_epoch"] is not None:
+            self.stop_training(state["stop_epoch"])
+
 
 class FitHistory:
     """
@@ -396,6 +413,22 @@ class FitHistory:
             replica.stop_training(self.final_epoch)
             replica.reload()
 
+    def checkpoint_state(self):
+        """Return a picklable dictionary with the full history of the fit
+        and the state of all replicas"""
+        return {
+            "history": [(i.training, i.validation) for i in self._history],
+            "final_epoch": self.final_epoch,
+            "replicas": [i.checkpoint_state() for i in self._replicas],
+        }
+
+    def restore_state(self, state):
+        """ Restore the history of the fit from the output of ``checkpoint_state`` """
+        self._history = [FitState(tr, vl) for tr, vl in state["history"]]
+        self.final_epoch = state["final_epoch"]
+        for replica, replica_state in zip(self._replicas, state["replicas"]):
+            replica.restore_state(replica_state)
+
     def __next__(self):
         return next(self._iter_replicas)
 
@@ -466,6 +499,11 @@ class Stopping:
         fitstate = FitState(None, validation_info)
         return fitstate.vl_chi2
 
+    @property
+    def last_vl_chi2(self):
+        """ Validation chi2 of the last registered epoch (without recomputing it) """
+        return self._history.get_state(self._history.final_epoch).vl_chi2
+
     @property
     def e_best_chi2(self):
         """ Epoch of the best chi2, if there is no best epoch, return last"""
@@ -566,6 +604,22 @@ class Stopping:
             self.make_stop()
         return True
 
+    def checkpoint_state(self):
+        """Return a picklable dictionary with all the information necessary
+        to continue the stopping algorithm from the current epoch"""
+        return {
+            "history": self._history.checkpoint_state(),
+            "stopping_degree": self.stopping_degree.copy(),
+            "count": self.count.copy(),
+        }
+
+    def restore_state(self, state):
+        """Restore the stopping algorithm to the point in which
+        ``checkpoint_state`` was called"""
+        self._history.restore_state(state["history"])
+        self.stopping_degree = state["stopping_degree"]
+        self.count = state["count"]
+
     def make_stop(self):
         """Convenience method to set the stop_now flag
         and reload the history to the point of the best model if any
@@ -1,9 +1,26 @@
 """
     StopWatch module for computing the time performance of n3fit
+
+    Besides the tagged times saved in the ``.json`` file of each replica, the StopWatch
+    records named spans for the different phases of the fit and arbitrary metrics
+    (epochs per second, memory usage, etc). These are written to the replica folder
+    with :py:func:`write_metrics` and can be collected for a whole fit with
+    :py:func:`aggregate_metrics`.
 """
 
+import contextlib
+import csv
+import json
+import pathlib
+import resource
+import sys
 import time
 
+import pandas as pd
+
+METRICS_JSON = "metrics.json"
+METRICS_CSV = "metrics.csv"
+
 
 def get_time():
     """ Returns the cputime and walltime
@@ -13,6 +30,15 @@ def get_time():
     return cpu_time, wall_time
 
 
+def peak_rss():
+    """ Returns the peak resident set size of the process in MB """
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is given in bytes in macOS and in kilobytes in linux
+    if sys.platform == "darwin":
+        return maxrss / 1024**2
+    return maxrss / 1024
+
+
 class StopWatch:
     """
         This class works as a stopwatch, upon initialization it will register
@@ -22,6 +48,10 @@ class StopWatch:
         When the stopwatchn is stopped (with the `.stop()` method) it will generate
         two dictionaries with the relative times between every register time and the
         starting point.
+
+        Phases of the fit can be timed with the `.span(tag)` context manager
+        and other quantities saved with `.record(key, value)`, all of them
+        are returned by the `.metrics()` method.
     """
 
     start_key = "start"
@@ -30,6 +60,8 @@ class StopWatch:
         self._cputimes = {}
         self._walltimes = {}
         self.reference_list = []
+        self._spans = []
+        self._metrics = {}
         self.register_times(self.start_key)
 
     def get_times(self, tag=None):
@@ -94,3 +126,78 @@ class StopWatch:
         """
         self.register_times(tag)
         self.reference_list.append((tag, reference))
+
+    @contextlib.contextmanager
+    def span(self, tag, **info):
+        """ Context manager which registers the cpu and wall time spent inside it
+        as a span named `tag`. Any keyword argument is saved together with the span.
+
+        The record of the span is yielded so that it can be completed with
+        information only known within the context and, after exiting the context,
+        it contains the `start` (relative to the start of the watch),
+        `walltime` and `cputime` of the span
+        """
+        start_cpu, start_wall = get_time()
+        record = {"name": tag, **info}
+        try:
+            yield record
+        finally:
+            end_cpu, end_wall = get_time()
+            record["start"] = start_wall - self._walltimes[self.start_key]
+            record["walltime"] = end_wall - start_wall
+            record["cputime"] = end_cpu - start_cpu
+            self._spans.append(record)
+
+    def record(self, key, value):
+        """ Save a metric named `key`, if it already exists it is overwritten """
+        self._metrics[key] = value
+
+    def metrics(self):
+        """ Return a dictionary with the list of `spans` and the
+        `metrics` registered so far, including the peak memory of the process """
+        return {
+            "spans": [dict(i) for i in self._spans],
+            "metrics": {**self._metrics, "peak_rss_mb": peak_rss()},
+        }
+
+
+def write_metrics(folder, metrics):
+    """ Write the output of `StopWatch.metrics` to the given folder
+    as a ``.json`` file and the spans as a ``.csv`` file (one row per span) """
+    folder = pathlib.Path(folder)
+    with open(folder / METRICS_JSON, "w") as f:
+        json.dump(metrics, f, indent=2, default=float)
+    fieldnames = {}
+    for span in metrics["spans"]:
+        fieldnames.update(dict.fromkeys(span))
+    with open(folder / METRICS_CSV, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(fieldnames))
+        writer.writeheader()
+        writer.writerows(metrics["spans"])
+
+
+def aggregate_metrics(fit_folder):
+    """ Collect the metrics written by every replica of the fit in `fit_folder`
+
+    Returns
+    -------
+        spans: pd.DataFrame
+            all spans of all replicas, with the replica as the first column
+        metrics: pd.DataFrame
+            metrics of all replicas, indexed by replica
+    """
+    all_spans = []
+    all_metrics = {}
+    replica_folders = pathlib.Path(fit_folder).glob(f"nnfit/replica_*/{METRICS_JSON}")
+    for metrics_file in sorted(replica_folders, key=lambda p: int(p.parent.name.split("_")[1])):
+        replica = int(metrics_file.parent.name.split("_")[1])
+        with open(metrics_file) as f:
+            replica_metrics = json.load(f)
+        all_spans += [{"replica": replica, **i} for i in replica_metrics["spans"]]
+        all_metrics[replica] = replica_metrics["metrics"]
+    if not all_metrics:
+        raise FileNotFoundError(f"No {METRICS_JSON} files found in {fit_folder}/nnfit")
+    spans = pd.DataFrame(all_spans)
+    metrics = pd.json_normalize(list(all_metrics.values()))
+    metrics.index = pd.Index(list(all_metrics), name="replica")
+    return spans, metrics
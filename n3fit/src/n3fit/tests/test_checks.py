@@ -125,6 +125,15 @@ def test_check_kfold_options():
     params = {"penalties": ["Fake_penalty_doesnt_exists"]}
     with pytest.raises(CheckError):
         checks.check_kfold_options(params)
+    for pruning in [
+        {"policy": "not_a_policy"},
+        {"policy": "median", "factor": -1.0},
+        {"policy": "threshold", "min_trials": 0},
+        {"epoch_frequency": 0},
+        {"not_an_option": 1},
+    ]:
+        with pytest.raises(CheckError):
+            checks.check_kfold_options({"pruning": pruning})
 
 
 def test_check_hyperopt_stopping():
@@ -3,7 +3,8 @@ import logging
 from numpy.testing import assert_allclose
 import numpy as np
 from validphys.pdfbases import PIDS_DICT
-from evolven3fit_new import utils, eko_utils
+from evolven3fit_new import utils, eko_utils, evolve
+from n3fit.io.writer import XGRID, storefit
 from eko import EKO, runner
 
 REGRESSION_FOLDER = pathlib.Path(__file__).with_name("regressions")
@@ -80,3 +81,96 @@ def test_eko_utils(tmp_path):
     eko_op = EKO.read(save_path)
     assert_allclose(eko_op.operator_card.raw["xgrid"], x_grid)
     assert_allclose(list(eko_op.operator_card.raw["mugrid"]), op_card_dict["mugrid"])
+
+
+def test_load_fit(tmp_path):
+    """Check that the yaml and binary exportgrid formats are read back equally"""
+    grids = {}
+    for replica, exportgrid_format in enumerate(["yaml", "npz", "npz"], start=1):
+        replica_path = tmp_path / "nnfit" / f"replica_{replica}"
+        replica_path.mkdir(parents=True)
+        grids[replica] = np.random.rand(len(XGRID), 14)
+        storefit(
+            None,
+            replica,
+            replica_path,
+            "test_fit",
+            1.65**2,
+            lha_grid=grids[replica],
+            exportgrid_format=exportgrid_format,
+        )
+    pdf_dict = evolve.load_fit(tmp_path, max_workers=2)
+    assert len(pdf_dict) == 3
+    serial_dict = evolve.load_fit(tmp_path)
+    assert serial_dict.keys() == pdf_dict.keys()
+    for replica, grid in grids.items():
+        data = pdf_dict[f"replica_{replica}"]
+        assert data["replica"] == replica
+        assert_allclose(data["q20"], 1.65**2)
+        assert_allclose(data["xgrid"], XGRID)
+        assert_allclose(data["pdfgrid"], grid)
+        assert data["labels"][-1] == "PHT"
+
+
+def test_evolve_exportgrids(tmp_path):
+    # Evolving all replicas at once should be equivalent to evolving them one by one
+    x_grid = [1.0e-3, 1.0e-2, 0.1, 0.5, 1.0]
+    t_card, op_card = eko_utils.construct_eko_cards(
+        162,
+        100,
+        5,
+        x_grid,
+        op_card_dict={"configs": {"interpolation_polynomial_degree": 2}},
+        theory_card_dict={},
+    )
+    save_path = tmp_path / "ekotest.tar"
+    runner.solve(t_card, op_card, save_path)
+    rng = np.random.default_rng(seed=42)
+    exportgrids = [
+        {"q20": 1.65**2, "pdfgrid": rng.random((len(x_grid), len(PIDS_DICT)))} for _ in range(3)
+    ]
+    with EKO.read(save_path) as eko_op:
+        blocks = evolve.evolve_exportgrids(exportgrids, eko_op, x_grid)
+        # The operators saved to disk and memory mapped give the same result
+        evolve.EvolutionOperators.from_eko(eko_op, tmp_path)
+        saved_blocks = evolve.evolve_exportgrids(
+            exportgrids, evolve.EvolutionOperators.load(tmp_path), x_grid
+        )
+        for block, saved_block in zip(blocks, saved_blocks):
+            assert_allclose(block["data"], saved_block["data"])
+        for exportgrid, block in zip(exportgrids, blocks):
+            ref_block = evolve.evolve_exportgrid(exportgrid, eko_op, x_grid, False)
+            assert_allclose(block["mu2grid"], ref_block["mu2grid"])
+            assert_allclose(block["xgrid"], ref_block["xgrid"])
+            assert list(block["pids"]) == list(ref_block["pids"])
+            assert_allclose(block["data"], ref_block["data"])
+
+
+def test_reshaped_eko(tmp_path):
+    x_grid = [1.0e-3, 0.1, 1.0]
+    t_card, op_card = eko_utils.construct_eko_cards(
+        162,
+        100,
+        5,
+        x_grid,
+        op_card_dict={"configs": {"interpolation_polynomial_degree": 2}},
+        theory_card_dict={},
+    )
+    eko_path = tmp_path / "ekotest.tar"
+    runner.solve(t_card, op_card, eko_path)
+    cache_path = tmp_path / "cache"
+    # An eko already defined on the grid is used as it is
+    assert eko_utils.reshaped_eko(162, eko_path, x_grid, cache_path=cache_path) == eko_path
+    # Otherwise it is reshaped only once, without touching the original eko
+    original_content = eko_path.read_bytes()
+    new_grid = [1.0e-3, 1.0e-2, 0.1, 1.0]
+    reshaped_path = eko_utils.reshaped_eko(162, eko_path, new_grid, cache_path=cache_path)
+    assert reshaped_path.parent == cache_path
+    assert eko_path.read_bytes() == original_content
+    with EKO.read(reshaped_path) as eko_op:
+        assert_allclose(eko_op.bases.inputgrid.raw, new_grid)
+        assert_allclose(eko_op.bases.targetgrid.raw, new_grid)
+    mtime = reshaped_path.stat().st_mtime_ns
+    assert eko_utils.reshaped_eko(162, eko_path, new_grid, cache_path=cache_path) == reshaped_path
+    assert reshaped_path.stat().st_mtime_ns == mtime
+    assert len(list(cache_path.iterdir())) == 1
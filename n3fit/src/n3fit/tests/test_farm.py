@@ -0,0 +1,37 @@
+"""
+Tests for the scheduling of the replicas in n3fit-farm
+"""
+import os
+import sys
+
+import pytest
+
+from n3fit.scripts.n3fit_farm import available_cpus, farm, split_cpus
+
+
+def test_split_cpus():
+    assert split_cpus(list(range(8)), 3) == [[0, 1], [2, 3], [4, 5]]
+    assert split_cpus(list(range(8)), 2, threads=3) == [[0, 1, 2], [3, 4, 5]]
+    with pytest.raises(ValueError):
+        split_cpus(list(range(4)), 3, threads=2)
+
+
+def test_farm(tmp_path):
+    """Run a few fake replicas and check that each of them runs in the cpus of its worker"""
+    cpus = available_cpus()
+    cpu_sets = split_cpus(cpus, min(2, len(cpus)))
+    # The affinity cannot be queried in every platform (e.g., macOS)
+    code = (
+        "import os; "
+        "cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else None; "
+        "print(cpus, os.environ['OMP_NUM_THREADS'])"
+    )
+    make_command = lambda replica: [sys.executable, "-c", code if replica != 3 else "exit(1)"]
+    results = farm([1, 2, 3, 4], cpu_sets, make_command, tmp_path)
+    assert results == {1: 0, 2: 0, 3: 1, 4: 0}
+    for replica in (1, 2, 4):
+        output = (tmp_path / f"replica_{replica}.log").read_text()
+        if hasattr(os, "sched_getaffinity"):
+            assert any(output.startswith(f"{cpu_set} {len(cpu_set)}") for cpu_set in cpu_sets)
+        else:
+            assert any(output.startswith(f"None {len(cpu_set)}") for cpu_set in cpu_sets)
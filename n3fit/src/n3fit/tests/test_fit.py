@@ -111,6 +111,28 @@ def test_performfit_and_timing(tmp_path):
     auxiliary_performfit(tmp_path, replica=2, timing=True)
 
 
+@pytest.mark.linux
+def test_resume_from_checkpoint(tmp_path):
+    """Fits quickcard saving checkpoints and then resumes the fit from the last checkpoint,
+    checks that the resumed fit reaches the same result as the uninterrupted one"""
+    quickcard = f"{QUICKNAME}.yml"
+    quickpath = REGRESSION_FOLDER / quickcard
+    weightpath = REGRESSION_FOLDER / f"weights_{REPLICA}.h5"
+    shutil.copy(weightpath, tmp_path / "weights.h5")
+    runcard = quickpath.read_text(encoding="utf-8") + "\ncheckpoint:\n  frequency: 200\n"
+    (tmp_path / quickcard).write_text(runcard, encoding="utf-8")
+    full_json = tmp_path / f"{QUICKNAME}/nnfit/replica_{REPLICA}/{QUICKNAME}.json"
+    sp.run(f"{EXE} {quickcard} {REPLICA}".split(), cwd=tmp_path, check=True)
+    assert (full_json.parent / "checkpoint").is_dir()
+    original_json = load_data(full_json)
+    sp.run(f"{EXE} {quickcard} {REPLICA} --resume".split(), cwd=tmp_path, check=True)
+    resumed_json = load_data(full_json)
+    for key in ["stop_epoch", "best_epoch", "pos_state"]:
+        assert_equal(resumed_json[key], original_json[key])
+    for key in ["erf_tr", "erf_vl", "chi2", "arc_lengths", "integrability"]:
+        assert_allclose(resumed_json[key], original_json[key], rtol=1e-5)
+
+
 @pytest.mark.skip(reason="Still not implemented in parallel mode")
 def test_hyperopt(tmp_path):
     # Prepare the run
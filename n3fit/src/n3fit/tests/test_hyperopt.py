@@ -1,9 +1,19 @@
 """
     Test hyperoptimization features
 """
+import json
+import multiprocessing as mp
 
+import hyperopt
 from numpy.testing import assert_approx_equal
+
 from n3fit.hyper_optimization import rewards
+from n3fit.hyper_optimization.filetrials import FileTrials, SharedTrials
+from n3fit.hyper_optimization.pruning import TrialPruner
+from validphys.hyperoptplot import read_tries
+
+SPACE = {"x": hyperopt.hp.uniform("x", -5.0, 5.0)}
+
 
 def test_rewards():
     """ Ensure that rewards continue doing what they are supposed to do """
@@ -11,3 +21,114 @@ def test_rewards():
     assert_approx_equal(rewards.average(losses), 1.0)
     assert_approx_equal(rewards.best_worst(losses), 2.0)
     assert_approx_equal(rewards.std(losses), 0.816496580927726)
+
+
+def test_pruning():
+    """Check that trials are only pruned when they are worse than the previous ones"""
+    for policy, factor in [("median", None), ("threshold", 1.5)]:
+        pruner = TrialPruner(policy=policy, factor=factor, min_trials=2, epoch_frequency=10)
+        for loss in [1.0, 2.0]:
+            pruner.start_trial()
+            assert not pruner.prune_epoch(0, 9, 10.0 * loss)
+            assert not pruner.prune_fold(0, loss)
+            assert not pruner.prune_fold(1, loss)
+            pruner.finish_trial()
+        # A good trial goes through
+        pruner.start_trial()
+        assert not pruner.prune_epoch(0, 9, 10.0)
+        assert not pruner.prune_fold(0, 1.2)
+        pruner.finish_trial(completed=False)
+        # A bad trial is pruned already during the first fold
+        pruner.start_trial()
+        assert pruner.prune_epoch(0, 9, 100.0)
+        assert pruner.pruned
+        pruner.finish_trial()
+        # A trial which is only bad in the second fold
+        pruner.start_trial()
+        assert not pruner.prune_fold(0, 1.0)
+        assert pruner.prune_fold(1, 5.0)
+        pruner.finish_trial()
+        # Pruned trials enter the history with the folds they finished, incomplete ones do not
+        assert pruner._fold_history[2:] == [[], [1.0, 5.0]]
+        assert len(pruner._epoch_history) == 4
+
+    # With the losses of pruned trials the median does not drift towards the best trials
+    pruner = TrialPruner(policy="median", min_trials=3)
+    for loss, pruned in [(1.0, False), (2.0, False), (3.0, False), (4.0, True), (5.0, True)]:
+        pruner.start_trial()
+        assert pruner.prune_fold(0, loss) == pruned
+        pruner.finish_trial(completed=not pruned)
+    pruner.start_trial()
+    assert not pruner.prune_fold(0, 2.8)
+
+
+def _quadratic(params):
+    return {"loss": params["x"] ** 2, "status": hyperopt.STATUS_OK}
+
+
+def _shared_trials_worker(replica_path, store_path, max_evals):
+    """Run a scan with trials shared through ``store_path``"""
+    replica_path.mkdir()
+    trials = SharedTrials(replica_path, store_path, max_evals=max_evals, parameters=SPACE)
+    hyperopt.fmin(
+        fn=_quadratic,
+        space=SPACE,
+        algo=hyperopt.rand.suggest,
+        max_evals=max_evals,
+        trials=trials,
+        show_progressbar=False,
+    )
+    trials.compact()
+
+
+def test_filetrials_log(tmp_path):
+    """Check that the trials are appended to the log during the scan
+    and that they are not modified by the compaction into tries.json"""
+    max_evals = 5
+    trials = FileTrials(tmp_path, parameters=SPACE)
+    hyperopt.fmin(
+        fn=_quadratic,
+        space=SPACE,
+        algo=hyperopt.rand.suggest,
+        max_evals=max_evals,
+        trials=trials,
+        show_progressbar=False,
+    )
+    log_lines = (tmp_path / "tries.jsonl").read_text().splitlines()
+    assert len(log_lines) == max_evals
+    from_log = read_tries(tmp_path)
+    assert [i["tid"] for i in from_log] == list(range(max_evals))
+    trials.compact()
+    assert not (tmp_path / "tries.jsonl").exists()
+    assert read_tries(tmp_path) == from_log
+    assert json.loads((tmp_path / "tries.json").read_text()) == from_log
+
+
+def test_shared_trials(tmp_path):
+    """Run a scan with several processes sharing the trials and check that the total
+    number of trials is respected and that every trial was run exactly once"""
+    max_evals = 12
+    n_workers = 3
+    store_path = tmp_path / "shared_trials"
+    ctx = mp.get_context("spawn")
+    workers = [
+        ctx.Process(
+            target=_shared_trials_worker, args=(tmp_path / f"replica_{i}", store_path, max_evals)
+        )
+        for i in range(n_workers)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    # All trials must be seen by any new process reading the store
+    trials = SharedTrials(tmp_path, store_path, max_evals=max_evals, parameters=SPACE)
+    assert sorted(trials.tids) == list(range(max_evals))
+    assert all(i["state"] == hyperopt.JOB_STATE_DONE for i in trials.trials)
+    # And each trial must be written down only by the process which run it
+    tries = []
+    for i in range(n_workers):
+        tries += json.loads((tmp_path / f"replica_{i}/tries.json").read_text())
+    assert sorted(i["tid"] for i in tries) == list(range(max_evals))
@@ -0,0 +1,43 @@
+"""
+Benchmark of the time needed to import the entry points of n3fit,
+tensorflow should only be imported once the fit starts
+"""
+import subprocess
+import sys
+
+import pytest
+
+# Generous limit, importing tensorflow is usually enough to go over it
+IMPORT_TIME_LIMIT = 10.0
+
+IMPORT_BENCHMARK = """
+import sys
+import time
+
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print("tensorflow" in sys.modules)
+"""
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "n3fit.scripts.n3fit_exec",
+        "n3fit.scripts.vp_setupfit",
+        "n3fit.performfit",
+        "n3fit.n3fit_checks_provider",
+        "n3fit.backends",
+    ],
+)
+def test_import_time(module):
+    """Import the module in a new interpreter so that the modules loaded
+    by other tests do not interfere"""
+    code = IMPORT_BENCHMARK.format(module=module)
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    import_time, tf_loaded = float(output[-2]), output[-1] == "True"
+    assert not tf_loaded, f"Importing {module} loads tensorflow"
+    assert import_time < IMPORT_TIME_LIMIT
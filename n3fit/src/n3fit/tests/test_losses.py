@@ -40,3 +40,18 @@ def test_l_positivity():
 
     reference = elu_sum(ARR1)
     are_equal(result, reference)
+
+
+def test_l_reuse():
+    """Check that the losses can be reset to their initial state so they can be reused"""
+    pred = np.expand_dims(ARR2, [0, 1])
+    loss_f = losses.LossInvcovmat(INVCOVMAT, ARR1, covmat=C @ C.T)
+    reference = loss_f(pred)
+    loss_f.add_covmat(C @ C.T)
+    loss_f.reset_covmat()
+    are_equal(loss_f(pred), reference, threshold=1e-4)
+
+    loss_f = losses.LossIntegrability(c=1.0)
+    reference = loss_f(pred)
+    loss_f.update_multiplier(10.0)
+    are_equal(loss_f(pred), 10.0 * reference, threshold=1e-4)
@@ -7,6 +7,7 @@
 """
 import numpy as np
 import n3fit.model_gen
+import n3fit.msr
 from n3fit.backends import MetaModel
 from n3fit.backends import operations as op
 
@@ -64,3 +65,18 @@ def test_generate_dense_per_flavour_network():
     expected_sizes += BASIS_SIZE * [(OUT_SIZES[0], 1), (1,)]
     for weight, esize in zip(modelito.weights, expected_sizes):
         assert weight.shape == esize
+
+
+def test_integration_input():
+    """Check the sum rule integration grids"""
+    xgrid, weights = n3fit.msr.integration_input()
+    assert xgrid.shape == weights.shape == (2000, 1)
+    xgrid, weights = n3fit.msr.integration_input("gauss-legendre")
+    assert xgrid.shape == weights.shape == (88, 1)
+    # The grids are cached but the caller gets its own copy
+    xgrid[0] = 0.0
+    assert n3fit.msr.integration_input("gauss-legendre")[0][0] != 0.0
+    # Gauss-Legendre with much fewer points is more accurate than the default grid
+    for error, error_ref in n3fit.msr.integration_accuracy("gauss-legendre").values():
+        assert error < error_ref
+        assert error < 1e-7
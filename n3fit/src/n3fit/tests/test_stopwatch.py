@@ -1,6 +1,6 @@
 """ Tests the stopwatch does what is supposed to do """
 
-from n3fit.stopwatch import StopWatch
+from n3fit.stopwatch import StopWatch, aggregate_metrics, write_metrics
 
 
 def time_comparer(internal_dict, computed_dict, base_time):
@@ -39,3 +39,30 @@ def test_register_ref():
     keyname = f"{base1}_to_{base2}"
     assert time_dict["cputime"][keyname] == cpu_diff
     assert time_dict["walltime"][keyname] == wall_diff
+
+
+def test_spans_and_metrics(tmp_path):
+    watch = StopWatch()
+    with watch.span("training", fold=0) as span:
+        span["epochs"] = 10
+    watch.record("epochs_per_second", 5.0)
+    metrics = watch.metrics()
+    (span_out,) = metrics["spans"]
+    assert span_out["name"] == "training"
+    assert span_out["fold"] == 0
+    assert span_out["epochs"] == 10
+    assert span_out["walltime"] >= 0.0 and span_out["cputime"] >= 0.0
+    assert metrics["metrics"]["epochs_per_second"] == 5.0
+    assert metrics["metrics"]["peak_rss_mb"] > 0.0
+
+    # Write the metrics for two replicas and collect them back
+    for replica in (1, 2):
+        replica_folder = tmp_path / "nnfit" / f"replica_{replica}"
+        replica_folder.mkdir(parents=True)
+        write_metrics(replica_folder, metrics)
+        assert (replica_folder / "metrics.csv").exists()
+    spans, all_metrics = aggregate_metrics(tmp_path)
+    assert list(spans["replica"]) == [1, 2]
+    assert list(spans["name"]) == ["training", "training"]
+    assert list(all_metrics.index) == [1, 2]
+    assert (all_metrics["epochs_per_second"] == 5.0).all()
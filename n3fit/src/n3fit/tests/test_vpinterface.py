@@ -6,7 +6,7 @@ import numpy as np
 from hypothesis import given, settings, example
 from hypothesis.strategies import integers
 from validphys.pdfgrids import xplotting_grid, distance_grids
-from n3fit.vpinterface import N3PDF, integrability_numbers, compute_arclength
+from n3fit.vpinterface import N3LHAPDFSet, N3PDF, integrability_numbers, compute_arclength
 from n3fit.model_gen import pdfNN_layer_generator
 
 
@@ -46,6 +46,9 @@ def test_N3PDF(members, layers):
     assert len(w[0]) == 16 + (layers + 1) * 2  # 16=8*2 preprocessing
     ret = n3pdf(xx)
     assert ret.shape == (members, xsize, 14)
+    # The batched evaluation of all members must agree with the evaluation of each of them
+    for i in range(members):
+        np.testing.assert_allclose(ret[i], n3pdf(xx, replica=i + 1)[0], rtol=1e-5)
     int_numbers = integrability_numbers(n3pdf)
     if members == 1:
         assert int_numbers.shape == (5,)
@@ -70,3 +73,36 @@ def test_vpinterface():
     assert distances[1].grid_values.data.shape == (1, 8, 40)
     np.testing.assert_allclose(distances[0].grid_values.data, 0.0)
     assert not np.allclose(distances[1].grid_values.data, 0.0)
+
+
+class _FakePhotonLayer:
+    built = True
+
+    def __init__(self):
+        self.registered = []
+
+    def register_photon(self, xgrid):
+        self.registered.append(xgrid)
+
+
+class _FakePhotonModel:
+    def __init__(self):
+        self.layer = _FakePhotonLayer()
+
+    def get_layer_re(self, regex):
+        return [self.layer]
+
+
+def test_register_photon():
+    """The photon is only registered again, and the predictor regenerated, if the xgrid changes"""
+    model = _FakePhotonModel()
+    pdf = N3LHAPDFSet("fake", [model])
+    xgrid = np.linspace(0.1, 0.9, 5).reshape(1, -1, 1)
+    pdf._register_photon(xgrid)
+    pdf._predictor = "predictor"
+    pdf._register_photon(xgrid.copy())
+    assert len(model.layer.registered) == 1
+    assert pdf._predictor == "predictor"
+    pdf._register_photon(xgrid[:, :3])
+    assert len(model.layer.registered) == 2
+    assert pdf._predictor is None
@@ -71,6 +71,9 @@ class N3LHAPDFSet(LHAPDFSet):
         self._flavors = None
         self._fitting_q = Q
         self.basis = check_basis("evolution", EVOL_LIST)["basis"]
+        self._predictor = None
+        # Last xgrid registered with the photon layers of the models
+        self._photon_xgrid = None
 
     def xfxQ(self, x, Q, n, fl):
         """Return the value of the PDF member for the given value in x"""
@@ -81,7 +84,11 @@ class N3LHAPDFSet(LHAPDFSet):
         return self.grid_values([fl], [x]).squeeze()[n]
 
     def _register_photon(self, xgrid):
-        """If the PDF models contain photons, register the xgrid with them"""
+        """If the PDF models contain photons, register the xgrid with them.
+        Nothing is done if the xgrid is the same as in the previous call."""
+        if self._photon_xgrid is not None and np.array_equal(xgrid, self._photon_xgrid):
+            return
+        self._photon_xgrid = np.array(xgrid)
         for m in self._lhapdf_set:
             pl = m.get_layer_re("add_photon")
             # if pl is an empy list there's no photon
@@ -91,6 +98,16 @@ class N3LHAPDFSet(LHAPDFSet):
             # Recompile the model if necessary
             if not pl[0].built:
                 m.compile()
+            # The batched predictor needs to be regenerated with the new photon
+            self._predictor = None
+
+    def _predict_all(self, mod_xgrid):
+        """Evaluate all replicas at once in one single call to the backend"""
+        if self._predictor is None:
+            from n3fit.backends import MetaModel
+
+            self._predictor = MetaModel.batched_predictor(self._lhapdf_set)
+        return self._predictor({"pdf_input": mod_xgrid})
 
     def __call__(self, xarr, flavours=None, replica=None):
         """Uses the internal model to produce pdf values for the grid
@@ -122,9 +139,7 @@ class N3LHAPDFSet(LHAPDFSet):
 
         if replica is None or replica == 0:
             # We need generate output values for all replicas
-            result = np.concatenate(
-                [m.predict({"pdf_input": mod_xgrid}) for m in self._lhapdf_set], axis=0
-            )
+            result = self._predict_all(mod_xgrid)
             if replica == 0:
                 # We want _only_ the central value
                 result = np.mean(result, axis=0, keepdims=True)
@@ -33,6 +33,7 @@ setup(name= "validphys",
                         'vp-nextfitruncard = validphys.scripts.vp_nextfitruncard:main',
                         'vp-hyperoptplot = validphys.scripts.vp_hyperoptplot:main',
                         'vp-deltachi2 = validphys.scripts.vp_deltachi2:main',
+                        'vp-resultcache = validphys.scripts.vp_resultcache:main',
                     ]},
       package_dir = {'': 'src'},
       packages = find_packages('src'),
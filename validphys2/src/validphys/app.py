@@ -14,10 +14,8 @@ import logging
 import os
 import sys
 
-import lhapdf
-
 from reportengine import app
-from validphys import mplstyles, uploadutils
+from validphys import mplstyles
 from validphys.config import Config, Environment
 
 providers = [
@@ -118,6 +116,30 @@ including the contents of the following file:
             help="Upload the resulting output folder to the Milan server.",
         )
 
+        parser.add_argument(
+            "--cache-results",
+            action="store_true",
+            help="Store the results of expensive actions in the validphys cache "
+            "and reuse them in subsequent runs, as long as the inputs and the validphys code "
+            "do not change. See vp-resultcache.",
+        )
+
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=None,
+            help="Execute the independent actions in parallel with a local pool of JOBS workers. "
+            "Implies --parallel.",
+        )
+        parser.add_argument(
+            "--render-jobs",
+            type=int,
+            default=None,
+            help="Save the figures of the plots which produce many of them "
+            "(such as plot_fancy or plot_pdfs) with a pool of RENDER_JOBS processes.",
+        )
+
         return parser
 
     def init(self):
@@ -127,6 +149,8 @@ including the contents of the following file:
             if self.args["loglevel"] <= logging.DEBUG:
                 cout = True
         if not cout:
+            import lhapdf
+
             lhapdf.setVerbosity(0)
 
     @staticmethod
@@ -136,9 +160,34 @@ including the contents of the following file:
         upload the output path if do_upload is True. Otherwise do nothing.
         Raise SystemExit on error."""
         if do_upload:
+            from validphys import uploadutils
+
             return uploadutils.ReportUploader().upload_or_exit_context(output)
         return contextlib.ExitStack()
 
+    @staticmethod
+    @contextlib.contextmanager
+    def local_cluster(jobs):
+        """If ``jobs`` is None, do nothing. Otherwise, on enter, start a local dask
+        cluster with ``jobs`` worker processes with one thread each and return its address.
+        The actions are not run in several threads of the same process since matplotlib,
+        LHAPDF and the caches of the loader are not thread safe.
+        The cluster is closed on exit."""
+        if jobs is None:
+            yield None
+            return
+        if jobs < 1:
+            log.error(f"The number of jobs must be positive, got {jobs}")
+            sys.exit(1)
+        from dask.distributed import LocalCluster
+
+        # The default distributed logger is too noisy
+        logging.getLogger("distributed").setLevel(logging.WARNING)
+        cluster = LocalCluster(n_workers=jobs, threads_per_worker=1, processes=True)
+        log.info(f"Running actions with {jobs} processes")
+        with cluster:
+            yield cluster.scheduler_address
+
     def run(self):
         if sys.version_info < (3, 9):
             log.warning(
@@ -148,7 +197,29 @@ including the contents of the following file:
                 "If you have any problems, please open an issue "
                 "on https://github.com/NNPDF/nnpdf/issues."
             )
-        with self.upload_context(self.args["upload"], self.args["output"]):
+        if self.args["cache_results"]:
+            from validphys.resultcache import enable_result_cache
+
+            enable_result_cache()
+        render_jobs = self.args["render_jobs"]
+        if render_jobs is not None:
+            if render_jobs < 1:
+                log.error(f"The number of render jobs must be positive, got {render_jobs}")
+                sys.exit(1)
+            from validphys.figurepool import set_render_jobs
+
+            set_render_jobs(render_jobs)
+        jobs = self.args["jobs"]
+        if jobs is not None and self.args["scheduler"]:
+            log.error("--jobs cannot be used together with --scheduler")
+            sys.exit(1)
+        with self.upload_context(
+            self.args["upload"], self.args["output"]
+        ), self.local_cluster(jobs) as address:
+            if address is not None:
+                # Let reportengine run the actions in the local cluster
+                self.args["parallel"] = True
+                self.args["scheduler"] = address
             super().run()
 
 
@@ -11,7 +11,6 @@ import platform
 import tempfile
 
 import lhapdf
-from matplotlib import scale as mscale
 
 from reportengine.checks import (
     CheckError,
@@ -108,6 +107,9 @@ def check_scale(scalename, allow_none=False):
         val = ns[scalename]
         if val is None and allow_none:
             return
+        # Import matplotlib only when a plotting action needs it
+        from matplotlib import scale as mscale
+
         valid_scales = mscale.get_scale_names()
         if not val in valid_scales:
             e = CheckError(
@@ -686,15 +686,21 @@ class CoreConfig(configparser.Config):
         self,
         theory_covmat_flag=False,
         use_thcovmat_in_fitting=False,
+        loaded_training_bundle=None,
     ):
         """
         Produces the correct covmat to be used in fitting_data_dict according
         to some options: whether to include the theory covmat, whether to
         separate the multiplcative errors and whether to compute the
         experimental covmat using the t0 prescription.
+        If a training bundle has been loaded the experimental covmat is read from it.
         """
-        from validphys import covmats
+        from validphys import covmats, n3fit_data
 
+        if loaded_training_bundle is not None:
+            if theory_covmat_flag and use_thcovmat_in_fitting:
+                return n3fit_data.dataset_inputs_bundled_total_covmat
+            return n3fit_data.dataset_inputs_bundled_exp_covmat
         if theory_covmat_flag and use_thcovmat_in_fitting:
             return covmats.dataset_inputs_t0_total_covmat
         return covmats.dataset_inputs_t0_exp_covmat
@@ -771,6 +777,38 @@ class CoreConfig(configparser.Config):
         bb = [str(i) for i in data_input]
         return tmp.reindex(index=bb, columns=bb, level=0).values
 
+    def produce_loaded_training_bundle(
+        self, output_path, use_training_bundle=False, training_bundle_store=None
+    ):
+        """
+        Loads the training bundle written by vp-setupfit in the ``filter`` folder
+        of the fit when ``use_training_bundle`` is set, returns ``None`` otherwise.
+        If a ``training_bundle_store`` folder is given (e.g., ``/dev/shm``) the bundle
+        is first published there, so that all processes in the node attach to the same copy.
+        """
+        if not use_training_bundle:
+            if training_bundle_store is not None:
+                raise ConfigError("`training_bundle_store` requires `training_bundle: true`")
+            return None
+        from validphys.n3fit_data import TRAINING_BUNDLE_FOLDER
+        from validphys.n3fit_data_utils import (
+            TrainingBundle,
+            TrainingBundleError,
+            publish_training_bundle,
+        )
+
+        bundle_path = output_path / "filter" / TRAINING_BUNDLE_FOLDER
+        try:
+            if training_bundle_store is not None:
+                store = pathlib.Path(training_bundle_store)
+                if not store.is_dir():
+                    raise ConfigError(f"training_bundle_store: {store} is not a folder")
+                bundle_path = publish_training_bundle(bundle_path, store)
+                log.info("Using the training bundle published at %s", bundle_path)
+            return TrainingBundle(bundle_path)
+        except TrainingBundleError as e:
+            raise ConfigError(f"{e}. Was vp-setupfit run with `training_bundle: true`?") from e
+
     @configparser.explicit_node
     def produce_covmat_t0_considered(self, use_t0: bool = False):
         """Modifies which action is used as covariance_matrix depending on
@@ -10,7 +10,6 @@ from __future__ import generator_stop
 import enum
 import functools
 import inspect
-import json
 import logging
 from pathlib import Path
 import re
@@ -30,7 +29,7 @@ from validphys.commondataparser import (
     peek_commondata_metadata,
 )
 from validphys.fkparser import load_fktable, parse_cfactor
-from validphys.hyperoptplot import HyperoptTrial
+from validphys.hyperoptplot import TRIES_JSON, TRIES_LOG, HyperoptTrial, read_tries
 from validphys.lhapdfset import LHAPDFSet
 from validphys.tableloader import parse_exp_mat
 from validphys.theorydbutils import fetch_theory
@@ -649,7 +648,8 @@ class HyperscanSpec(FitSpec):
 
     @property
     def tries_files(self):
-        """Return a dictionary with all tries.json files mapped to their replica number"""
+        """Return a dictionary with all tries.json files mapped to their replica number.
+        If a replica contains only the append-only log (``tries.jsonl``) the log is used instead"""
         if self._tries_files is None:
             re_idx = re.compile(r"(?<=replica_)\d+$")
             get_idx = lambda x: int(re_idx.findall(x.as_posix())[-1])
@@ -657,9 +657,11 @@ class HyperscanSpec(FitSpec):
             # Now loop over all replicas and save them when they include a tries.json file
             tries = {}
             for idx in sorted(all_rep):
-                test_path = self.path / f"nnfit/replica_{idx}/tries.json"
-                if test_path.exists():
-                    tries[idx] = test_path
+                for tries_name in (TRIES_JSON, TRIES_LOG):
+                    test_path = self.path / f"nnfit/replica_{idx}/{tries_name}"
+                    if test_path.exists():
+                        tries[idx] = test_path
+                        break
             self._tries_files = tries
         return self._tries_files
 
@@ -672,11 +674,10 @@ class HyperscanSpec(FitSpec):
         """
         all_trials = []
         for trial_file in self.tries_files.values():
-            with open(trial_file, "r") as tf:
-                run_trials = []
-                for trial in json.load(tf):
-                    trial = HyperoptTrial(trial, base_params=base_params, linked_trials=run_trials)
-                    run_trials.append(trial)
+            run_trials = []
+            for trial in read_tries(trial_file.parent):
+                trial = HyperoptTrial(trial, base_params=base_params, linked_trials=run_trials)
+                run_trials.append(trial)
             all_trials += run_trials
         return all_trials
 
@@ -22,6 +22,7 @@ from validphys.commondata import loaded_commondata_with_cuts
 from validphys.convolution import central_predictions
 from validphys.core import PDF, DataGroupSpec, DataSetSpec
 from validphys.covmats_utils import construct_covmat, systematics_matrix
+from validphys.resultcache import persistent_cache
 from validphys.results import ThPredictionsResult
 
 log = logging.getLogger(__name__)
@@ -227,6 +228,7 @@ def dataset_inputs_covmat_from_systematics(
 
 
 @check_cuts_considered
+@persistent_cache
 def dataset_t0_predictions(dataset, t0set):
     """Returns the t0 predictions for a ``dataset`` which are the predictions
     calculated using the central member of ``pdf``. Note that if ``pdf`` has
@@ -20,11 +20,12 @@ import scipy.stats as stats
 
 from reportengine import collect
 from reportengine.checks import CheckError, check, make_argcheck, make_check
-from reportengine.figure import figure, figuregen
+from reportengine.figure import figure
 from reportengine.floatformatting import format_number
 from validphys import plotutils
 from validphys.core import CutsPolicy, MCStats, cut_mask
 from validphys.coredata import KIN_NAMES
+from validphys.figurepool import figuregen
 from validphys.plotoptions import get_info, kitable, transform_result
 from validphys.results import chi2_stat_labels
 from validphys.utils import sane_groupby_iter, scale_from_grid, split_ranges
@@ -0,0 +1,133 @@
+"""
+figurepool.py
+
+Render the figures of plot-heavy providers in a pool of worker processes.
+
+Drawing a figure and writing it to disk (once per output format) dominates the time
+taken by providers that produce many figures, such as :py:func:`validphys.dataplots.plot_fancy`.
+Providers decorated with :py:func:`figuregen` from this module construct their figures
+in the main process as usual, but the figures are sent pickled (with all their data and style)
+to a pool of processes which draw and save them, so that several figures are saved at the
+same time. The output (files and report) is the same as that of
+:py:func:`reportengine.figure.figuregen`.
+
+The pool is disabled by default and enabled by the ``--render-jobs`` option of validphys
+(or by calling :py:func:`set_render_jobs`). Figures which cannot be pickled (for instance
+because they use a locally defined tick formatter) are saved in the main process.
+"""
+import concurrent.futures
+import functools
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+
+import matplotlib as mpl
+import numpy as np
+
+from reportengine import figure as refigure
+from reportengine.utils import add_highlight, normalize_name
+
+log = logging.getLogger(__name__)
+
+RENDER_JOBS_ENV = "VALIDPHYS_RENDER_JOBS"
+
+_executor_lock = threading.Lock()
+
+
+def set_render_jobs(jobs):
+    """Save the figures of the providers decorated with :py:func:`figuregen`
+    with ``jobs`` worker processes, in this process and in the processes it starts."""
+    os.environ[RENDER_JOBS_ENV] = str(jobs)
+
+
+def render_jobs():
+    """Number of worker processes used to save figures, 1 meaning that they are
+    saved in the current process"""
+    jobs = int(os.environ.get(RENDER_JOBS_ENV, 1))
+    # Daemonic processes (e.g. the workers of a dask cluster) cannot start a pool
+    if multiprocessing.current_process().daemon:
+        return 1
+    return jobs
+
+
+@functools.lru_cache
+def _get_executor(jobs):
+    # spawn rather than fork since the main process may be running other threads
+    context = multiprocessing.get_context("spawn")
+    return concurrent.futures.ProcessPoolExecutor(jobs, mp_context=context)
+
+
+def _style():
+    """Return the matplotlib parameters which differ from the defaults,
+    so that the workers save figures with the style of the main process"""
+    defaults = mpl.rcParamsDefault
+    return {
+        k: v for k, v in dict.items(mpl.rcParams) if k != "backend" and v != defaults.get(k)
+    }
+
+
+def _save(fig, paths):
+    # Numpy can produce a lot of warnings while working on producing figures
+    with np.errstate(invalid="ignore"):
+        for path in paths:
+            log.debug(f"Writing figure file {path}")
+            fig.savefig(str(path), bbox_inches="tight")
+
+
+def _render(data, paths, style):
+    """Save the pickled figure ``data`` to each of the ``paths``. Runs in the workers."""
+    fig = pickle.loads(data)
+    with mpl.rc_context(style):
+        _save(fig, paths)
+
+
+def _suffixed_paths(paths, suffix):
+    return [path.with_name("_".join((path.stem, suffix)) + path.suffix) for path in paths]
+
+
+def savefiglist(figures, paths, output):
+    """Same as :py:func:`reportengine.figure.savefiglist`, but with the figures
+    saved by a pool of :py:func:`render_jobs` processes"""
+    jobs = render_jobs()
+    if jobs <= 1 or len(figures) <= 1:
+        return refigure.savefiglist(figures, paths, output)
+    with _executor_lock:
+        executor = _get_executor(jobs)
+    style = _style()
+
+    res = ['<div class="figiterwrapper">']
+    futures = []
+    for i, fig in enumerate(figures):
+        # Support tuples with (suffix, figure)
+        if isinstance(fig, tuple):
+            fig, suffix = fig
+        else:
+            suffix = str(i)
+        outpaths = _suffixed_paths(paths, normalize_name(suffix))
+        try:
+            data = pickle.dumps(fig, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            log.debug(f"Saving figure {outpaths[0].name} in the main process: {e}")
+            _save(fig, outpaths)
+        else:
+            futures.append(executor.submit(_render, data, outpaths, style))
+        ref = refigure.Figure([path.relative_to(output) for path in outpaths])
+        res.append(f"\n<div>{ref.as_markdown}</div>\n")
+    res.append("</div>")
+    # Raise the errors of the workers, if any
+    for future in futures:
+        future.result()
+    return res
+
+
+@add_highlight
+def figuregen(func):
+    """
+    Same as :py:func:`reportengine.figure.figuregen`, but with the figures saved by
+    a pool of processes when ``--render-jobs`` is given.
+    """
+    func = refigure.figuregen(func)
+    func.final_action = savefiglist
+    return func
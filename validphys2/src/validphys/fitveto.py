@@ -64,15 +64,17 @@ def determine_vetoes(
     Included in the dictionary is a 'Total' veto.
     """
 
+    # Assemble the information of all replicas in arrays of shape (replicas, ...)
+    chi2 = np.array([i.chi2 for i in fitinfos])
+    # TODO ensure that all replicas have the same amount of arclengths
+    arclengths = np.array([i.arclengths for i in fitinfos]).reshape(len(fitinfos), -1)
+    integnumbers = np.array([i.integnumbers for i in fitinfos]).reshape(len(fitinfos), -1)
+
     # Setup distributions to veto upon: Make a dictionary {name: (values, threshold)}, where
     # values and threshold are to be filtered recusively as per ``distribution_veto``.
-    # TODO ensure that all replicas have the same amount of arclengths
-    distributions = {"ChiSquared": ([i.chi2 for i in fitinfos], nsigma_discard_chi2)}
-    for i in range(0, len(fitinfos[0].arclengths)):
-        distributions["ArcLength_" + str(i)] = (
-            [j.arclengths[i] for j in fitinfos],
-            nsigma_discard_arclength,
-        )
+    distributions = {"ChiSquared": (chi2, nsigma_discard_chi2)}
+    for i, values in enumerate(arclengths.T):
+        distributions["ArcLength_" + str(i)] = (values, nsigma_discard_arclength)
 
     # Positivity veto
     posmask = np.array([replica.is_positive for replica in fitinfos], dtype=bool)
@@ -80,13 +82,12 @@ def determine_vetoes(
     total_mask = posmask.copy()
 
     # Integrability veto
-    if len(fitinfos[0].integnumbers) == 0:
+    if integnumbers.shape[1] == 0:
         log.warning(f"No integrability numbers in the fitinfo file")
     else:
-        for i in range(0, len(fitinfos[0].integnumbers)):
-            values = [j.integnumbers[i] for j in fitinfos]
-            key = "IntegNumber_" + str(i)
-            vetoes[key] = integrability_veto(values, integ_threshold=integ_threshold)
+        integ_mask = integrability_veto(integnumbers, integ_threshold=integ_threshold)
+        for i, mask in enumerate(integ_mask.T):
+            vetoes["IntegNumber_" + str(i)] = mask
 
     # Distribution vetoes
     while True:
@@ -94,11 +95,11 @@ def determine_vetoes(
             values, threshold = distributions[key]
             vetoes[key] = distribution_veto(values, total_mask, nsigma_threshold=threshold)
         new_total_mask = np.all(list(vetoes.values()), axis=0)
-        if sum(new_total_mask) == sum(total_mask):
+        if new_total_mask.sum() == total_mask.sum():
             break
         total_mask = new_total_mask
 
-    pass_chi2 = np.asarray(distributions["ChiSquared"][0])[total_mask]
+    pass_chi2 = chi2[total_mask]
     log.info(f"Passing average chi2: {np.mean(pass_chi2)}")
 
     vetoes["Total"] = total_mask
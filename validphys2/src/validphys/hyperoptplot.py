@@ -12,16 +12,15 @@ import glob
 import json
 import logging
 import os
+import pathlib
 import re
 from types import SimpleNamespace
 
 import numpy as np
 import pandas as pd
-import seaborn as sns
 
 from reportengine.figure import figure
 from reportengine.table import table
-from validphys import plotutils
 from validphys.hyper_algorithm import autofilter_dataframe
 
 log = logging.getLogger(__name__)
@@ -29,6 +28,49 @@ log = logging.getLogger(__name__)
 regex_op = re.compile(r"[^\w^\.]+")
 regex_not_op = re.compile(r"[\w\.]+")
 
+# Name of the files holding the trials in each replica folder,
+# the json file is the compacted version of the (append-only) line-delimited log
+TRIES_JSON = "tries.json"
+TRIES_LOG = "tries.jsonl"
+
+
+def read_tries(replica_path):
+    """
+    Read all trials stored in a replica folder.
+    The trials can be found in a ``tries.json`` file (a json list of trials),
+    in a ``tries.jsonl`` log (one trial per line, as written during the scan)
+    or both (if the scan was interrupted while compacting the log),
+    in which case the entries of the log take precedence.
+    A truncated last line of the log (i.e., from a killed scan) is ignored.
+
+    Parameters
+    ----------
+        replica_path: pathlib.Path
+            folder containing the trial files
+
+    Returns
+    -------
+        list(dict)
+            list of trials sorted by their trial id
+    """
+    trials = {}
+    json_file = replica_path / TRIES_JSON
+    if json_file.exists():
+        with open(json_file, "r") as jlist:
+            for idx, trial in enumerate(json.load(jlist)):
+                trials[trial.get("tid", idx)] = trial
+    log_file = replica_path / TRIES_LOG
+    if log_file.exists():
+        with open(log_file, "r") as jlog:
+            for line in jlog:
+                try:
+                    trial = json.loads(line)
+                except json.JSONDecodeError:
+                    log.warning("Ignoring corrupted line in %s", log_file)
+                    continue
+                trials[trial["tid"]] = trial
+    return [trials[i] for i in sorted(trials)]
+
 
 class HyperoptTrial:
     """
@@ -370,26 +412,21 @@ def evaluate_trial(trial_dict, validation_multiplier, fail_threshold, loss_targe
 def generate_dictionary(
     replica_path,
     loss_target,
-    json_name="tries.json",
     starting_index=0,
     val_multiplier=0.5,
     fail_threshold=10.0,
 ):
     """
-    Reads a json file and returns a list of dictionaries
+    Reads the trials of a replica folder and returns a list of dictionaries
 
     # Arguments:
-        - `replica_path`: folder in which the tries.json file can be found
+        - `replica_path`: folder in which the tries.json (or tries.jsonl) file can be found
         - `starting_index`: if the trials are to be added to an already existing
                             set, make sure the id has the correct index!
         - `val_multiplier`: validation multipler
         - `fail_threhsold`: threshold for the loss to consider a configuration as a failure
     """
-    filename = "{0}/{1}".format(replica_path, json_name)
-
-    # Open the file and reads it as a json
-    with open(filename, "r") as jlist:
-        input_trials = json.load(jlist)
+    input_trials = read_tries(pathlib.Path(replica_path))
 
     # Read all trials and create a list of dictionaries
     # which can be turn into a dataframe
@@ -477,13 +514,16 @@ def hyperopt_dataframe(commandline_args):
 
     filter_functions = [filter_by_string(filter_me) for filter_me in args.filter]
 
-    search_str = f"{args.hyperopt_folder}/nnfit/replica_*/tries.json"
-    all_json = glob.glob(search_str)
+    search_str = f"{args.hyperopt_folder}/nnfit/replica_*/"
+    all_json = [
+        i
+        for i in glob.glob(search_str)
+        if os.path.exists(os.path.join(i, TRIES_JSON)) or os.path.exists(os.path.join(i, TRIES_LOG))
+    ]
     starting_index = 0
     all_replicas = []
-    for i, json_path in enumerate(all_json):
+    for i, replica_path in enumerate(all_json):
         # Look at the json and read all of them into a dictionary
-        replica_path = os.path.dirname(json_path)
         dictionaries = generate_dictionary(
             replica_path,
             args.loss_target,
@@ -700,6 +740,12 @@ def plot_scans(df, best_df, plotting_parameter, include_best=True):
     """
     This function performs the plotting and is called by the `plot_` functions in this file.
     """
+    # The plotting libraries are imported here since the rest of this module
+    # is used by validphys.core and n3fit
+    import seaborn as sns
+
+    from validphys import plotutils
+
     figs, ax = plotutils.subplots()
 
     # Set the quantity we will be plotting in the y axis
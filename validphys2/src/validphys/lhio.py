@@ -18,6 +18,8 @@ from validphys.core import PDF
 
 log = logging.getLogger(__name__)
 
+REPLICA0_HEADER = b'PdfType: central\nFormat: lhagrid1\n'
+
 
 def split_sep(f):
     for line in f:
@@ -39,19 +41,52 @@ def read_xqf_from_file(f):
     return pd.Series(vals, index=pd.MultiIndex.from_product((xvals, qvals, fvals)))
 
 
-def read_xqf_from_lhapdf(pdf, replica, kin_grids):
-    indexes = tuple(kin_grids.index)
+def read_subgrids_from_file(f):
+    """Parse the subgrids of an open replica file, positioned after the header,
+    into arrays. For every subgrid yields a tuple ``(xvals, qvals, fvals, values)``
+    where ``values`` has shape ``(len(xvals)*len(qvals), len(fvals))``."""
+    while True:
+        lines = split_sep(f)
+        try:
+            (xtext, qtext, ftext) = [next(lines) for _ in range(3)]
+        except StopIteration:
+            return
+        xvals = np.fromstring(xtext, sep=" ")
+        qvals = np.fromstring(qtext, sep=" ")
+        fvals = np.fromstring(ftext, sep=" ", dtype=int)
+        vals = np.fromstring(b''.join(lines), sep=" ")
+        yield xvals, qvals, fvals, vals.reshape(len(xvals) * len(qvals), len(fvals))
+
+
+def read_replica_subgrids(path):
+    """Read the header and the list of subgrids (see :py:func:`read_subgrids_from_file`)
+    of the replica file at ``path``"""
+    with open(path, 'rb') as inn:
+        header = b"".join(split_sep(inn))
+        subgrids = list(read_subgrids_from_file(inn))
+    return header, subgrids
+
+
+def subgrids_from_lhapdf(pdf, replica, kin_grids):
+    """Evaluate ``replica`` of ``pdf`` with LHAPDF in the (x, Q, flavour) points of the
+    subgrids ``kin_grids``, with one vectorized call per subgrid"""
     # Use LHAPDF directly to avoid the insanely deranged replica 0 convention
     # of libnnpdf.
     # TODO: Find a way around this
-    import lhapdf
+    member = lhapdf.mkPDF(pdf.name, int(replica))
 
-    xfxQ = lhapdf.mkPDF(pdf.name, int(replica)).xfxQ
+    subgrids = []
+    for xvals, qvals, fvals, _ in kin_grids:
+        # In the grid files Q runs faster than x
+        xarr, qarr = (g.ravel() for g in np.meshgrid(xvals, qvals, indexing="ij"))
+        values = np.array(member.xfxQ(fvals, xarr, qarr)).reshape(len(xarr), len(fvals))
+        subgrids.append((xvals, qvals, fvals, values))
+    return subgrids
 
-    vals = []
-    for x in indexes:
-        # TODO: Change this for a faster grid_values call
-        vals += [xfxQ(x[3], x[1], x[2])]
+
+def read_xqf_from_lhapdf(pdf, replica, kin_grids):
+    subgrids = subgrids_from_lhapdf(pdf, replica, _series_to_subgrids(kin_grids))
+    vals = np.concatenate([values.ravel() for *_, values in subgrids])
     return pd.Series(vals, index=kin_grids.index)
 
 
@@ -83,31 +118,38 @@ def load_replica(pdf, rep, kin_grids=None):
     return header, xfqs
 
 
+def _series_to_subgrids(subgrids):
+    """Convert the (subgrid, x, Q, flavour) indexed series returned by
+    :py:func:`load_replica` to the subgrids of :py:func:`read_subgrids_from_file`"""
+    for _, g in subgrids.groupby(level=0):
+        xvals = g.index.get_level_values(1).unique().values
+        qvals = g.index.get_level_values(2).unique().values
+        fvals = g.index.get_level_values(3).unique().values
+        yield xvals, qvals, fvals, g.values.reshape(len(xvals) * len(qvals), len(fvals))
+
+
 # Split this to debug easily
-def _rep_to_buffer(out, header, subgrids):
+def _subgrids_to_buffer(out, header, subgrids):
     sep = b'---'
     out.write(header)
     out.write(sep)
-    for _, g in subgrids.groupby(level=0):
+    for xvals, qvals, fvals, values in subgrids:
         out.write(b'\n')
-        ind = g.index.get_level_values(1).unique()
-        np.savetxt(out, ind, fmt='%.7E', delimiter=' ', newline=' ')
+        np.savetxt(out, xvals, fmt='%.7E', delimiter=' ', newline=' ')
         out.write(b'\n')
-        ind = g.index.get_level_values(2).unique()
-        np.savetxt(out, ind, fmt='%.7E', delimiter=' ', newline=' ')
+        np.savetxt(out, qvals, fmt='%.7E', delimiter=' ', newline=' ')
         out.write(b'\n')
         # Integer format
-        ind = g.index.get_level_values(3).unique()
-        np.savetxt(out, ind, delimiter=' ', fmt="%d", newline=' ')
+        np.savetxt(out, fvals, delimiter=' ', fmt="%d", newline=' ')
         out.write(b'\n ')
-        # Reshape so printing is easy
-        reshaped = g.values.reshape(
-            (len(g.groupby(level=1)) * len(g.groupby(level=2)), len(g.groupby(level=3)))
-        )
-        np.savetxt(out, reshaped, delimiter=" ", newline="\n", fmt='%14.7E')
+        np.savetxt(out, values, delimiter=" ", newline="\n", fmt='%14.7E')
         out.write(sep)
 
 
+def _rep_to_buffer(out, header, subgrids):
+    _subgrids_to_buffer(out, header, _series_to_subgrids(subgrids))
+
+
 def write_replica(rep, set_root, header, subgrids):
     suffix = str(rep).zfill(4)
     target_file = set_root / f'{set_root.name}_{suffix}.dat'
@@ -117,6 +159,16 @@ def write_replica(rep, set_root, header, subgrids):
         _rep_to_buffer(out, header, subgrids)
 
 
+def write_replica_subgrids(rep, set_root, header, subgrids):
+    """Like :py:func:`write_replica` for the subgrids of :py:func:`read_subgrids_from_file`"""
+    suffix = str(rep).zfill(4)
+    target_file = set_root / f'{set_root.name}_{suffix}.dat'
+    if target_file.is_file():
+        log.warning(f"Overwriting replica file {target_file}")
+    with open(target_file, 'wb') as out:
+        _subgrids_to_buffer(out, header, subgrids)
+
+
 def load_all_replicas(pdf, db=None):
     if db is not None:
         # removing str() will crash as it casts to unicode due to pdf name
@@ -162,6 +214,38 @@ def _index_to_path(set_folder, set_name, index):
     return set_folder / ('%s_%04d.dat' % (set_name, index))
 
 
+def _same_grids(subgrids, other):
+    """Whether two lists of subgrids are defined in the same (x, Q, flavour) points"""
+    return len(subgrids) == len(other) and all(
+        all(np.array_equal(a, b) for a, b in zip(grid[:3], other_grid[:3]))
+        for grid, other_grid in zip(subgrids, other)
+    )
+
+
+def mean_replica_subgrids(replicas):
+    """Average of the ``replicas``, an iterable over the subgrids of every replica
+    (see :py:func:`read_subgrids_from_file`).
+    The replicas are consumed one at a time and accumulated in a running sum,
+    so that only one replica is kept in memory."""
+    total = None
+    for irep, grids in enumerate(replicas, 1):
+        if total is None:
+            total = [(x, q, f, np.array(values, dtype=float)) for x, q, f, values in grids]
+            continue
+        # This takes care of failing if headers don't match
+        if not _same_grids(total, grids):
+            raise ValueError(
+                f"The grid of replica {irep} is different from the grid of replica 1. "
+                "This may indicate that the headers don't match. "
+                "If this is intentional try using use_rep0grid=True"
+            )
+        for (*_, acc), (*_, values) in zip(total, grids):
+            acc += values
+    if total is None:
+        raise ValueError("No replicas to average")
+    return [(x, q, f, acc / irep) for x, q, f, acc in total]
+
+
 def generate_replica0(pdf, kin_grids=None, extra_fields=None):
     """Generates a replica 0 as an average over an existing set of LHAPDF
         replicas and outputs it to the PDF's parent folder
@@ -172,8 +256,8 @@ def generate_replica0(pdf, kin_grids=None, extra_fields=None):
         An existing validphys PDF object from which the average replica will be
         (re-)computed
 
-    kin_grids: Grids in (x,Q) used to print replica0 upon. If None, the grids
-        of the source replicas are used.
+    kin_grids: Subgrids in (x,Q) (as returned by :py:func:`read_replica_subgrids`)
+        used to print replica0 upon. If None, the grids of the source replicas are used.
     """
 
     if extra_fields is not None:
@@ -184,27 +268,15 @@ def generate_replica0(pdf, kin_grids=None, extra_fields=None):
     if not set_root.exists():
         raise RuntimeError(f"Target directory {set_root} does not exist")
 
-    loaded_grids = {}
-    grids = []
-
-    for irep in range(1, len(pdf)):
-        if irep in loaded_grids:
-            grid = loaded_grids[irep]
-        else:
-            _header, grid = load_replica(pdf, irep, kin_grids=kin_grids)
-            loaded_grids[irep] = grid
-        grids.append(grid)
-    # This takes care of failing if headers don't match
-    try:
-        M = rep_matrix(grids)
-    except ValueError as e:
-        raise ValueError(
-            "Null values found in replica grid matrix. "
-            "This may indicate that the headers don't match"
-            "If this is intentional try using use_rep0grid=True"
-        ) from e
-    header = b'PdfType: central\nFormat: lhagrid1\n'
-    write_replica(0, set_root, header, M.mean(axis=1))
+    nreplicas = len(pdf) - 1
+    if kin_grids is None:
+        replicas = (
+            read_replica_subgrids(_index_to_path(set_root, pdf, irep))[1]
+            for irep in range(1, nreplicas + 1)
+        )
+    else:
+        replicas = (subgrids_from_lhapdf(pdf, irep, kin_grids) for irep in range(1, nreplicas + 1))
+    write_replica_subgrids(0, set_root, REPLICA0_HEADER, mean_replica_subgrids(replicas))
 
 
 def new_pdf_from_indexes(
@@ -273,7 +345,7 @@ def new_pdf_from_indexes(
                 new_file.write(line)
 
     if use_rep0grid:
-        _, rep0grid = load_replica(pdf, 0)
+        _, rep0grid = read_replica_subgrids(_index_to_path(original_folder, pdf, 0))
     else:
         rep0grid = None
 
@@ -15,10 +15,12 @@ import pandas as pd
 from reportengine import collect
 from reportengine.table import table
 from validphys.core import IntegrabilitySetSpec, TupleComp
-from validphys.n3fit_data_utils import validphys_group_extractor
+from validphys.n3fit_data_utils import validphys_group_extractor, write_training_bundle
 
 log = logging.getLogger(__name__)
 
+TRAINING_BUNDLE_FOLDER = "training_bundle"
+
 
 def replica_trvlseed(replica, trvlseed, same_trvl_per_replica=False):
     """Generates the ``trvlseed`` for a ``replica``."""
@@ -173,15 +175,64 @@ def kfold_masks(kpartitions, data):
 
 
 @functools.lru_cache
-def fittable_datasets_masked(data, tr_masks):
+def fittable_datasets_masked(data, tr_masks, loaded_training_bundle=None):
     """Generate a list of :py:class:`validphys.n3fit_data_utils.FittableDataSet`
-    from a group of dataset and the corresponding training/validation masks
+    from a group of dataset and the corresponding training/validation masks.
+    If a training bundle has been loaded the fktables are read from it.
     """
     # This is separated from fitting_data_dict so that we can cache the result
     # when the trvlseed is the same for all replicas (great for parallel replicas)
+    if loaded_training_bundle is not None:
+        return loaded_training_bundle.group_datasets(
+            str(data), tr_masks.masks, dataset_names=[ds.name for ds in data.datasets]
+        )
     return validphys_group_extractor(data.datasets, tr_masks.masks)
 
 
+def dataset_inputs_bundled_exp_covmat(data, loaded_training_bundle):
+    """Experimental t0 covariance matrix of the group ``data`` read from the training bundle.
+    Equivalent to :py:func:`validphys.covmats.dataset_inputs_t0_exp_covmat`.
+    The matrix is a read-only view of the memory-mapped bundle."""
+    return loaded_training_bundle.group_covmat(str(data))
+
+
+def dataset_inputs_bundled_total_covmat(dataset_inputs_bundled_exp_covmat, loaded_theory_covmat):
+    """Like :py:func:`dataset_inputs_bundled_exp_covmat` with the theory covmat added.
+    Equivalent to :py:func:`validphys.covmats.dataset_inputs_t0_total_covmat`."""
+    return dataset_inputs_bundled_exp_covmat + loaded_theory_covmat
+
+
+def training_bundle_group(data, dataset_inputs_t0_exp_covmat):
+    """Collect the information of the group ``data`` to be written in the training bundle"""
+    return {
+        "name": str(data),
+        "datasets": validphys_group_extractor(data.datasets, []),
+        "covmat": dataset_inputs_t0_exp_covmat,
+    }
+
+
+groups_training_bundle_group = collect(
+    "training_bundle_group", ("group_dataset_inputs_by_metadata",)
+)
+
+
+def training_bundle(
+    groups_training_bundle_group,
+    posdatasets_fitting_pos_dict,
+    integdatasets_fitting_integ_dict,
+    filter_path,
+):
+    """Write the fktables, xgrids, luminosity mappings and experimental t0 covariance matrices
+    needed by the fit to a training bundle in the ``filter`` folder of the fit.
+    The bundle is used by ``n3fit`` when ``training_bundle: true`` is set in the runcard.
+    See :py:func:`validphys.n3fit_data_utils.write_training_bundle`.
+    """
+    lagrange_sets = (posdatasets_fitting_pos_dict or []) + (integdatasets_fitting_integ_dict or [])
+    path = filter_path / TRAINING_BUNDLE_FOLDER
+    write_training_bundle(path, groups_training_bundle_group, lagrange_sets)
+    log.info("Training bundle written to %s", path)
+
+
 def fitting_data_dict(
     data,
     make_replica,
@@ -496,7 +547,7 @@ def training_mask(replicas_training_mask):
     return pd.concat(replicas_training_mask, axis=1)
 
 
-def _fitting_lagrange_dict(lambdadataset):
+def _fitting_lagrange_dict(lambdadataset, loaded_training_bundle=None):
     """Loads a generic lambda dataset, often used for positivity and integrability datasets
     For more information see :py:func:`validphys.n3fit_data_utils.positivity_reader`.
 
@@ -504,6 +555,8 @@ def _fitting_lagrange_dict(lambdadataset):
     ----------
     lambdadataset: validphys.core.LagrangeSetSpec
         Positivity (or integrability) set which is to be loaded.
+    loaded_training_bundle: validphys.n3fit_data_utils.TrainingBundle
+        If given, the fktables are read from the training bundle.
 
     Examples
     --------
@@ -516,7 +569,10 @@ def _fitting_lagrange_dict(lambdadataset):
     integrability = isinstance(lambdadataset, IntegrabilitySetSpec)
     mode = "integrability" if integrability else "positivity"
     log.info("Loading %s dataset %s", mode, lambdadataset)
-    positivity_datasets = validphys_group_extractor([lambdadataset], [])
+    if loaded_training_bundle is not None:
+        positivity_datasets = loaded_training_bundle.lagrange_datasets(lambdadataset.name)
+    else:
+        positivity_datasets = validphys_group_extractor([lambdadataset], [])
     ndata = positivity_datasets[0].ndata
     return {
         "datasets": positivity_datasets,
@@ -531,7 +587,7 @@ def _fitting_lagrange_dict(lambdadataset):
     }
 
 
-def posdatasets_fitting_pos_dict(posdatasets=None):
+def posdatasets_fitting_pos_dict(posdatasets=None, loaded_training_bundle=None):
     """Loads all positivity datasets. It is not allowed to be empty.
 
     Parameters
@@ -542,13 +598,13 @@ def posdatasets_fitting_pos_dict(posdatasets=None):
         a format similar to ``dataset_input``.
     """
     if posdatasets is not None:
-        return [_fitting_lagrange_dict(i) for i in posdatasets]
+        return [_fitting_lagrange_dict(i, loaded_training_bundle) for i in posdatasets]
     log.warning("Not using any positivity datasets.")
     return None
 
 
 # can't use collect here because integdatasets might not exist.
-def integdatasets_fitting_integ_dict(integdatasets=None):
+def integdatasets_fitting_integ_dict(integdatasets=None, loaded_training_bundle=None):
     """Loads the integrability datasets. Calls same function as
     :py:func:`fitting_pos_dict`, except on each element of
     ``integdatasets`` if ``integdatasets`` is not None.
@@ -573,6 +629,6 @@ def integdatasets_fitting_integ_dict(integdatasets=None):
 
     """
     if integdatasets is not None:
-        return [_fitting_lagrange_dict(i) for i in integdatasets]
+        return [_fitting_lagrange_dict(i, loaded_training_bundle) for i in integdatasets]
     log.warning("Not using any integrability datasets.")
     return None
@@ -6,12 +6,31 @@ and extracts the relevant information into :py:class:`validphys.n3fit_data_utils
 
 The ``validphys_group_extractor`` will loop over every dataset of a given group
 loading their fktables (and applying any necessary cuts).
+
+The fit-ready information can also be written once to a training bundle with
+:py:func:`write_training_bundle` and read back by :py:class:`TrainingBundle`.
+The bundle is a folder containing a ``manifest.json`` file and one ``.npy`` file per array,
+the arrays are memory-mapped when loaded so that the files are read from disk only once
+per node. The covariance matrices are used directly from the memory map and are therefore
+held in memory only once, while every replica makes its own copy of the fktables
+when applying the training/validation masks and converting them to tensors.
+With :py:func:`publish_training_bundle` the bundle is copied once to a node-local store
+(e.g., the shared memory filesystem ``/dev/shm``) from which every process attaches to it.
 """
 import dataclasses
+import hashlib
 from itertools import zip_longest
+import json
+import os
+import pathlib
+import shutil
+import uuid
 
 import numpy as np
 
+TRAINING_BUNDLE_VERSION = 1
+TRAINING_BUNDLE_MANIFEST = "manifest.json"
+
 
 @dataclasses.dataclass
 class FittableDataSet:
@@ -76,6 +95,267 @@ class FittableDataSet:
         return self.fktables()
 
 
+@dataclasses.dataclass
+class BundledFKTableData:
+    """
+    Dense fktable loaded from a training bundle, it implements the subset of the
+    interface of :py:class:`validphys.coredata.FKTableData` used by the fit.
+    Cuts have already been applied to the table so that the data index runs
+    from 0 to ``ndata`` and the cuts passed to ``with_cuts`` refer to positions.
+
+    Parameters
+    ----------
+        hadronic: bool
+            whether the fktable corresponds to a hadronic observable
+        ndata: int
+            number of datapoints in the fktable
+        xgrid: np.ndarray
+            xgrid of the fktable
+        luminosity_mapping: np.ndarray
+            flavour combinations that contribute to the fktable
+        fktable: np.ndarray
+            dense fktable as returned by ``FKTableData.get_np_fktable``
+        protected: bool
+            protected tables are not affected by cuts
+    """
+
+    hadronic: bool
+    ndata: int
+    xgrid: np.ndarray
+    luminosity_mapping: np.ndarray
+    fktable: np.ndarray
+    protected: bool = False
+
+    def with_cuts(self, cuts):
+        """Return a copy of the fktable keeping only the datapoints at the positions ``cuts``.
+        Note that the new fktable is no longer memory-mapped."""
+        if cuts is None or self.protected:
+            return self
+        return dataclasses.replace(self, ndata=len(cuts), fktable=self.fktable[cuts])
+
+    def get_np_fktable(self):
+        """Returns the dense fktable"""
+        return self.fktable
+
+
+@dataclasses.dataclass
+class BundledFittableDataSet(FittableDataSet):
+    """Version of :py:class:`FittableDataSet` for datasets loaded from a training bundle
+    where ``fktables_data`` is a list of :py:class:`BundledFKTableData`"""
+
+    def __post_init__(self):
+        self._tr_mask = None
+        self._vl_mask = None
+        if self.training_mask is not None:
+            self._tr_mask = np.flatnonzero(self.training_mask)
+            self._vl_mask = np.flatnonzero(~self.training_mask)
+
+
+class TrainingBundleError(Exception):
+    """Exception raised when a training bundle cannot be read or
+    does not correspond to the data being fitted"""
+
+
+def write_training_bundle(path, groups, lagrange_sets):
+    """Write the fit-ready information of a fit to the folder ``path``.
+    If the folder already exists it is overwritten.
+
+    Parameters
+    ----------
+        path: pathlib.Path
+            output folder of the bundle
+        groups: list(dict)
+            list of dictionaries with the keys ``name`` (name of the group),
+            ``datasets`` (list of :py:class:`FittableDataSet`) and ``covmat``
+            (experimental t0 covariance matrix of the group)
+        lagrange_sets: list(dict)
+            list of dictionaries with the keys ``name`` and ``datasets`` for each of the
+            positivity and integrability sets
+    """
+    path = pathlib.Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    tmp_path.mkdir(parents=True)
+    narrays = 0
+
+    def save_array(array):
+        nonlocal narrays
+        filename = f"array_{narrays}.npy"
+        narrays += 1
+        np.save(tmp_path / filename, np.ascontiguousarray(array))
+        return filename
+
+    def dataset_entry(dataset):
+        fktables = []
+        for fk in dataset.fktables_data:
+            fktables.append(
+                {
+                    "hadronic": bool(fk.hadronic),
+                    "ndata": int(fk.ndata),
+                    "protected": bool(fk.protected),
+                    "xgrid": save_array(fk.xgrid),
+                    "luminosity_mapping": save_array(fk.luminosity_mapping),
+                    "fktable": save_array(fk.get_np_fktable()),
+                }
+            )
+        return {
+            "name": dataset.name,
+            "operation": dataset.operation,
+            "frac": dataset.frac,
+            "fktables": fktables,
+        }
+
+    # The id identifies this particular bundle when it is published to a shared store
+    manifest = {
+        "version": TRAINING_BUNDLE_VERSION,
+        "id": uuid.uuid4().hex,
+        "groups": {},
+        "lagrange": {},
+    }
+    for group in groups:
+        manifest["groups"][group["name"]] = {
+            "datasets": [dataset_entry(i) for i in group["datasets"]],
+            "covmat": save_array(group["covmat"]),
+        }
+    for lagrange_set in lagrange_sets:
+        manifest["lagrange"][lagrange_set["name"]] = {
+            "datasets": [dataset_entry(i) for i in lagrange_set["datasets"]]
+        }
+    with open(tmp_path / TRAINING_BUNDLE_MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=1)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+def publish_training_bundle(path, store):
+    """Publish the training bundle at ``path`` to the node-local ``store`` folder
+    (e.g., ``/dev/shm``) and return the path of the published copy.
+
+    The copy is identified by the location and the manifest (which contains a unique id)
+    of the original bundle so that only the first process publishes the bundle and the rest attach to the same copy,
+    which is made read-only. If the bundle is written again by vp-setupfit a new copy is published.
+
+    Parameters
+    ----------
+        path: pathlib.Path
+            folder containing the bundle
+        store: pathlib.Path
+            node-local folder in which the bundle is published
+
+    Returns
+    -------
+        published: pathlib.Path
+            folder of the published bundle
+    """
+    path = pathlib.Path(path).resolve()
+    try:
+        manifest = (path / TRAINING_BUNDLE_MANIFEST).read_bytes()
+    except FileNotFoundError as e:
+        raise TrainingBundleError(f"No training bundle found at {path}") from e
+    key = hashlib.sha1(str(path).encode() + manifest).hexdigest()
+    published = pathlib.Path(store) / f"n3fit_training_bundle_{key}"
+    if published.is_dir():
+        return published
+
+    # Copy the bundle to a private folder and move it in place in one step
+    # so that no process can attach to a partially written copy
+    tmp_path = published.with_name(f"{published.name}.{os.getpid()}.tmp")
+    try:
+        shutil.copytree(path, tmp_path)
+        for array in tmp_path.iterdir():
+            array.chmod(0o444)
+        os.rename(tmp_path, published)
+    except OSError as e:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        # Another process may have won the race, in which case its copy is used
+        if not published.is_dir():
+            raise TrainingBundleError(
+                f"The training bundle could not be published to {store}: {e}"
+            ) from e
+    return published
+
+
+class TrainingBundle:
+    """Reader of the training bundles written by :py:func:`write_training_bundle`.
+    All arrays are memory-mapped in read-only mode.
+
+    Parameters
+    ----------
+        path: pathlib.Path
+            folder containing the bundle
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        try:
+            with open(self.path / TRAINING_BUNDLE_MANIFEST) as f:
+                self._manifest = json.load(f)
+        except FileNotFoundError as e:
+            raise TrainingBundleError(f"No training bundle found at {self.path}") from e
+        version = self._manifest.get("version")
+        if version != TRAINING_BUNDLE_VERSION:
+            raise TrainingBundleError(
+                f"The training bundle at {self.path} has version {version} "
+                f"but version {TRAINING_BUNDLE_VERSION} is needed, please run vp-setupfit again"
+            )
+
+    def _load(self, filename):
+        return np.load(self.path / filename, mmap_mode="r")
+
+    def _entry(self, section, name):
+        try:
+            return self._manifest[section][name]
+        except KeyError as e:
+            raise TrainingBundleError(
+                f"{name} not found in the training bundle at {self.path}, "
+                "was it produced with the same runcard?"
+            ) from e
+
+    def _datasets(self, entry, dataset_names, tr_masks):
+        if dataset_names is not None:
+            bundled_names = [i["name"] for i in entry["datasets"]]
+            if bundled_names != list(dataset_names):
+                raise TrainingBundleError(
+                    f"The datasets in the training bundle at {self.path} ({bundled_names}) "
+                    f"do not match the datasets being fitted ({list(dataset_names)})"
+                )
+        loaded_obs = []
+        for dataset, mask in zip_longest(entry["datasets"], tr_masks):
+            fktables = [
+                BundledFKTableData(
+                    hadronic=fk["hadronic"],
+                    ndata=fk["ndata"],
+                    xgrid=self._load(fk["xgrid"]),
+                    luminosity_mapping=self._load(fk["luminosity_mapping"]),
+                    fktable=self._load(fk["fktable"]),
+                    protected=fk["protected"],
+                )
+                for fk in dataset["fktables"]
+            ]
+            loaded_obs.append(
+                BundledFittableDataSet(
+                    dataset["name"], fktables, dataset["operation"], dataset["frac"], mask
+                )
+            )
+        return loaded_obs
+
+    def group_datasets(self, name, tr_masks, dataset_names=None):
+        """Return the list of :py:class:`BundledFittableDataSet` for the group ``name``
+        with the given training masks. If ``dataset_names`` is given, check that the
+        datasets of the group in the bundle are the same"""
+        return self._datasets(self._entry("groups", name), dataset_names, tr_masks)
+
+    def group_covmat(self, name):
+        """Return the experimental t0 covariance matrix of the group ``name``"""
+        return self._load(self._entry("groups", name)["covmat"])
+
+    def lagrange_datasets(self, name):
+        """Return the list of :py:class:`BundledFittableDataSet` for the positivity
+        or integrability set ``name``"""
+        return self._datasets(self._entry("lagrange", name), None, [])
+
+
 def validphys_group_extractor(datasets, tr_masks):
     """
     Receives a grouping spec from validphys (most likely an experiment)
@@ -16,7 +16,7 @@ from matplotlib import colors as mcolors
 import numpy as np
 
 from reportengine.checks import make_argcheck
-from reportengine.figure import figure, figuregen
+from reportengine.figure import figure
 from reportengine.floatformatting import format_number
 from validphys import plotutils
 from validphys.checks import (
@@ -27,6 +27,7 @@ from validphys.checks import (
     check_scale,
 )
 from validphys.core import MCStats
+from validphys.figurepool import figuregen
 from validphys.gridvalues import LUMI_CHANNELS
 from validphys.utils import scale_from_grid
 
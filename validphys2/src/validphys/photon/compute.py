@@ -1,5 +1,12 @@
 """Script that calls fiatlux to add the photon PDF."""
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+import hashlib
+import json
 import logging
+from multiprocessing import get_context
+import os
+import pathlib
 import tempfile
 
 import fiatlux
@@ -9,7 +16,9 @@ from scipy.interpolate import interp1d
 import yaml
 
 from eko.io import EKO
+from evolven3fit_new.eko_utils import reshaped_eko
 from n3fit.io.writer import XGRID
+from validphys.loader import Loader
 from validphys.n3fit_data import replica_luxseed
 
 from . import structure_functions as sf
@@ -18,6 +27,7 @@ from .constants import ED2, EU2, NC, NL
 log = logging.getLogger(__name__)
 
 Q_IN = 100
+PHOTON_CACHE_FOLDER = "photons"
 FIATLUX_DEFAULT = {
     "apfel": False,
     "eps_base": 1e-5,  # precision on final integration of double integral.
@@ -48,12 +58,29 @@ FIATLUX_DEFAULT = {
 }
 
 
+def _available_cpus():
+    """Number of processors this process is allowed to run on, which takes into account
+    the affinity set for instance by ``n3fit-farm``"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
 class Photon:
-    """Photon class computing the photon array with the LuxQED approach."""
+    """Photon class computing the photon array with the LuxQED approach.
+
+    The fiatlux evaluations of the different replicas are distributed among
+    ``max_workers`` processes (by default as many as the processors this process is allowed
+    to run on, and never more than those or than the number of replicas).
+    They are evaluated in the current process if only one processor is available.
 
-    def __init__(self, theoryid, lux_params, replicas):
+    The photon arrays are stored in ``cache_path`` (by default the ``photons`` folder
+    of the validphys cache) and reused whenever the same photon is requested again.
+    """
+
+    def __init__(self, theoryid, lux_params, replicas, max_workers=None, cache_path=None):
         theory = theoryid.get_description()
-        fiatlux_runcard = FIATLUX_DEFAULT
+        fiatlux_runcard = dict(FIATLUX_DEFAULT)
         fiatlux_runcard["qed_running"] = bool(np.isclose(theory["Qedref"], theory["Qref"]))
         # cast explicitly from np.bool_ to bool otherwise problems in dumping it
         # TODO: for the time being, we trigger alphaem running if Qedref=Qref.
@@ -61,108 +88,174 @@ class Photon:
         # in the runcard
         fiatlux_runcard["mproton"] = theory["MP"]
         self.replicas = replicas
+        self.theoryid = theoryid
+        self.theory = theory
+        self.fiatlux_runcard = fiatlux_runcard
+        self.max_workers = max_workers
 
         # structure functions
-        self.luxpdfset = lux_params["luxset"].load()
+        self.luxset = lux_params["luxset"]
+        self.luxpdfset = self.luxset.load()
         self.additional_errors = lux_params["additional_errors"]
         self.luxseed = lux_params["luxseed"]
 
         # TODO : maybe find a different name for fiatlux_dis_F2
-        path_to_F2 = theoryid.path / "fastkernel/fiatlux_dis_F2.pineappl.lz4"
-        path_to_FL = theoryid.path / "fastkernel/fiatlux_dis_FL.pineappl.lz4"
+        self.path_to_F2 = theoryid.path / "fastkernel/fiatlux_dis_F2.pineappl.lz4"
+        self.path_to_FL = theoryid.path / "fastkernel/fiatlux_dis_FL.pineappl.lz4"
         self.path_to_eko_photon = theoryid.path / "eko_photon.tar"
 
-        # set fiatlux
-        self.lux = {}
+        if cache_path is None:
+            cache_path = Loader()._vp_cache() / PHOTON_CACHE_FOLDER
+        self.cache_path = pathlib.Path(cache_path)
 
-        alpha = Alpha(theory)
-        mb_thr = theory["kbThr"] * theory["mb"]
-        mt_thr = theory["ktThr"] * theory["mt"] if theory["MaxNfPdf"] == 6 else 1e100
+        photon_arrays, self.integral = self.load_photon_arrays(replicas)
+        self.interpolator = [
+            interp1d(XGRID, photon_array, fill_value=0.0, kind="cubic")
+            for photon_array in photon_arrays
+        ]
 
-        self.interpolator = []
-        self.integral = []
+    def cache_file(self, replica):
+        """Return the path of the file where the photon array of the given replica is cached.
+        The name of the file is a hash of all the inputs the photon array depends on."""
+        key = {
+            "theoryid": self.theoryid.id,
+            "luxset": self.luxset.name,
+            "replica": int(replica),
+            "luxseed": self.luxseed,
+            "additional_errors": self.additional_errors.name if self.additional_errors else None,
+            "fiatlux_runcard": self.fiatlux_runcard,
+            "xgrid": XGRID.tolist(),
+        }
+        key_hash = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+        return self.cache_path / f"photon_{self.theoryid.id}_{key_hash}.npz"
+
+    def load_photon_arrays(self, replicas):
+        """
+        Return the photon arrays and their integrals for the given replicas.
+        They are read from the cache when available, otherwise they are computed
+        and saved in the cache.
 
+        Returns
+        -------
+        photon_arrays: list(numpy.array)
+            photon PDF at the fitting scale Q0 for each replica
+        integrals: list(float)
+            integral of the photon PDF for each replica
+        """
+        photon_arrays = {}
+        integrals = {}
         for replica in replicas:
-            f2 = sf.InterpStructureFunction(path_to_F2, self.luxpdfset.members[replica])
-            fl = sf.InterpStructureFunction(path_to_FL, self.luxpdfset.members[replica])
-            if not np.isclose(f2.q2_max, fl.q2_max):
-                log.error(
-                    "FKtables for fiatlux_dis_F2 and fiatlux_dis_FL have two different q2_max"
-                )
-
-            fiatlux_runcard["q2_max"] = float(f2.q2_max)
-            f2lo = sf.F2LO(self.luxpdfset.members[replica], theory)
-            with tempfile.NamedTemporaryFile(mode="w") as tmp:
-                with tmp.file as tmp_file:
-                    tmp_file.write(yaml.dump(fiatlux_runcard))
-                self.lux[replica] = fiatlux.FiatLux(tmp.name)
-            # we have a dict but fiatlux wants a yaml file
-            # TODO : once that fiatlux will allow dictionaries
-            # pass directly fiatlux_runcard
-
-            self.lux[replica].PlugAlphaQED(alpha.alpha_em, alpha.qref)
-            self.lux[replica].InsertInelasticSplitQ(
-                [
-                    mb_thr,
-                    mt_thr,
-                ]
-            )
-            self.lux[replica].PlugStructureFunctions(f2.fxq, fl.fxq, f2lo.fxq)
-
-            photon_array = self.compute_photon_array(replica)
-            self.interpolator.append(interp1d(XGRID, photon_array, fill_value=0.0, kind="cubic"))
-            self.integral.append(trapezoid(photon_array, XGRID))
+            cache_file = self.cache_file(replica)
+            if cache_file.exists():
+                with np.load(cache_file) as data:
+                    photon_arrays[replica] = data["photon_array"]
+                    integrals[replica] = float(data["integral"])
+
+        missing = [replica for replica in replicas if replica not in photon_arrays]
+        if len(missing) < len(replicas):
+            log.info(f"Photon read from cache for {len(replicas) - len(missing)} replicas")
+        if missing:
+            self.cache_path.mkdir(parents=True, exist_ok=True)
+            for replica, photon_array in zip(missing, self.compute_photon_arrays(missing)):
+                photon_arrays[replica] = photon_array
+                integrals[replica] = float(trapezoid(photon_array, XGRID))
+                # write to a temporary file first so that concurrent runs never read a partial file
+                fd, tmp_path = tempfile.mkstemp(suffix=".npz", dir=self.cache_path)
+                os.close(fd)
+                np.savez(tmp_path, photon_array=photon_array, integral=integrals[replica])
+                os.replace(tmp_path, self.cache_file(replica))
+
+        return [photon_arrays[r] for r in replicas], [integrals[r] for r in replicas]
+
+    def evaluate_fiatlux(self, replicas):
+        """
+        Compute x * gamma(x) at the scale Q_IN with fiatlux for every point in XGRID
+        and for each of the given replicas.
 
-    def compute_photon_array(self, replica):
+        Returns
+        -------
+        photon_qin: numpy.array
+            array of shape (replicas, xgrid)
+        """
+        args = (self.luxset, self.theory, self.fiatlux_runcard, self.path_to_F2, self.path_to_FL)
+        max_workers = _available_cpus()
+        if self.max_workers is not None:
+            max_workers = min(max_workers, self.max_workers)
+        max_workers = min(max_workers, len(replicas))
+        if max_workers <= 1:
+            return np.array([_evaluate_fiatlux(replica, *args) for replica in replicas])
+        log.info(f"Computing the photon for {len(replicas)} replicas with {max_workers} processes")
+        # fiatlux is run in fresh processes, independent of the state of the parent process
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=get_context("spawn")
+        ) as executor:
+            futures = [executor.submit(_evaluate_fiatlux, replica, *args) for replica in replicas]
+            return np.array([future.result() for future in futures])
+
+    def compute_photon_arrays(self, replicas):
         r"""
-        Compute the photon PDF for every point in the grid xgrid.
+        Compute the photon PDF for every point in the grid xgrid
+        for each of the given replicas.
 
         Parameters
         ----------
-        replica: int
-            replica id
+        replicas: list(int)
+            replica ids
 
         Returns
         -------
-        compute_photon_array: numpy.array
-            photon PDF at the fitting scale Q0
+        compute_photon_arrays: numpy.array
+            photon PDF at the fitting scale Q0, with shape (replicas, xgrid)
         """
         # Compute photon PDF
         log.info(f"Computing photon")
-        photon_qin = np.array([self.lux[replica].EvaluatePhoton(x, Q_IN**2).total for x in XGRID])
-        photon_qin += self.generate_errors(replica)
+        photon_qin = self.evaluate_fiatlux(replicas)
+        photon_qin += np.array([self.generate_errors(replica) for replica in replicas])
         # fiatlux computes x * gamma(x)
         photon_qin /= XGRID
-        # TODO : the different x points could be even computed in parallel
-
-        # Load eko and reshape it
-        with EKO.read(self.path_to_eko_photon) as eko:
-            # TODO : if the eko has not the correct grid we have to reshape it
-            # it has to be done inside vp-setupfit
-
-            # construct PDFs
-            pdfs_init = np.zeros((len(eko.rotations.inputpids), len(XGRID)))
-            for j, pid in enumerate(eko.rotations.inputpids):
-                if pid == 22:
-                    pdfs_init[j] = photon_qin
-                    ph_id = j
-                else:
-                    if pid not in self.luxpdfset.flavors:
-                        continue
-                    pdfs_init[j] = np.array(
-                        [self.luxpdfset.xfxQ(x, Q_IN, replica, pid) / x for x in XGRID]
-                    )
+
+        # Load eko reshaped to XGRID
+        with EKO.read(self.eko_photon) as eko:
+            # construct PDFs for all replicas at once
+            inputpids = list(eko.rotations.inputpids)
+            pids = [pid for pid in inputpids if pid != 22 and pid in self.luxpdfset.flavors]
+            # (members, flavors, xgrid, qgrid) -> (replicas, flavors, xgrid)
+            xfx = self.luxpdfset.grid_values(pids, XGRID, [Q_IN])[replicas, ..., 0]
+            pdfs_init = np.zeros((len(replicas), len(inputpids), len(XGRID)))
+            pdfs_init[:, [inputpids.index(pid) for pid in pids]] = xfx / XGRID
+            ph_id = inputpids.index(22)
+            pdfs_init[:, ph_id] = photon_qin
 
             # Apply EKO to PDFs
             q2 = eko.mu2grid[0]
             with eko.operator(q2) as elem:
-                pdfs_final = np.einsum("ajbk,bk", elem.operator, pdfs_init)
-
-        photon_Q0 = pdfs_final[ph_id]
+                photon_Q0 = np.einsum("jbk,rbk->rj", elem.operator[ph_id], pdfs_init)
 
         # we want x * gamma(x)
         return XGRID * photon_Q0
 
+    def compute_photon_array(self, replica):
+        r"""
+        Compute the photon PDF for every point in the grid xgrid.
+
+        Parameters
+        ----------
+        replica: int
+            replica id
+
+        Returns
+        -------
+        compute_photon_array: numpy.array
+            photon PDF at the fitting scale Q0
+        """
+        return self.compute_photon_arrays([replica])[0]
+
+    @cached_property
+    def eko_photon(self):
+        """Path of the photon eko with the grids reshaped to XGRID,
+        the reshaped eko is taken from the cache shared with ``evolven3fit_new``"""
+        return reshaped_eko(self.theoryid.id, self.path_to_eko_photon, XGRID)
+
     def __call__(self, xgrid):
         """
         Compute the photon interpolating the values of self.photon_array.
@@ -182,7 +275,7 @@ class Photon:
             for id in range(len(self.replicas))
         ]
 
-    @property
+    @cached_property
     def error_matrix(self):
         """Generate error matrix to be used in generate_errors."""
         if not self.additional_errors:
@@ -212,6 +305,35 @@ class Photon:
         return errors
 
 
+def _evaluate_fiatlux(replica, luxset, theory, fiatlux_runcard, path_to_F2, path_to_FL):
+    """Compute x * gamma(x) at the scale Q_IN with fiatlux for every point in XGRID
+    for the given replica of the luxset.
+    It is defined at module level so that it can be run in a pool of processes."""
+    pdfs = luxset.load().members[replica]
+    f2 = sf.InterpStructureFunction(path_to_F2, pdfs)
+    fl = sf.InterpStructureFunction(path_to_FL, pdfs)
+    if not np.isclose(f2.q2_max, fl.q2_max):
+        log.error("FKtables for fiatlux_dis_F2 and fiatlux_dis_FL have two different q2_max")
+
+    fiatlux_runcard = dict(fiatlux_runcard, q2_max=float(f2.q2_max))
+    f2lo = sf.F2LO(pdfs, theory)
+    # we have a dict but fiatlux wants a yaml file
+    # TODO : once that fiatlux will allow dictionaries
+    # pass directly fiatlux_runcard
+    with tempfile.NamedTemporaryFile(mode="w") as tmp:
+        with tmp.file as tmp_file:
+            tmp_file.write(yaml.dump(fiatlux_runcard))
+        lux = fiatlux.FiatLux(tmp.name)
+
+    alpha = Alpha(theory)
+    mb_thr = theory["kbThr"] * theory["mb"]
+    mt_thr = theory["ktThr"] * theory["mt"] if theory["MaxNfPdf"] == 6 else 1e100
+    lux.PlugAlphaQED(alpha.alpha_em, alpha.qref)
+    lux.InsertInelasticSplitQ([mb_thr, mt_thr])
+    lux.PlugStructureFunctions(f2.fxq, fl.fxq, f2lo.fxq)
+    return np.array([lux.EvaluatePhoton(x, Q_IN**2).total for x in XGRID])
+
+
 class Alpha:
     def __init__(self, theory):
         self.theory = theory
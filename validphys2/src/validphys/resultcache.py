@@ -0,0 +1,338 @@
+"""
+resultcache.py
+
+Persistent store for the results of expensive validphys providers, so that they
+can be reused across different runs (for instance when iterating over the plots of a report).
+
+Providers opt into the store with the :py:func:`persistent_cache` decorator.
+The store is disabled by default and enabled by the ``--cache-results`` flag of
+validphys (or by calling :py:func:`enable_result_cache`),
+in which case the result of every call is stored in the ``results`` folder of the validphys cache
+keyed on a stable hash of the inputs of the provider:
+
+ - PDFs by their name and the size and modification time of the files of the set.
+ - Specifications such as datasets, fktables, cuts and theories by their
+   comparison tuple, with all the files they refer to identified in the same way.
+ - Arrays and tables by a hash of their contents.
+
+The provider, the version of validphys and a hash of the source code of the whole
+validphys package (so that any change to the code a provider depends on, even in
+a development installation, invalidates its stored results) are also part of the key.
+A provider called with any other kind of input is computed as usual and not stored.
+When the store grows larger than its maximum size (which can be set with the
+``result_cache_max_gb`` key of the nnprofile), the least recently used results are removed.
+
+The store can be inspected and cleared with the ``vp-resultcache`` script.
+"""
+import contextlib
+import dataclasses
+import enum
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pathlib
+import pickle
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from validphys import filters
+from validphys.core import PDF, TheoryIDSpec, TupleComp
+
+log = logging.getLogger(__name__)
+
+RESULT_CACHE_FOLDER = "results"
+RESULT_CACHE_ENV = "VALIDPHYS_RESULT_CACHE"
+DEFAULT_MAX_SIZE_GB = 10
+
+
+class UncacheableInput(Exception):
+    """Raised when an input cannot be turned into a stable key"""
+
+
+def _file_token(path):
+    path = pathlib.Path(path)
+    try:
+        stat = path.stat()
+    except OSError:
+        return {"path": str(path)}
+    return {"path": str(path), "size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+
+@functools.singledispatch
+def stable_token(value):
+    """Return a JSON-serializable representation of ``value`` which does not change
+    between runs as long as the value (and the files it refers to) does not change.
+    Raises :py:class:`UncacheableInput` for values that cannot be represented."""
+    raise UncacheableInput(f"Cannot compute a stable key for {type(value)}")
+
+
+@stable_token.register(type(None))
+@stable_token.register(bool)
+@stable_token.register(int)
+@stable_token.register(float)
+@stable_token.register(str)
+def _(value):
+    return value
+
+
+@stable_token.register(np.generic)
+def _(value):
+    return value.item()
+
+
+@stable_token.register(enum.Enum)
+def _(value):
+    return f"{type(value).__qualname__}.{value.name}"
+
+
+@stable_token.register(pathlib.PurePath)
+def _(value):
+    return _file_token(value)
+
+
+@stable_token.register(tuple)
+@stable_token.register(list)
+def _(value):
+    return [stable_token(i) for i in value]
+
+
+@stable_token.register(dict)
+def _(value):
+    return [[stable_token(k), stable_token(v)] for k, v in sorted(value.items(), key=str)]
+
+
+@stable_token.register(np.ndarray)
+def _(value):
+    digest = hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()
+    return {"array": digest, "shape": list(value.shape), "dtype": str(value.dtype)}
+
+
+@stable_token.register(pd.Series)
+@stable_token.register(pd.DataFrame)
+def _(value):
+    digest = hashlib.sha256(pd.util.hash_pandas_object(value).values.tobytes()).hexdigest()
+    columns = list(map(str, value.columns)) if isinstance(value, pd.DataFrame) else value.name
+    return {"table": digest, "columns": stable_token(columns), "shape": list(value.shape)}
+
+
+@stable_token.register(PDF)
+def _(value):
+    info = value.infopath
+    members = sorted(info.parent.glob("*.dat"))
+    return {"pdf": value.name, "files": [_file_token(i) for i in (info, *members)]}
+
+
+@stable_token.register(TheoryIDSpec)
+def _(value):
+    return {"theoryid": value.id, "path": str(value.path)}
+
+
+@stable_token.register(TupleComp)
+def _(value):
+    return {type(value).__qualname__: stable_token(value.comp_tuple)}
+
+
+@stable_token.register(filters.Rule)
+def _(value):
+    pto = getattr(value, "PTO", None)
+    return {
+        "rule": value.rule_string,
+        "dataset": value.dataset,
+        "process_type": value.process_type,
+        "theoryid": value.theory_params["ID"],
+        "defaults": stable_token(value.defaults),
+        "local_variables": stable_token(value.local_variables),
+        "PTO": pto.string if pto is not None else None,
+    }
+
+
+def provider_name(func):
+    """Name identifying the provider ``func`` in the store"""
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+@functools.lru_cache
+def _source_hash(func):
+    return hashlib.sha256(inspect.getsource(func).encode()).hexdigest()
+
+
+@functools.lru_cache
+def _package_hash():
+    """Hash of the source files of the validphys package, since the result of a
+    provider depends on code beyond the provider itself"""
+    package = pathlib.Path(__file__).parent
+    digest = hashlib.sha256()
+    for path in sorted(package.rglob("*.py")):
+        if "tests" in path.relative_to(package).parts:
+            continue
+        digest.update(str(path.relative_to(package)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def result_key(func, args, kwargs):
+    """Stable hash of the call of ``func`` with ``args`` and ``kwargs``"""
+    from validphys import __version__
+
+    bound = inspect.signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    key = {
+        "provider": provider_name(func),
+        "source": _source_hash(func),
+        "package": _package_hash(),
+        "version": __version__,
+        "args": {k: stable_token(v) for k, v in bound.arguments.items()},
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+@dataclasses.dataclass
+class CacheEntry:
+    """Information about a result in the store"""
+
+    provider: str
+    path: pathlib.Path
+    size: int
+    last_used: float
+
+
+class ResultCache:
+    """Folder in which the results of the providers are stored as pickle files
+    named ``<provider>_<key>.pkl``.
+
+    Parameters
+    ----------
+        path: pathlib.Path
+            folder of the store
+        max_size: int
+            maximum size of the store in bytes, the least recently used
+            results are removed when it is exceeded
+    """
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE_GB * 1024**3):
+        self.path = pathlib.Path(path)
+        self.max_size = max_size
+
+    def _file(self, provider, key):
+        return self.path / f"{provider}_{key}.pkl"
+
+    def get(self, provider, key):
+        """Return ``(True, result)`` if the result is stored and ``(False, None)`` otherwise"""
+        path = self._file(provider, key)
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+        except FileNotFoundError:
+            return False, None
+        except Exception as e:
+            log.warning(f"Could not read the stored result {path}, it will be recomputed: {e}")
+            return False, None
+        # Mark the result as recently used
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path)
+        return True, result
+
+    def put(self, provider, key, result):
+        """Store ``result`` and evict old results if the store is too large"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first so that concurrent runs never read a partial file
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.path)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            os.unlink(tmp_path)
+            log.warning(f"The result of {provider} could not be stored: {e}")
+            return
+        os.replace(tmp_path, self._file(provider, key))
+        self.prune(self.max_size)
+
+    def entries(self):
+        """List of :py:class:`CacheEntry` in the store, the most recently used first"""
+        entries = []
+        if not self.path.is_dir():
+            return entries
+        for path in self.path.glob("*.pkl"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            provider = path.stem.rsplit("_", 1)[0]
+            entries.append(CacheEntry(provider, path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry.last_used, reverse=True)
+
+    def prune(self, max_size):
+        """Remove the least recently used results until the store is smaller
+        than ``max_size`` bytes. Returns the removed entries."""
+        entries = self.entries()
+        total = sum(entry.size for entry in entries)
+        removed = []
+        while entries and total > max_size:
+            entry = entries.pop()
+            entry.path.unlink(missing_ok=True)
+            total -= entry.size
+            removed.append(entry)
+        return removed
+
+    def clear(self, provider=None):
+        """Remove all results, or only those of ``provider``. Returns the removed entries."""
+        removed = [i for i in self.entries() if provider is None or i.provider == provider]
+        for entry in removed:
+            entry.path.unlink(missing_ok=True)
+        return removed
+
+
+def default_cache_path():
+    """Folder of the store in the validphys cache"""
+    from validphys.loader import Loader
+
+    return Loader()._vp_cache() / RESULT_CACHE_FOLDER
+
+
+def enable_result_cache(path=None):
+    """Enable the store for the providers decorated with :py:func:`persistent_cache`
+    in this process and in the processes it starts. By default the store is in the
+    validphys cache."""
+    if path is None:
+        path = default_cache_path()
+    os.environ[RESULT_CACHE_ENV] = str(path)
+
+
+@functools.lru_cache
+def _get_cache(path):
+    from validphys.loader import Loader
+
+    max_gb = Loader().nnprofile.get("result_cache_max_gb", DEFAULT_MAX_SIZE_GB)
+    return ResultCache(path, max_size=max_gb * 1024**3)
+
+
+def persistent_cache(func):
+    """Decorator for pure providers whose result can be stored across runs.
+    It has no effect unless the store is enabled (see :py:func:`enable_result_cache`)."""
+    provider = provider_name(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        path = os.environ.get(RESULT_CACHE_ENV)
+        if not path:
+            return func(*args, **kwargs)
+        try:
+            key = result_key(func, args, kwargs)
+        except UncacheableInput as e:
+            log.debug(f"Not storing the result of {provider}: {e}")
+            return func(*args, **kwargs)
+        cache = _get_cache(path)
+        found, result = cache.get(provider, key)
+        if found:
+            log.debug(f"Result of {provider} read from {cache.path}")
+            return result
+        result = func(*args, **kwargs)
+        cache.put(provider, key, result)
+        return result
+
+    return wrapper
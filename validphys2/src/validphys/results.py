@@ -26,6 +26,7 @@ from validphys.checks import (
 )
 from validphys.convolution import PredictionsRequireCutsError, predictions
 from validphys.core import PDF, DataGroupSpec, DataSetSpec, Stats
+from validphys.resultcache import persistent_cache
 
 log = logging.getLogger(__name__)
 
@@ -222,28 +223,17 @@ procs_results = collect("dataset_inputs_results", ("group_dataset_inputs_by_proc
 def group_result_table_no_table(groups_results, groups_index):
     """Generate a table containing the data central value, the central prediction,
     and the prediction for each PDF member."""
-    result_records = []
-    for group_results in groups_results:
-        dt, th = group_results
-        for index, (dt_central, th_central) in enumerate(zip(dt.central_value, th.central_value)):
-            replicas = (
-                ("rep_%05d" % (i + 1), th_rep)
-                for i, th_rep in enumerate(th.error_members[index, :])
-            )
-
-            result_records.append(
-                dict(
-                    [
-                        ("data_central", dt_central),
-                        ("theory_central", th_central),
-                        *replicas,
-                    ]
-                )
-            )
-    if not result_records:
+    if sum(len(dt.central_value) for dt, _ in groups_results) == 0:
         log.warning("Empty records for group results")
         return pd.DataFrame()
-    df = pd.DataFrame(result_records, columns=result_records[0].keys(), index=groups_index)
+    data_central = np.concatenate([dt.central_value for dt, _ in groups_results])
+    theory_central = np.concatenate([th.central_value for _, th in groups_results])
+    replicas = np.concatenate([th.error_members for _, th in groups_results])
+    columns = ["data_central", "theory_central"] + [
+        "rep_%05d" % (i + 1) for i in range(replicas.shape[1])
+    ]
+    values = np.column_stack([data_central, theory_central, replicas])
+    df = pd.DataFrame(values, columns=columns, index=groups_index)
 
     return df
 
@@ -430,6 +420,7 @@ def procs_corrmat(procs_covmat):
     return groups_corrmat(procs_covmat)
 
 
+@persistent_cache
 def results(dataset: (DataSetSpec), pdf: PDF, covariance_matrix, sqrt_covmat):
     """Tuple of data and theory results for a single pdf. The data will have an associated
     covariance matrix, which can include a contribution from the theory covariance matrix which
@@ -455,6 +446,7 @@ def dataset_inputs_results(
 # It's better to duplicate a few lines than to complicate the logic of
 # ``results`` to support this.
 # TODO: The above comment doesn't make sense after adding T0. Deprecate this
+@persistent_cache
 def pdf_results(
     dataset: (DataSetSpec, DataGroupSpec),
     pdfs: Sequence,
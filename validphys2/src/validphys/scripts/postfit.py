@@ -18,6 +18,8 @@ import os.path
 import shutil
 import pathlib
 import argparse
+import collections
+from concurrent.futures import ThreadPoolExecutor
 import itertools
 from glob import glob
 import logging
@@ -28,7 +30,6 @@ from reportengine import colors
 from validphys import lhio
 from validphys import fitdata
 from validphys import fitveto
-from validphys.core import PDF
 from validphys.fitveto import NSIGMA_DISCARD_ARCLENGTH, NSIGMA_DISCARD_CHI2, INTEG_THRESHOLD
 from validphys.utils import tempfile_cleaner
 
@@ -63,6 +64,32 @@ def set_lhapdf_info(info_path, nrep):
         f.truncate()
 
 
+def link_replica(drep, source_path, postfit_path, LHAPDF_path, fitname):
+    """ Symlinks the replica at 'source_path' as replica 'drep' of the postfit
+    and LHAPDF directories """
+    # Symlink results to postfit directory
+    source_dir = pathlib.Path(source_path).resolve()
+    target_dir = postfit_path.joinpath('replica_%d' % drep)
+    relative_symlink(source_dir, target_dir)
+    # Symlink results to pdfset directory
+    source_grid = source_dir.joinpath(fitname+'.dat')
+    target_file = f'{fitname}_{drep:04d}.dat'
+    target_grid = LHAPDF_path.joinpath(target_file)
+    relative_symlink(source_grid, target_grid)
+
+
+def prefetch(func, items, executor, window):
+    """ Yields func(item) for every item, in order, computing up to 'window'
+    of them in advance with 'executor' """
+    pending = collections.deque()
+    for item in items:
+        pending.append(executor.submit(func, item))
+        if len(pending) > window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
 class PostfitError(Exception):
     """Exception raised when postfit cannot succeed and knows why"""
     pass
@@ -71,14 +98,26 @@ class FatalPostfitError(Exception):
     """Exception raised when some corrupted input is detected"""
     pass
 
-def filter_replicas(postfit_path, nnfit_path, fitname, chi2_threshold, arclength_threshold, integ_threshold):
+def _load_replica_fitinfo(path, fitname):
+    try:
+        return fitdata.load_fitinfo(pathlib.Path(path), fitname)
+    except Exception as e:
+        raise FatalPostfitError(
+            f"Corrupted replica replica at {path}. "
+            f"Error when loading replica information:\n {e}") from e
+
+
+def filter_replicas(postfit_path, nnfit_path, fitname, chi2_threshold, arclength_threshold, integ_threshold, executor=None):
     """ Find the paths of all replicas passing the standard NNPDF fit vetoes
-    as defined in fitveto.py. Returns a list of the replica directories that pass."""
+    as defined in fitveto.py. Returns a list of the replica directories that pass.
+    If an ``executor`` is given, the files of the replicas are checked and read concurrently."""
+    mapper = map if executor is None else executor.map
     # This glob defines what is considered a valid replica
     # all the following code uses paths from this glob
     # We sort the paths so that the selection of replicas is deterministic
     all_replicas   = sorted(glob(f"{nnfit_path}/replica_*/"))
-    valid_paths = [path for path in all_replicas if fitdata.check_replica_files(path, fitname)]
+    valid = mapper(fitdata.check_replica_files, all_replicas, itertools.repeat(fitname))
+    valid_paths = list(itertools.compress(all_replicas, list(valid)))
     log.info(f"{len(all_replicas)} total replicas found")
     log.info(f"{len(valid_paths)} valid replicas found")
 
@@ -86,14 +125,7 @@ def filter_replicas(postfit_path, nnfit_path, fitname, chi2_threshold, arclength
         raise PostfitError("No valid replicas found")
 
     # Read FitInfo and compute vetoes
-    fitinfo = []
-    for path in valid_paths:
-        try:
-            fitinfo.append(fitdata.load_fitinfo(pathlib.Path(path), fitname))
-        except Exception as e:
-            raise FatalPostfitError(
-                f"Corrupted replica replica at {path}. "
-                f"Error when loading replica information:\n {e}") from e
+    fitinfo = list(mapper(_load_replica_fitinfo, valid_paths, itertools.repeat(fitname)))
     fit_vetoes = fitveto.determine_vetoes(fitinfo, chi2_threshold, arclength_threshold, integ_threshold)
     fitveto.save_vetoes_info(
         fit_vetoes, chi2_threshold, arclength_threshold, integ_threshold, postfit_path / "veto_count.json"
@@ -118,7 +150,7 @@ def type_fitname(fitname: str):
     return fitpath
 
 
-def _postfit(results: str, nrep: int, chi2_threshold: float, arclength_threshold: float, integ_threshold: float, at_least_nrep: bool):
+def _postfit(results: str, nrep: int, chi2_threshold: float, arclength_threshold: float, integ_threshold: float, at_least_nrep: bool, jobs: int = 1):
     result_path = pathlib.Path(results).resolve()
     fitname = result_path.name
 
@@ -133,7 +165,7 @@ def _postfit(results: str, nrep: int, chi2_threshold: float, arclength_threshold
         exc=(KeyboardInterrupt, PostfitError),
         prefix="postfit_work_deleteme_",
         dst=final_postfit_path,
-    ) as postfit_path:
+    ) as postfit_path, ThreadPoolExecutor(jobs) as executor:
 
         LHAPDF_path  = postfit_path/fitname     # Path for LHAPDF grid output
 
@@ -163,7 +195,7 @@ def _postfit(results: str, nrep: int, chi2_threshold: float, arclength_threshold
         log.addHandler(postfitlog)
 
         # Perform postfit selection
-        passing_paths = filter_replicas(postfit_path, nnfit_path, fitname, chi2_threshold, arclength_threshold, integ_threshold)
+        passing_paths = filter_replicas(postfit_path, nnfit_path, fitname, chi2_threshold, arclength_threshold, integ_threshold, executor)
         if len(passing_paths) < nrep:
             raise PostfitError("Number of requested replicas is too large")
         # Select the first nrep passing replicas
@@ -179,27 +211,26 @@ def _postfit(results: str, nrep: int, chi2_threshold: float, arclength_threshold
         shutil.copy2(info_source_path, info_target_path)
         set_lhapdf_info(info_target_path, len(selected_paths))
 
-        # Generate symlinks
-        for drep, source_path in enumerate(selected_paths, 1):
-            # Symlink results to postfit directory
-            source_dir = pathlib.Path(source_path).resolve()
-            target_dir = postfit_path.joinpath('replica_%d' % drep)
-            relative_symlink(source_dir, target_dir)
-            # Symlink results to pdfset directory
-            source_grid = source_dir.joinpath(fitname+'.dat')
-            target_file = f'{fitname}_{drep:04d}.dat'
-            target_grid = LHAPDF_path.joinpath(target_file)
-            relative_symlink(source_grid, target_grid)
-
-        log.info(f"{len(selected_paths)} replicas written to the postfit folder")
-
-        # Generate final PDF with replica 0
+        # Generate final PDF with replica 0, in a separate thread so that it overlaps
+        # with the creation of the symlinks while the grids are read by the executor
         log.info("Beginning construction of replica 0")
+        source_grids = [
+            pathlib.Path(source_path).resolve() / f"{fitname}.dat" for source_path in selected_paths
+        ]
+        read_grid = lambda path: lhio.read_replica_subgrids(path)[1]
+        with ThreadPoolExecutor(1) as replica0_executor:
+            replica0 = replica0_executor.submit(
+                lhio.mean_replica_subgrids, prefetch(read_grid, source_grids, executor, jobs)
+            )
+            # Generate symlinks
+            for drep, source_path in enumerate(selected_paths, 1):
+                link_replica(drep, source_path, postfit_path, LHAPDF_path, fitname)
+            log.info(f"{len(selected_paths)} replicas written to the postfit folder")
+            lhio.write_replica_subgrids(0, LHAPDF_path, lhio.REPLICA0_HEADER, replica0.result())
+
         # It's important that this is prepended, so that any existing instance of
         # `fitname` is not read from some other path
         lhapdf.pathsPrepend(str(postfit_path))
-        generatingPDF = PDF(fitname)
-        lhio.generate_replica0(generatingPDF)
 
         # Test replica 0
         try:
@@ -252,6 +283,11 @@ def main():
         action='store_true',
         help="nrep becomes the minimum number of required replicas. If there are more than nrep "
              "good replicas, all good replicas are written to the postfit folder.")
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help="Number of threads used to read the replica files. The default is 1.")
     parser.add_argument('-d', '--debug', action='store_true', help='show debug messages')
     args = parser.parse_args()
     if args.debug:
@@ -259,7 +295,7 @@ def main():
     else:
         log.setLevel(logging.INFO)
     try:
-        _postfit(args.result_path, args.nrep, args.chi2_threshold, args.arclength_threshold, args.integrability_threshold, args.at_least_nrep)
+        _postfit(args.result_path, args.nrep, args.chi2_threshold, args.arclength_threshold, args.integrability_threshold, args.at_least_nrep, args.jobs)
     except PostfitError as e:
         log.error(f"Error in postfit:\n{e}")
         sys.exit(1)
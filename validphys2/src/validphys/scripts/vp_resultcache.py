@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+"""
+        vp-resultcache - inspect and clear the persistent store of validphys results
+
+        The results of some expensive validphys providers are stored across runs
+        when validphys is run with --cache-results.
+        vp-resultcache lists the stored results (grouped by provider) and allows
+        removing all of them, those of a single provider or the least recently used ones.
+"""
+import argparse
+import datetime
+import logging
+import sys
+
+from reportengine import colors
+
+from validphys.resultcache import ResultCache, default_cache_path
+
+log = logging.getLogger()
+log.setLevel(logging.INFO)
+log.addHandler(colors.ColorHandler())
+
+
+def _format_size(size):
+    return f"{size / 1024**2:.1f} MB"
+
+
+def process_args():
+    parser = argparse.ArgumentParser(description=__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        '--path',
+        default=None,
+        help="Folder of the store. By default the results folder of the validphys cache.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help="Show the number and size of the results of each provider")
+    clear = subparsers.add_parser('clear', help="Remove the stored results")
+    clear.add_argument(
+        '--provider',
+        default=None,
+        help="Only remove the results of this provider (e.g. validphys.results.results)")
+    prune = subparsers.add_parser(
+        'prune', help="Remove the least recently used results until the store is small enough")
+    prune.add_argument('max_size', type=float, help="Maximum size of the store in GB")
+    return parser.parse_args()
+
+
+def main():
+    args = process_args()
+    cache = ResultCache(args.path if args.path is not None else default_cache_path())
+    if args.command == 'list':
+        entries = cache.entries()
+        if not entries:
+            log.info(f"No results stored in {cache.path}")
+            return
+        providers = {}
+        for entry in entries:
+            providers.setdefault(entry.provider, []).append(entry)
+        print(f"Results stored in {cache.path}:")
+        for provider, provider_entries in sorted(providers.items()):
+            last_used = datetime.datetime.fromtimestamp(provider_entries[0].last_used)
+            print(
+                f"  {provider}: {len(provider_entries)} results, "
+                f"{_format_size(sum(i.size for i in provider_entries))}, "
+                f"last used {last_used:%Y-%m-%d %H:%M}"
+            )
+        print(f"Total: {len(entries)} results, {_format_size(sum(i.size for i in entries))}")
+    elif args.command == 'clear':
+        removed = cache.clear(args.provider)
+        log.info(f"Removed {len(removed)} results ({_format_size(sum(i.size for i in removed))})")
+    elif args.command == 'prune':
+        if args.max_size < 0:
+            log.error("The maximum size cannot be negative")
+            sys.exit(1)
+        removed = cache.prune(args.max_size * 1024**3)
+        log.info(f"Removed {len(removed)} results ({_format_size(sum(i.size for i in removed))})")
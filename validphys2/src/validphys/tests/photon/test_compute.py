@@ -3,8 +3,10 @@ from pathlib import Path
 
 import fiatlux
 import numpy as np
-from validphys.photon import structure_functions
-from validphys.photon.compute import Photon, Alpha
+from scipy.integrate import trapezoid
+from validphys.photon import compute, structure_functions
+from validphys.photon.compute import FIATLUX_DEFAULT, Photon, Alpha
+from n3fit.io.writer import XGRID
 from validphys.core import PDF as PDFset
 
 from ..conftest import PDF
@@ -12,6 +14,7 @@ from ..conftest import PDF
 
 class FakeTheory:
     def __init__(self):
+        self.id = 0
         self.path = Path("/fake/path/")
 
     def get_description(self):
@@ -88,15 +91,17 @@ class FakeF2LO:
         return 0
 
 
-def test_parameters_init(monkeypatch):
+def test_parameters_init(monkeypatch, tmp_path):
     monkeypatch.setattr(
         structure_functions, "InterpStructureFunction", FakeStructureFunction
     )
     monkeypatch.setattr(structure_functions, "F2LO", FakeF2LO)
     monkeypatch.setattr(fiatlux, "FiatLux", FakeFiatlux)
-    monkeypatch.setattr(Photon, "compute_photon_array", lambda *args: np.zeros(196))
+    monkeypatch.setattr(
+        Photon, "compute_photon_arrays", lambda self, replicas: np.zeros((len(replicas), 196))
+    )
 
-    photon = Photon(FakeTheory(), fiatlux_runcard, [1, 2, 3])
+    photon = Photon(FakeTheory(), fiatlux_runcard, [1, 2, 3], cache_path=tmp_path)
     alpha = Alpha(FakeTheory().get_description())
 
     np.testing.assert_equal(photon.replicas, [1, 2, 3])
@@ -107,6 +112,48 @@ def test_parameters_init(monkeypatch):
         alpha.alpha_em_ref, FakeTheory().get_description()["alphaqed"]
     )
 
+def test_evaluate_fiatlux(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        structure_functions, "InterpStructureFunction", FakeStructureFunction
+    )
+    monkeypatch.setattr(structure_functions, "F2LO", FakeF2LO)
+    monkeypatch.setattr(fiatlux, "FiatLux", FakeFiatlux)
+    monkeypatch.setattr(
+        Photon, "compute_photon_arrays", lambda self, replicas: np.zeros((len(replicas), 196))
+    )
+
+    photon = Photon(FakeTheory(), fiatlux_runcard, [1, 2, 3], max_workers=1, cache_path=tmp_path)
+    photon_qin = photon.evaluate_fiatlux([1, 2, 3])
+    np.testing.assert_equal(photon_qin.shape, (3, len(XGRID)))
+    np.testing.assert_allclose(photon_qin, 0.0)
+    # the default runcard is not modified
+    assert "q2_max" not in FIATLUX_DEFAULT
+    # a process pinned to a single cpu does not start a pool of processes
+    monkeypatch.setattr(compute, "_available_cpus", lambda: 1)
+    monkeypatch.setattr(compute, "ProcessPoolExecutor", None)
+    photon.max_workers = None
+    np.testing.assert_allclose(photon.evaluate_fiatlux([1, 2, 3]), 0.0)
+
+def test_photon_cache(monkeypatch, tmp_path):
+    computed = []
+
+    def fake_compute(self, replicas):
+        computed.extend(replicas)
+        return np.array([np.full(len(XGRID), replica) for replica in replicas], dtype=float)
+
+    monkeypatch.setattr(Photon, "compute_photon_arrays", fake_compute)
+    photon = Photon(FakeTheory(), fiatlux_runcard, [1, 2], cache_path=tmp_path)
+    assert computed == [1, 2]
+    # only the missing replica is computed, the others are read from the cache
+    photon = Photon(FakeTheory(), fiatlux_runcard, [2, 1, 3], cache_path=tmp_path)
+    assert computed == [1, 2, 3]
+    integral = trapezoid(np.ones_like(XGRID), XGRID)
+    np.testing.assert_allclose(photon.integral, np.array([2.0, 1.0, 3.0]) * integral)
+    np.testing.assert_allclose(photon(XGRID[np.newaxis, :, np.newaxis])[0][0, :, 0], 2.0)
+    # a different seed is a different photon
+    photon = Photon(FakeTheory(), dict(fiatlux_runcard, luxseed=1), [1], cache_path=tmp_path)
+    assert computed == [1, 2, 3, 1]
+
 def test_masses_init():
     alpha = Alpha(FakeTheory().get_description())
     np.testing.assert_equal(alpha.thresh_t, np.inf)
@@ -120,7 +167,9 @@ def test_set_thresholds_alpha_em(monkeypatch):
     monkeypatch.setattr(structure_functions, "F2LO", FakeF2LO)
 
     monkeypatch.setattr(fiatlux, "FiatLux", FakeFiatlux)
-    monkeypatch.setattr(Photon, "compute_photon_array", lambda *args: np.zeros(196))
+    monkeypatch.setattr(
+        Photon, "compute_photon_arrays", lambda self, replicas: np.zeros((len(replicas), 196))
+    )
 
     alpha = Alpha(FakeTheory().get_description())
 
@@ -0,0 +1,40 @@
+"""
+test_figurepool.py
+
+Test that the figures saved by the pool of processes are the same as those
+saved by reportengine.
+"""
+from reportengine.figure import savefiglist
+from validphys import plotutils
+from validphys.figurepool import RENDER_JOBS_ENV
+from validphys.figurepool import savefiglist as pool_savefiglist
+
+
+def _figures():
+    figures = []
+    for i in range(3):
+        fig, ax = plotutils.subplots()
+        ax.plot([1, 2, 3], [1, 10**i, 100])
+        ax.set_title(f"Figure {i}")
+        figures.append((fig, f"fig {i}"))
+    # A figure which cannot be pickled, and is saved in the main process
+    ax.set_yscale("log")
+    ax.yaxis.set_major_formatter(plotutils.scalar_log_formatter())
+    return figures
+
+
+def test_pool_savefiglist(tmp_path, monkeypatch):
+    outputs = []
+    for jobs, folder in ((1, "serial"), (2, "pool")):
+        output = tmp_path / folder
+        (output / "figures").mkdir(parents=True)
+        paths = [output / "figures" / "plot.png", output / "figures" / "plot.pdf"]
+        monkeypatch.setenv(RENDER_JOBS_ENV, str(jobs))
+        if jobs == 1:
+            res = savefiglist(_figures(), paths, output)
+        else:
+            res = pool_savefiglist(_figures(), paths, output)
+        files = sorted(p.name for p in (output / "figures").iterdir())
+        outputs.append((res, files))
+    assert outputs[0] == outputs[1]
+    assert len(outputs[0][1]) == 6
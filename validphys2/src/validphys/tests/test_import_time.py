@@ -0,0 +1,44 @@
+"""
+Benchmark of the time needed to import the entry points of validphys.
+
+The plotting libraries should only be imported by the actions that need them,
+each import is run in a clean interpreter so that modules loaded by other tests don't interfere.
+"""
+import subprocess
+import sys
+
+import pytest
+
+# Generous limit, importing any of the heavy modules below is usually enough to go over it
+IMPORT_TIME_LIMIT = 10.0
+HEAVY_MODULES = ("seaborn", "tensorflow")
+
+IMPORT_BENCHMARK = """
+import sys
+import time
+
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+print(*[m for m in {heavy_modules} if m in sys.modules])
+"""
+
+
+def import_benchmark(module, heavy_modules=HEAVY_MODULES):
+    """Import ``module`` in a new interpreter and return the time it took
+    and the list of ``heavy_modules`` that were loaded as a result"""
+    code = IMPORT_BENCHMARK.format(module=module, heavy_modules=heavy_modules)
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    return float(output[-2]), output[-1].split()
+
+
+@pytest.mark.parametrize(
+    "module",
+    ["validphys.app", "validphys.config", "validphys.scripts.postfit", "validphys.scripts.vp_list"],
+)
+def test_import_time(module):
+    import_time, loaded = import_benchmark(module)
+    assert not loaded, f"Importing {module} loads {loaded}"
+    assert import_time < IMPORT_TIME_LIMIT
@@ -0,0 +1,24 @@
+"""
+test_lhio.py
+
+Tests for the reading and writing of LHAPDF grids.
+"""
+import numpy as np
+
+from validphys.lhio import load_replica, new_pdf_from_indexes, read_replica_subgrids, rep_matrix
+from validphys.loader import FallbackLoader as Loader
+from validphys.tests.conftest import PDF
+
+
+def test_new_pdf_from_indexes(tmp_path):
+    """Check that the streamed replica 0 of a new set is the mean of the selected replicas"""
+    pdf = Loader().check_pdf(PDF)
+    indexes = [1, 4, 7]
+    new_pdf_from_indexes(pdf, indexes, set_name="TEST_LHIO", folder=tmp_path)
+
+    set_root = tmp_path / "TEST_LHIO"
+    assert len(list(set_root.glob("TEST_LHIO_*.dat"))) == len(indexes) + 1
+    _header, replica0 = read_replica_subgrids(set_root / "TEST_LHIO_0000.dat")
+    expected = rep_matrix([load_replica(pdf, i)[1] for i in indexes]).mean(axis=1)
+    values = np.concatenate([values.ravel() for *_, values in replica0])
+    np.testing.assert_allclose(values, expected.values, rtol=1e-6)
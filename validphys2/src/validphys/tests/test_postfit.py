@@ -8,13 +8,17 @@ import subprocess as sp
 import os
 import shutil
 
+import pytest
+
 from validphys.loader import FallbackLoader as Loader
 from validphys.tests.conftest import FIT
 from reportengine.compat import yaml
 
 
-def test_postfit(tmp):
-    """Checks that the following happens when postfit is run on a pre-existing fit:
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_postfit(tmp, jobs):
+    """Checks that the following happens when postfit is run on a pre-existing fit
+    (both serially and reading the replicas concurrently):
     - The postfit directory is generated
     - The expected files are generated in the PDF set
     - The replicas in the PDF set correspond correctly to the replicas in the fit
@@ -42,9 +46,10 @@ def test_postfit(tmp):
     arclength_threshold = 5.2
     integrability_threshold = 1.0
 
-    # Run postfit
+    # Run postfit, with the default (serial) options when jobs is 1
+    jobs_option = f" --jobs {jobs}" if jobs != 1 else ""
     sp.run(
-        f"postfit {nrep} {TMPFIT} --chi2-threshold {chi2_threshold} --arclength-threshold {arclength_threshold} --integrability-threshold {integrability_threshold}".split(),
+        f"postfit {nrep} {TMPFIT} --chi2-threshold {chi2_threshold} --arclength-threshold {arclength_threshold} --integrability-threshold {integrability_threshold}{jobs_option}".split(),
         cwd=tmp,
         check=True,
     )
@@ -7,6 +7,13 @@ from validphys.api import API
 from validphys.loader import Loader
 from validphys.results import ThPredictionsResult, PositivityResult
 from validphys.fkparser import load_fktable
+from validphys.n3fit_data_utils import (
+    TrainingBundle,
+    TrainingBundleError,
+    publish_training_bundle,
+    validphys_group_extractor,
+    write_training_bundle,
+)
 from validphys.convolution import predictions, central_predictions, linear_predictions
 from validphys.tests.conftest import PDF, HESSIAN_PDF, THEORYID, POSITIVITIES
 
@@ -152,3 +159,61 @@ def test_compare_cf(data_internal_cuts_config, data_internal_cuts_new_theory_con
     new_cfac = res_new_cfac/res_new
 
     np.testing.assert_allclose(new_cfac, old_cfac, rtol=1e-4)
+
+
+def test_training_bundle(tmp_path):
+    """Check that the fittable datasets read from a training bundle
+    give the same fktables as the ones computed from the fktables"""
+    l = Loader()
+    had = l.check_dataset("ATLASTTBARTOT", theoryid=THEORYID, cfac=("QCD",))
+    dis = l.check_dataset("H1HERAF2B", theoryid=THEORYID)
+    datasets = [had, dis]
+    unmasked = validphys_group_extractor(datasets, [])
+    masks = [np.arange(ds.ndata) % 2 == 0 for ds in unmasked]
+    fittable = validphys_group_extractor(datasets, masks)
+    covmat = np.eye(sum(ds.ndata for ds in unmasked))
+    groups = [{"name": "group", "datasets": unmasked, "covmat": covmat}]
+    write_training_bundle(tmp_path / "bundle", groups, [])
+
+    bundle = TrainingBundle(tmp_path / "bundle")
+    bundled = bundle.group_datasets("group", masks, dataset_names=[ds.name for ds in datasets])
+    np.testing.assert_allclose(bundle.group_covmat("group"), covmat)
+    for original, loaded in zip(fittable, bundled):
+        assert original.name == loaded.name
+        assert original.ndata == loaded.ndata
+        assert original.hadronic == loaded.hadronic
+        for method in ("fktables", "training_fktables", "validation_fktables"):
+            for a, b in zip(getattr(original, method)(), getattr(loaded, method)()):
+                np.testing.assert_allclose(a, b)
+        for a, b in zip(original.fktables_data, loaded.fktables_data):
+            np.testing.assert_allclose(a.xgrid, b.xgrid)
+            np.testing.assert_array_equal(a.luminosity_mapping, b.luminosity_mapping)
+
+    with pytest.raises(TrainingBundleError):
+        bundle.group_datasets("group", masks, dataset_names=["H1HERAF2B"])
+
+
+def test_publish_training_bundle(tmp_path):
+    """Check that a training bundle is published only once to the store and
+    that it is published again when the bundle changes"""
+    store = tmp_path / "store"
+    store.mkdir()
+    covmat = np.diag(np.arange(1.0, 5.0))
+    groups = [{"name": "group", "datasets": [], "covmat": covmat}]
+    write_training_bundle(tmp_path / "bundle", groups, [])
+
+    published = publish_training_bundle(tmp_path / "bundle", store)
+    assert published.parent == store
+    assert publish_training_bundle(tmp_path / "bundle", store) == published
+    loaded = TrainingBundle(published).group_covmat("group")
+    np.testing.assert_allclose(loaded, covmat)
+    assert not loaded.flags.writeable
+
+    groups[0]["covmat"] = 2 * covmat
+    write_training_bundle(tmp_path / "bundle", groups, [])
+    republished = publish_training_bundle(tmp_path / "bundle", store)
+    assert republished != published
+    np.testing.assert_allclose(TrainingBundle(republished).group_covmat("group"), 2 * covmat)
+
+    with pytest.raises(TrainingBundleError):
+        publish_training_bundle(tmp_path / "nobundle", store)
@@ -0,0 +1,84 @@
+"""
+test_resultcache.py
+
+Tests for the persistent store of provider results.
+"""
+import os
+
+import numpy as np
+import pytest
+
+from validphys.loader import Loader
+from validphys import resultcache
+from validphys.resultcache import (
+    RESULT_CACHE_ENV,
+    ResultCache,
+    UncacheableInput,
+    persistent_cache,
+    result_key,
+    stable_token,
+)
+from validphys.tests.conftest import PDF, THEORYID
+
+CALLS = []
+
+
+@persistent_cache
+def _power(values, exponent=2):
+    CALLS.append(exponent)
+    return np.asarray(values) ** exponent
+
+
+def test_stable_token():
+    l = Loader()
+    ds = l.check_dataset("NMC", theoryid=THEORYID)
+    assert stable_token(ds) == stable_token(l.check_dataset("NMC", theoryid=THEORYID))
+    assert stable_token(ds) != stable_token(l.check_dataset("NMC", theoryid=THEORYID, cuts=None))
+    assert stable_token(l.check_pdf(PDF)) == stable_token(l.check_pdf(PDF))
+    assert stable_token(np.arange(3)) != stable_token(np.arange(4))
+    with pytest.raises(UncacheableInput):
+        stable_token(object())
+
+
+def test_persistent_cache(tmp_path, monkeypatch):
+    CALLS.clear()
+    # Without the store enabled the function is always called
+    _power([1, 2])
+    _power([1, 2])
+    assert len(CALLS) == 2
+
+    monkeypatch.setenv(RESULT_CACHE_ENV, str(tmp_path))
+    np.testing.assert_equal(_power(np.array([1, 2])), [1, 4])
+    np.testing.assert_equal(_power(np.array([1, 2])), [1, 4])
+    np.testing.assert_equal(_power(np.array([1, 2]), exponent=3), [1, 8])
+    assert CALLS == [2, 2, 2, 3]
+    # Inputs without a stable key are computed but not stored
+    np.testing.assert_equal(_power(range(3)), [0, 1, 4])
+    assert len(ResultCache(tmp_path).entries()) == 2
+
+
+def test_result_key(monkeypatch):
+    key = result_key(_power, (np.arange(3),), {})
+    assert key == result_key(_power, (np.arange(3),), {"exponent": 2})
+    assert key != result_key(_power, (np.arange(3),), {"exponent": 3})
+    # Any change in the code of validphys changes the key
+    monkeypatch.setattr(resultcache, "_package_hash", lambda: "modified")
+    assert key != result_key(_power, (np.arange(3),), {})
+
+
+def test_result_cache_eviction(tmp_path):
+    cache = ResultCache(tmp_path, max_size=np.inf)
+    for i in range(4):
+        cache.put("provider", f"key{i}", np.zeros(1000))
+        # Make the order of use explicit
+        os.utime(tmp_path / f"provider_key{i}.pkl", (i, i))
+    assert cache.get("provider", "key0")[0]
+    size = cache.entries()[0].size
+    # key0 was used last, so it is kept
+    removed = cache.prune(2 * size)
+    assert {i.path.name for i in removed} == {"provider_key1.pkl", "provider_key2.pkl"}
+    assert cache.get("provider", "key0")[0]
+    assert not cache.get("provider", "key1")[0]
+    assert len(cache.clear("other")) == 0
+    assert len(cache.clear("provider")) == 2
+    assert cache.entries() == []
@@ -0,0 +1,74 @@
+"""
+test_theorycov.py
+
+Test that the theory covariance matrix assembled from the stacked shifts of all
+processes agrees with the sub-matrices of the ``covmat_*pt`` prescriptions.
+"""
+import numpy as np
+import pytest
+
+from validphys.theorycovariance.construction import (
+    ProcessInfo,
+    covmap,
+    covmat_3fpt,
+    covmat_3pt,
+    covmat_3rpt,
+    covmat_5barpt,
+    covmat_5pt,
+    covmat_7pt,
+    covmat_7pt_orig,
+    covmat_9pt,
+    covs_pt_prescrip,
+    process_starting_points,
+    theory_covmat_custom,
+)
+
+# Number of theories, point_prescription, fivetheories, seventheories, reference prescription
+PRESCRIPTIONS = [
+    (3, "3f point", None, None, covmat_3fpt),
+    (3, "3r point", None, None, covmat_3rpt),
+    (3, "3 point", None, None, covmat_3pt),
+    (5, "5 point", "nobar", None, covmat_5pt),
+    (5, "5bar point", "bar", None, covmat_5barpt),
+    (7, "7 point", None, "original", covmat_7pt_orig),
+    (7, "7 point", None, "bar", covmat_7pt),
+    (9, "9 point", None, None, covmat_9pt),
+]
+
+# Datasets, in the order of the runcard, and the process of each of them
+DATASETS = {"A": ("DIS", 4), "B": ("DY", 3), "C": ("DIS", 2), "D": ("JETS", 5)}
+
+
+def _process_info(ntheories):
+    rng = np.random.default_rng(42)
+    theory, namelist, sizes = {}, {}, {}
+    for name, (process, size) in DATASETS.items():
+        namelist.setdefault(process, []).append(name)
+        sizes[name] = size
+        theory.setdefault(process, []).append(rng.normal(size=(ntheories, size)))
+    theory = {process: np.concatenate(item, axis=1) for process, item in theory.items()}
+    return ProcessInfo(theory=theory, namelist=namelist, sizes=sizes)
+
+
+@pytest.mark.parametrize("l,point_prescription,fivetheories,seventheories,reference", PRESCRIPTIONS)
+def test_theory_covmat_custom(l, point_prescription, fivetheories, seventheories, reference):
+    process_info = _process_info(l)
+    start_proc = process_starting_points(process_info)
+    covmats = covs_pt_prescrip(
+        process_info, start_proc, list(range(l)), point_prescription, fivetheories, seventheories
+    )
+    for name1, theory1 in process_info.theory.items():
+        for name2, theory2 in process_info.theory.items():
+            expected = reference(name1, name2, theory1[1:] - theory1[0], theory2[1:] - theory2[0])
+            result = covmats[(start_proc[name1], start_proc[name2])]
+            np.testing.assert_allclose(result, expected, atol=1e-12)
+
+    mapping = covmap(process_info, list(DATASETS))
+    ndata = sum(size for _, size in DATASETS.values())
+    covmat = theory_covmat_custom(covmats, mapping, np.arange(ndata)).values
+    by_process = np.block(
+        [[covmats[(start_proc[n1], start_proc[n2])] for n2 in start_proc] for n1 in start_proc]
+    )
+    for i in range(ndata):
+        for j in range(ndata):
+            assert covmat[mapping[i], mapping[j]] == np.float32(by_process[i, j])
@@ -334,6 +334,47 @@ def covmat_9pt(name1, name2, deltas1, deltas2):
     return s
 
 
+def _outer_weights(ndeltas, terms):
+    """Returns the matrix ``w`` such that ``deltas1.T @ w @ deltas2`` is the sum over
+    ``(coefficient, indices)`` in ``terms`` of ``coefficient`` times the outer product
+    of the sums of the shifts in ``indices`` of ``deltas1`` and ``deltas2``"""
+    w = np.zeros((ndeltas, ndeltas))
+    for coefficient, indices in terms:
+        v = np.zeros(ndeltas)
+        v[list(indices)] = 1
+        w += coefficient * np.outer(v, v)
+    return w
+
+
+def prescription_weights(l, point_prescription, fivetheories, seventheories):
+    """Returns the weight matrices ``(same, different)`` of the point prescription
+    for ``l`` theories. The theory covariance sub-matrix between two processes with
+    scale variation shifts ``deltas1`` and ``deltas2``, arrays of shape ``(l - 1, npoints)``,
+    is ``deltas1.T @ same @ deltas2`` if the processes are the same and
+    ``deltas1.T @ different @ deltas2`` otherwise, as computed by the ``covmat_*pt`` functions."""
+    ndeltas = l - 1
+    norm = {3: 1 / 2, 5: 1 / 2, 7: 1 / 3, 9: 1 / 4}[l]
+    same = [(norm, (i,)) for i in range(ndeltas)]
+    if l == 3:
+        if point_prescription == "3f point":
+            different = same
+        else:
+            different = [(1 / 4, (0, 1))]
+    elif l == 5:
+        if fivetheories == "nobar":
+            different = [(1 / 2, (0,)), (1 / 2, (1,)), (1 / 4, (2, 3))]
+        else:
+            different = [(1 / 4, (0, 2)), (1 / 4, (1, 3))]
+    elif l == 7:
+        if seventheories == "original":
+            different = [(1 / 6, (0, 4)), (1 / 6, (1, 5)), (1 / 6, (2, 3))]
+        else:
+            different = [(1 / 3, (0,)), (1 / 3, (1,)), (1 / 6, (2, 3)), (1 / 6, (4, 5))]
+    elif l == 9:
+        different = [(1 / 12, (0, 4, 6)), (1 / 12, (1, 5, 7)), (1 / 8, (2, 3))]
+    return _outer_weights(ndeltas, same), _outer_weights(ndeltas, different)
+
+
 @check_correct_theory_combination
 def covs_pt_prescrip(
     combine_by_type,
@@ -349,43 +390,29 @@ def covs_pt_prescrip(
     chosen in the runcard in order to specify the prescription. Sub-matrices
     correspond to applying the scale variation prescription to each pair of
     processes in turn, using a different procedure for the case where the
-    processes are the same relative to when they are different."""
+    processes are the same relative to when they are different.
+
+    All the sub-matrices are computed at once from the shifts of all the processes
+    using the weights of :py:func:`prescription_weights`."""
     l = len(theoryids)
     start_proc = process_starting_points
     process_info = combine_by_type
+    same, different = prescription_weights(l, point_prescription, fivetheories, seventheories)
+    # Shifts with respect to the central theory of all processes, of shape (l - 1, npoints)
+    deltas = np.concatenate(
+        [theory[1:] - theory[0] for theory in process_info.theory.values()], axis=1
+    )
+    full = deltas.T @ different @ deltas
+    locations = {
+        name: slice(start_proc[name], start_proc[name] + len(theory[0]))
+        for name, theory in process_info.theory.items()
+    }
+    for loc in locations.values():
+        full[loc, loc] = deltas[:, loc].T @ same @ deltas[:, loc]
     covmats = defaultdict(list)
-    for name1 in process_info.theory:
-        for name2 in process_info.theory:
-            central1, *others1 = process_info.theory[name1]
-            deltas1 = list((other - central1 for other in others1))
-            central2, *others2 = process_info.theory[name2]
-            deltas2 = list((other - central2 for other in others2))
-            if l == 3:
-                if point_prescription == "3f point":
-                    s = covmat_3fpt(name1, name2, deltas1, deltas2)
-                elif point_prescription == "3r point":
-                    s = covmat_3rpt(name1, name2, deltas1, deltas2)
-                else:
-                    s = covmat_3pt(name1, name2, deltas1, deltas2)
-            elif l == 5:
-                # 5 point --------------------------------------------------------------
-                if fivetheories == "nobar":
-                    s = covmat_5pt(name1, name2, deltas1, deltas2)
-                # 5bar-point -----------------------------------------------------------
-                else:
-                    s = covmat_5barpt(name1, name2, deltas1, deltas2)
-            #  ---------------------------------------------------------------------
-            elif l == 7:
-                # Outdated 7pts implementation: left for posterity ---------------------
-                if seventheories == "original":
-                    s = covmat_7pt_orig(name1, name2, deltas1, deltas2)
-                # 7pt (Gavin) ----------------------------------------------------------
-                else:
-                    s = covmat_7pt(name1, name2, deltas1, deltas2)
-            elif l == 9:
-                s = covmat_9pt(name1, name2, deltas1, deltas2)
-            start_locs = (start_proc[name1], start_proc[name2])
-            covmats[start_locs] = s
+    for name1, loc1 in locations.items():
+        for name2, loc2 in locations.items():
+            covmats[(start_proc[name1], start_proc[name2])] = full[loc1, loc2]
     return covmats
 
 
@@ -404,9 +431,9 @@ def theory_covmat_custom(covs_pt_prescrip, covmap, procs_index):
     for locs in covs_pt_prescrip:
         cov = covs_pt_prescrip[locs]
         mat[locs[0] : (len(cov) + locs[0]), locs[1] : (len(cov.T) + locs[1])] = cov
-    for i in range(matlength):
-        for j in range(matlength):
-            cov_by_exp[covmap[i]][covmap[j]] = mat[i][j]
+    # Position in the experiment ordering of each point in the process ordering
+    indices = np.array([covmap[i] for i in range(matlength)])
+    cov_by_exp[np.ix_(indices, indices)] = mat
     df = pd.DataFrame(cov_by_exp, index=procs_index, columns=procs_index)
     return df
 